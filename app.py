@@ -1,169 +1,844 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, abort, request, jsonify
 from datetime import datetime
-from models import User, UserInfos
-import re
+from changes import ChangeFeed, ChangesExpired, DEFAULT_CAPACITY, SharedChangeFeed
+from http_cache import ResponseCache, conditional_response
+from json_provider import install_json_provider, COMPACT_SEPARATORS
+from metrics import Metrics
+from models import ArticleInfos, UserInfos
+from ratelimit import RateLimiter
+from storage import open_storage, article_sort_key, DuplicateEmailError
+from utils import encode_cursor, decode_cursor
+from validation import MAX_ID, MAX_JSON_BODY, parse_id, schema
+from werkzeug.routing import IntegerConverter
+import io
+import json
+import math
+import os
+import time
 
 app = Flask(__name__)
+install_json_provider(app)  # orjson si disponible, sinon le fournisseur standard
+# Corps plus gros refusés (413) d'après Content-Length, avant toute lecture ;
+# les imports NDJSON, lus en flux, ont une limite plus haute (voir LimitedRequest)
+app.config['MAX_CONTENT_LENGTH'] = MAX_JSON_BODY
 
-# Base de données "in-memory" pour simplifier
-users_db = {}  # {user_id: {id, name, email}}
-articles_db = {} # {article_id: {id, user_id, title, content, tags, created_at}}
+class IdConverter(IntegerConverter):
+    """<int:...> des routes : un id au-delà de MAX_ID (hors des entiers SQLite) ne peut
+    exister ; il devient 0, qu'aucun enregistrement n'a, et la vue répond 404 comme d'habitude."""
 
-# --- Fonctions utilitaires "inline" ou mal placées ---
-def validate_email(email):
-    # Regex simple pour la validation d'email
-    return re.match(r"[^@]+@[^@]+\.[^@]+", email)
+    def to_python(self, value):
+        value = super().to_python(value)
+        return value if value <= MAX_ID else 0
+
+app.url_map.converters['int'] = IdConverter
+
+class LimitedRequest(Request):
+    """Requête dont la taille maximale du corps dépend de la route (voir body_limit).
+
+    Werkzeug applique max_content_length à la lecture du corps, y compris sans
+    Content-Length ; la propriété remplace la valeur de MAX_CONTENT_LENGTH sans
+    affecter la requête, ce que Flask n'accepte qu'à partir de la 3.1."""
+
+    @property
+    def max_content_length(self):
+        return body_limit(self.endpoint)
+
+app.request_class = LimitedRequest
+
+# Backend de stockage choisi par la variable d'environnement STORAGE_URL
+# ("memory" par défaut, "memory:///chemin/donnees" pour journaliser sur disque,
+# ou "sqlite:///chemin/app.db")
+storage = open_storage(os.environ.get('STORAGE_URL', 'memory'))
+
+# Métriques Prometheus (GET /metrics) et profilage des requêtes lentes,
+# configurés par METRICS_ENABLED, PROFILE_SLOW_MS, PROFILE_SAMPLE_RATE, PROFILE_DIR
+metrics = Metrics.from_env()
+metrics.instrument(storage, [
+    'add_user', 'add_users', 'get_user', 'existing_user_ids', 'find_user_by_email', 'update_user',
+    'delete_user', 'list_users', 'count_users', 'add_article', 'add_articles', 'get_article',
+    'get_users', 'get_articles', 'query_articles', 'user_articles', 'search_articles', 'count_articles',
+    'tag_counts', 'tag_count', 'count_tags', 'user_stats', 'store_version',
+], prefix='storage')
 
+# Corps des réponses de GET /articles, par URL + version du store d'articles
+articles_response_cache = ResponseCache()
+
+# Accès direct aux dict du backend mémoire (tests, benchmarks) ; None avec SQLite
+users_db = getattr(storage, 'users', None)  # {user_id: User} + index email -> user_id
+articles_db = getattr(storage, 'articles', None) # {article_id: Article} + index tags/users/dates
+
+# --- Validation des corps de requête (schémas précompilés, voir validation.py) ---
+# Chaque fonction retourne (tuple des valeurs, None) ou (None, message d'erreur)
+validate_user = metrics.timed('validate')(schema(UserInfos).validate)
+validate_user_update = metrics.timed('validate')(schema(UserInfos, partial=True).validate)
+validate_article = metrics.timed('validate')(schema(ArticleInfos, exclude=('id', 'created_at')).validate)
+
+@app.errorhandler(413)
+def payload_too_large(error):
+    return jsonify({"error": f"Request body too large (max {request.max_content_length} bytes)"}), 413
+
+# --- Fonctions utilitaires "inline" ou mal placées ---
 def format_date_display(dt_obj):
     return dt_obj.strftime("%Y-%m-%d %H:%M:%S")
 
+def user_for_response(user):
+    return user.to_dict()
+
+def article_for_response(article):
+    return article.to_dict(format_date=format_date_display)
+
+# --- Sérialisation JSON des enregistrements ---
+# En mode compact (hors debug), la forme JSON de chaque enregistrement est mise
+# en cache sur celui-ci (Record._json, invalidé à chaque écriture) et les
+# réponses sont assemblées à partir de ces morceaux, à l'identique de jsonify.
+
+def compact_json():
+    provider = app.json
+    return not (provider.compact is False or (provider.compact is None and app.debug))
+
+def record_json(record, to_dict):
+    """Forme JSON compacte de to_dict(record), calculée une fois par version de l'enregistrement."""
+    cached = record._json
+    if cached is None:
+        # Sans verrou : une écriture concurrente peut changer les champs pendant
+        # le calcul. Le résultat n'est gardé que si la version n'a pas bougé
+        # (IndexedStore.touch change la version puis efface _json).
+        version = record._version
+        cached = app.json.dumps(to_dict(record), separators=COMPACT_SEPARATORS)
+        record._json = cached
+        if record._version != version:
+            record._json = None
+    return cached
+
+@metrics.timed('serialize')
+def record_response(record, to_dict, status=200):
+    if not compact_json():
+        return jsonify(to_dict(record)), status
+    return Response(record_json(record, to_dict) + "\n", mimetype=app.json.mimetype), status
+
+# --- Pagination par curseur (?limit=N&after=<curseur>) ---
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+@metrics.timed('validate.pagination')
+def parse_pagination(order='id'):
+    """Lit `limit` et `after` dans la query string.
+
+    Retourne (limit, after, error_response). Sans `limit` ni `after`, limit vaut
+    None et la route renvoie la liste complète comme avant.
+    """
+    limit_str = request.args.get('limit')
+    cursor = request.args.get('after')
+    if limit_str is None and cursor is None:
+        return None, None, None
+
+    try:
+        limit = int(limit_str) if limit_str is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return None, None, (jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400)
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            after = None
+        if after is None or isinstance(after, tuple) != (order == 'created_at'):
+            return None, None, (jsonify({"error": "Invalid cursor"}), 400)
+    return limit, after, None
+
+def expanded_dict(record, to_dict, authors):
+    """to_dict(record), avec la clé "author" si `authors` ({user_id: User}) est fourni."""
+    data = to_dict(record)
+    if authors is not None:
+        author = authors.get(record.user_id)
+        data["author"] = user_for_response(author) if author is not None else None
+    return data
+
+def expanded_json(record, to_dict, authors):
+    """Forme JSON compacte de expanded_dict, assemblée à partir des formes en cache."""
+    if authors is None:
+        return record_json(record, to_dict)
+    author = authors.get(record.user_id)
+    author_json = record_json(author, user_for_response) if author is not None else "null"
+    # "author" précède les autres clés de l'article dans l'ordre trié de jsonify
+    return '{"author":' + author_json + ',' + record_json(record, to_dict)[1:]
+
+@metrics.timed('serialize')
+def page_response(records, to_dict, next_key, authors=None):
+    next_cursor = encode_cursor(next_key) if next_key is not None else None
+    if not compact_json():
+        return jsonify({"items": [expanded_dict(record, to_dict, authors) for record in records],
+                        "next_cursor": next_cursor}), 200
+    # Clés triées comme jsonify : "items" puis "next_cursor"
+    items = ",".join(expanded_json(record, to_dict, authors) for record in records)
+    body = f'{{"items":[{items}],"next_cursor":{app.json.dumps(next_cursor, separators=COMPACT_SEPARATORS)}}}\n'
+    return Response(body, mimetype=app.json.mimetype), 200
+
+# --- Lectures groupées (?ids=1,2,3) : un aller-retour au lieu d'un par enregistrement ---
+MAX_BATCH_IDS = MAX_PAGE_SIZE
+
+def parse_ids():
+    """Lit `ids` dans la query string : (ids sans doublon dans l'ordre demandé, réponse d'erreur).
+
+    Retourne (None, None) si le paramètre est absent.
+    """
+    ids_str = request.args.get('ids')
+    if ids_str is None:
+        return None, None
+    try:
+        ids = list(dict.fromkeys(parse_id(part) for part in ids_str.split(',') if part.strip()))
+    except ValueError:
+        return None, (jsonify({"error": f"ids must be a comma-separated list of integers between 1 and {MAX_ID}"}), 400)
+    if not 1 <= len(ids) <= MAX_BATCH_IDS:
+        return None, (jsonify({"error": f"ids must contain between 1 and {MAX_BATCH_IDS} ids"}), 400)
+    return ids, None
+
+@metrics.timed('serialize')
+def batch_response(ids, records, to_dict, authors=None):
+    """Réponse {"items": [...], "missing": [...]} : enregistrements trouvés dans l'ordre des ids."""
+    items = [records[record_id] for record_id in ids if record_id in records]
+    missing = [record_id for record_id in ids if record_id not in records]
+    if not compact_json():
+        return jsonify({"items": [expanded_dict(record, to_dict, authors) for record in items],
+                        "missing": missing}), 200
+    parts = ",".join(expanded_json(record, to_dict, authors) for record in items)
+    body = f'{{"items":[{parts}],"missing":{app.json.dumps(missing, separators=COMPACT_SEPARATORS)}}}\n'
+    return Response(body, mimetype=app.json.mimetype), 200
+
+# --- Réponses en streaming pour les listes complètes ---
+STREAM_PAGE_SIZE = 1000  # enregistrements lus par appel au stockage
+STREAM_CHUNK_SIZE = 256  # enregistrements sérialisés par morceau envoyé
+
+def iter_paged(fetch, key, page_size=None):
+    """Parcourt tout un stockage page par page (mémoire constante)."""
+    page_size = page_size or STREAM_PAGE_SIZE
+    after = None
+    while True:
+        page = fetch(after=after, limit=page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = key(page[-1])
+
+def stream_json_list(records, to_dict):
+    """Réponse JSON d'une liste, sérialisée au fil d'un générateur.
+
+    Le corps est identique octet pour octet à jsonify(liste) ; en mode
+    "lisible" (debug, JSON indenté) on revient simplement à jsonify.
+    """
+    if not compact_json():
+        return jsonify([to_dict(record) for record in records]), 200
+
+    def generate():
+        chunk = []
+        separator = "["
+        for record in records:
+            chunk.append(separator + record_json(record, to_dict))
+            separator = ","
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield "".join(chunk)
+                chunk = []
+        if separator == "[":
+            chunk.append("[")
+        chunk.append("]\n")
+        yield "".join(chunk)
+
+    return Response(generate(), mimetype=app.json.mimetype), 200
+
 # --- Routes Utilisateurs ---
 @app.route('/users', methods=['POST'])
 def create_user():
-    data = request.json
-    name = data.get('name')
-    email = data.get('email')
-
-    if not name or not email:
-        return jsonify({"error": "Name and email are required"}), 400
-
-    if not validate_email(email):
-        return jsonify({"error": "Invalid email format"}), 400
-    
-    for user_id in users_db:
-        if users_db[user_id]['email'] == email:
-            return jsonify({"error": "User with this email already exists"}), 409
-
-    user_id = len(users_db) + 1
-    new_user = {'id': user_id, 'name': name, 'email': email}
-    #new_user = User(infos = UserInfos(id = user_id, 
-    #                                  name = name, 
-    #                                  email = email))
-    users_db[user_id] = new_user
-    return jsonify(new_user), 201
+    values, error = validate_user(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    name, email = values
+
+    try:
+        new_user = storage.add_user(name, email)
+    except DuplicateEmailError:
+        return jsonify({"error": "User with this email already exists"}), 409
+    return record_response(new_user, user_for_response, 201)
 
 @app.route('/users', methods=['GET'])
 def get_users():
-    return jsonify(list(users_db.values())), 200
+    ids, error = parse_ids()
+    if error:
+        return error
+    limit, after, error = parse_pagination()
+    if error:
+        return error
+    if ids is not None and (limit is not None or after is not None):
+        return jsonify({"error": "ids cannot be combined with pagination"}), 400
+
+    def build():
+        if ids is not None:
+            return batch_response(ids, storage.get_users(ids), user_for_response)
+        if limit is None:
+            return stream_json_list(iter_paged(storage.list_users, lambda user: user.id), user_for_response)
+
+        # On lit un élément de plus pour savoir s'il existe une page suivante
+        users = storage.list_users(after=after, limit=limit + 1)
+        page = users[:limit]
+        next_key = page[-1].id if len(users) > limit else None
+        return page_response(page, user_for_response, next_key)
+
+    version, modified_at = storage.store_version('users')
+    return conditional_response(app, f"users-{version}", modified_at, build)
 
 @app.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = users_db.get(user_id)
+    user = storage.get_user(user_id)
     if user:
-        return jsonify(user), 200
+        _, modified_at = storage.store_version('users')
+        return conditional_response(app, f"user-{user_id}-{user._version}", modified_at,
+                                    lambda: record_response(user, user_for_response))
     return jsonify({"error": "User not found"}), 404
 
 @app.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
-    user = users_db.get(user_id)
-    if not user:
+    # Un id inconnu répond 404 avant toute erreur de validation ; le stockage
+    # revérifie l'existence dans l'écriture (suppression concurrente)
+    if storage.get_user(user_id) is None:
+        return jsonify({"error": "User not found"}), 404
+
+    values, error = validate_user_update(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    new_name, new_email = values
+
+    try:
+        user = storage.update_user(user_id, name=new_name, email=new_email)
+    except DuplicateEmailError:
+        # L'email existe déjà pour un autre utilisateur
+        return jsonify({"error": "User with this email already exists"}), 409
+    if user is None:
         return jsonify({"error": "User not found"}), 404
 
-    data = request.json
-    new_name = data.get('name')
-    new_email = data.get('email')
-
-    if new_name:
-        user['name'] = new_name
-    if new_email:
-        if not validate_email(new_email):
-            return jsonify({"error": "Invalid email format"}), 400
-        
-        # Vérifier si l'email existe déjà pour un autre utilisateur
-        for existing_user_id in users_db:
-            if existing_user_id != user_id and users_db[existing_user_id]['email'] == new_email:
-                return jsonify({"error": "User with this email already exists"}), 409
-        
-        user['email'] = new_email
-        
-    return jsonify(user), 200
+    return record_response(user, user_for_response)
 
 @app.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
-    if user_id in users_db:
-        del users_db[user_id]
-        # Supprimer aussi les articles de cet utilisateur (logique métier dans le contrôleur)
-        articles_to_delete = [art_id for art_id, art in articles_db.items() if art['user_id'] == user_id]
-        for art_id in articles_to_delete:
-            del articles_db[art_id]
+    # Les articles de l'utilisateur sont supprimés avec lui par le stockage
+    if storage.delete_user(user_id):
         return jsonify({"message": "User and associated articles deleted"}), 204
     return jsonify({"error": "User not found"}), 404
 
+@app.route('/users/<int:user_id>/articles', methods=['GET'])
+def get_user_articles(user_id):
+    if storage.get_user(user_id) is None:
+        return jsonify({"error": "User not found"}), 404
+
+    limit, after, error = parse_pagination()
+    if error:
+        return error
+
+    def build():
+        if limit is None:
+            articles = iter_paged(lambda after, limit: storage.user_articles(user_id, after=after, limit=limit),
+                                  lambda article: article.id)
+            return stream_json_list(articles, article_for_response)
+
+        articles = storage.user_articles(user_id, after=after, limit=limit + 1)
+        page = articles[:limit]
+        next_key = page[-1].id if len(articles) > limit else None
+        return page_response(page, article_for_response, next_key)
+
+    version, modified_at = storage.store_version('articles')
+    return conditional_response(app, f"articles-{version}", modified_at, build)
+
+@app.route('/users/<int:user_id>/stats', methods=['GET'])
+def get_user_stats(user_id):
+    if storage.get_user(user_id) is None:
+        return jsonify({"error": "User not found"}), 404
+    limit, error = parse_top_k()
+    if error:
+        return error
+
+    def build():
+        articles, tags, distinct_tags = storage.user_stats(user_id, limit)
+        return jsonify({"user_id": user_id, "articles": articles, "distinct_tags": distinct_tags,
+                        "tags": [{"tag": tag, "count": count} for tag, count in tags]})
+
+    version, modified_at = storage.store_version('articles')
+    return conditional_response(app, f"user-{user_id}-stats-{version}", modified_at, build)
+
 # --- Routes Articles ---
 @app.route('/articles', methods=['POST'])
 def create_article():
-    data = request.json
-    user_id = data.get('user_id')
-    title = data.get('title')
-    content = data.get('content')
-    tags_str = data.get('tags', '') # Tags sous forme de chaîne "tag1,tag2"
+    # Tags sous forme de chaîne "tag1,tag2" (ou de liste)
+    values, error = validate_article(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    user_id, title, content, tags = values
 
-    if not user_id or not title or not content:
-        return jsonify({"error": "user_id, title, and content are required"}), 400
-
-    if user_id not in users_db:
+    # Le stockage vérifie l'existence de l'auteur dans la même opération que l'insertion
+    new_article = storage.add_article(user_id, title, content, tags, created_at=datetime.now()) # Date de création
+    if new_article is None:
         return jsonify({"error": "User not found"}), 404
-    
-    tags = [tag.strip() for tag in tags_str.split(',') if tag.strip()] if tags_str else []
-
-    article_id = len(articles_db) + 1
-    new_article = {
-        'id': article_id,
-        'user_id': user_id,
-        'title': title,
-        'content': content,
-        'tags': tags,
-        'created_at': datetime.now() # Date de création
-    }
-    articles_db[article_id] = new_article
-    
-    # Formatage de la date pour la réponse (mélange de responsabilités)
-    response_article = new_article.copy()
-    response_article['created_at'] = format_date_display(new_article['created_at'])
-    
-    return jsonify(response_article), 201
+
+    return record_response(new_article, article_for_response, 201)
 
 @app.route('/articles', methods=['GET'])
 def get_articles():
-    # Logique de filtrage d'articles (par date, par tag)
-    filtered_articles = list(articles_db.values())
-
+    # Filtrage par tag et/ou par date via les index du stockage (pas de parcours complet)
     tag_filter = request.args.get('tag')
     date_after_str = request.args.get('date_after') # Format YYYY-MM-DD
 
-    if tag_filter:
-        filtered_articles = [
-            article for article in filtered_articles if tag_filter in article['tags']
-        ]
-
+    date_after = None
     if date_after_str:
         try:
             date_after = datetime.strptime(date_after_str, "%Y-%m-%d")
-            filtered_articles = [
-                article for article in filtered_articles if article['created_at'] >= date_after
-            ]
         except ValueError:
             return jsonify({"error": "Invalid date_after format. Use YYYY-MM-DD"}), 400
 
-    # Formatage des dates pour chaque article (responsabilité répétée)
-    articles_for_response = []
-    for article in filtered_articles:
-        art_copy = article.copy()
-        art_copy['created_at'] = format_date_display(article['created_at'])
-        articles_for_response.append(art_copy)
+    order = request.args.get('order', 'id')
+    if order not in ('id', 'created_at'):
+        return jsonify({"error": "order must be 'id' or 'created_at'"}), 400
 
-    return jsonify(articles_for_response), 200
+    # ?include=author : chaque article reçoit son auteur (jointure côté serveur)
+    include = request.args.get('include')
+    if include not in (None, 'author'):
+        return jsonify({"error": "include must be 'author'"}), 400
+
+    ids, error = parse_ids()
+    if error:
+        return error
+    limit, after, error = parse_pagination(order)
+    if error:
+        return error
+    if ids is not None and (tag_filter or date_after or limit is not None or after is not None):
+        return jsonify({"error": "ids cannot be combined with filters or pagination"}), 400
+    if include and ids is None and limit is None:
+        return jsonify({"error": "include=author requires ids or limit"}), 400
+
+    def fetch(after, limit):
+        return storage.query_articles(tag=tag_filter or None, date_after=date_after,
+                                      order=order, after=after, limit=limit)
+
+    def authors_of(articles):
+        # Une seule lecture groupée pour tous les auteurs de la réponse
+        return storage.get_users({article.user_id for article in articles}) if include else None
+
+    def build():
+        if ids is not None:
+            articles = storage.get_articles(ids)
+            return batch_response(ids, articles, article_for_response, authors_of(articles.values()))
+        if limit is None:
+            articles = iter_paged(fetch, lambda article: article_sort_key(article, order))
+            return stream_json_list(articles, article_for_response)
+
+        articles = fetch(after, limit + 1)
+        page = articles[:limit]
+        next_key = article_sort_key(page[-1], order) if len(articles) > limit else None
+        return page_response(page, article_for_response, next_key, authors_of(page))
+
+    version, modified_at = storage.store_version('articles')
+    etag, cache_key = f"articles-{version}", (request.path, request.query_string, version)
+    if include:
+        # La réponse dépend aussi des utilisateurs (renommage d'un auteur)
+        users_version, users_modified_at = storage.store_version('users')
+        etag += f"-users-{users_version}"
+        cache_key += (users_version,)
+        modified_at = max(modified_at, users_modified_at)
+    return conditional_response(app, etag, modified_at, build,
+                                cache=articles_response_cache, cache_key=cache_key)
+
+# --- Recherche plein texte (?q=mots, "préfixe*" ; tous les mots sont requis) ---
+DEFAULT_SEARCH_LIMIT = 20
+
+@app.route('/articles/search', methods=['GET'])
+def search_articles():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+
+    # Le curseur est ici le rang du prochain résultat
+    limit, offset, error = parse_pagination()
+    if error:
+        return error
+    limit = limit or DEFAULT_SEARCH_LIMIT
+    offset = offset or 0
+
+    def build():
+        articles = storage.search_articles(query, offset=offset, limit=limit + 1)
+        next_key = offset + limit if len(articles) > limit else None
+        return page_response(articles[:limit], article_for_response, next_key)
+
+    version, modified_at = storage.store_version('articles')
+    return conditional_response(app, f"articles-{version}", modified_at, build,
+                                cache=articles_response_cache,
+                                cache_key=(request.path, request.query_string, version))
 
 @app.route('/articles/<int:article_id>', methods=['GET'])
 def get_article(article_id):
-    article = articles_db.get(article_id)
+    article = storage.get_article(article_id)
     if article:
-        # Formatage de la date (responsabilité du contrôleur)
-        response_article = article.copy()
-        response_article['created_at'] = format_date_display(article['created_at'])
-        return jsonify(response_article), 200
+        _, modified_at = storage.store_version('articles')
+        return conditional_response(app, f"article-{article_id}-{article._version}", modified_at,
+                                    lambda: record_response(article, article_for_response))
     return jsonify({"error": "Article not found"}), 404
 
+# --- Tags (compteurs tenus à jour à chaque écriture, voir store.ArticleStore) ---
+DEFAULT_TOP_TAGS = 100
+
+def parse_top_k():
+    """Lit `limit` : nombre de tags retournés (les plus fréquents). Retourne (limit, réponse d'erreur)."""
+    limit_str = request.args.get('limit')
+    try:
+        limit = int(limit_str) if limit_str is not None else DEFAULT_TOP_TAGS
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return None, (jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400)
+    return limit, None
+
+@app.route('/tags', methods=['GET'])
+def get_tags():
+    limit, error = parse_top_k()
+    if error:
+        return error
+
+    def build():
+        items = [{"tag": tag, "count": count} for tag, count in storage.tag_counts(limit)]
+        return jsonify({"items": items, "total": storage.count_tags()})
+
+    version, modified_at = storage.store_version('articles')
+    return conditional_response(app, f"tags-{version}", modified_at, build)
+
+@app.route('/tags/<tag>', methods=['GET'])
+def get_tag(tag):
+    version, modified_at = storage.store_version('articles')
+    return conditional_response(app, f"tag-{version}", modified_at,
+                                lambda: jsonify({"tag": tag, "count": storage.tag_count(tag)}))
+
+# --- Flux de changements (réplication incrémentale, voir changes.py) ---
+# Chaque écriture du stockage (routes, imports, suppressions en cascade) est
+# publiée dans l'anneau avec la forme de l'enregistrement servie par l'API
+# (aucune donnée pour une suppression ou un "clear").
+# Sur un stockage partagé, le journal est tenu par le stockage, dans la
+# transaction de chaque mutation : les numéros sont ceux de tous les workers.
+# Sinon l'anneau est propre au processus : le flux est refusé s'il y a
+# plusieurs workers (WEB_CONCURRENCY, exporté par server.py).
+CHANGES_CAPACITY = int(os.environ.get('CHANGES_CAPACITY', DEFAULT_CAPACITY))
+CHANGES_AVAILABLE = storage.shared or int(os.environ.get('WEB_CONCURRENCY', '1')) <= 1
+CHANGE_RENDERERS = {'user': user_for_response, 'article': article_for_response}
+DEFAULT_CHANGES_LIMIT = 100
+SSE_HEARTBEAT = 15.0       # commentaire ": keep-alive" après autant de secondes sans changement
+SSE_DEFAULT_DURATION = 60  # le client se reconnecte ensuite avec Last-Event-ID
+SSE_MAX_DURATION = 300
+SSE_RETRY_MS = 1000
+
+def render_change(kind, op, record):
+    return CHANGE_RENDERERS[kind](record) if op in ('create', 'update') else None
+
+def serialize_change(kind, op, record):
+    data = render_change(kind, op, record)
+    return app.json.dumps(data, separators=COMPACT_SEPARATORS) if data is not None else None
+
+def publish_change(kind, op, record_id, record):
+    changes.publish(kind, op, record_id, render_change(kind, op, record))
+
+if storage.shared:
+    storage.keep_changes(serialize_change, CHANGES_CAPACITY)
+    changes = SharedChangeFeed(storage)
+    storage.on_change(changes.notify)
+else:
+    changes = ChangeFeed(CHANGES_CAPACITY)
+    storage.on_change(publish_change)
+
+def parse_since(value):
+    """Numéro de séquence `since` (None si absent) ; lève ValueError s'il est invalide."""
+    if value is None or value == '':
+        return None
+    since = int(value)
+    if not 0 <= since <= MAX_ID:  # numéro de séquence SQLite : entier 64 bits
+        raise ValueError(value)
+    return since
+
+def changes_unavailable():
+    return jsonify({"error": "The change feed needs a shared storage when several workers run"}), 501
+
+def changes_expired(error):
+    return jsonify({"error": "Changes are no longer available, resync from the list endpoints",
+                    "first_seq": error.first_seq}), 410
+
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    """Changements de numéro > `since` (sans `since` ou avec 0 : les plus anciens encore gardés).
+
+    Le client repart de `next_since` jusqu'à atteindre `last_seq`.
+    """
+    if not CHANGES_AVAILABLE:
+        return changes_unavailable()
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError:
+        return jsonify({"error": "since must be a non-negative integer"}), 400
+    limit_str = request.args.get('limit')
+    try:
+        limit = int(limit_str) if limit_str is not None else DEFAULT_CHANGES_LIMIT
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    last_seq = changes.last_seq  # lu avant : next_since ne dépasse jamais last_seq
+    try:
+        items = changes.since(since, limit)
+    except ChangesExpired as error:
+        return changes_expired(error)
+    next_since = items[-1]["seq"] if items else (since or changes.first_seq - 1)
+    return jsonify({"items": items, "next_since": next_since, "last_seq": max(last_seq, next_since)})
+
+def sse_event(event, data, event_id=None):
+    payload = app.json.dumps(data, separators=COMPACT_SEPARATORS)
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {payload}\n\n"
+
+@app.route('/changes/stream', methods=['GET'])
+def stream_changes():
+    """Server-sent events : un évènement "change" par changement, d'id son numéro.
+
+    Reprend après `since` ou l'en-tête Last-Event-ID (reconnexion), depuis le
+    plus ancien changement gardé si 0 ; sans l'un ni l'autre, seulement les
+    changements à venir. Si la reprise n'est plus
+    possible, un évènement "resync" clôt le flux. La connexion est fermée
+    après `duration` secondes.
+    """
+    if not CHANGES_AVAILABLE:
+        return changes_unavailable()
+    try:
+        since = parse_since(request.args.get('since', request.headers.get('Last-Event-ID')))
+        duration = float(request.args.get('duration', SSE_DEFAULT_DURATION))
+        if not math.isfinite(duration):  # nan échapperait à min/max : flux jamais fermé
+            raise ValueError(duration)
+    except ValueError:
+        return jsonify({"error": "since must be a non-negative integer and duration a number"}), 400
+    if since is None:
+        since = changes.last_seq
+    elif since == 0:
+        since = changes.first_seq - 1  # wait() attend un numéro réel
+    else:
+        try:
+            changes.since(since, 0)  # reprise impossible : 410 avant d'ouvrir le flux
+        except ChangesExpired as error:
+            return changes_expired(error)
+    deadline = time.monotonic() + min(max(duration, 0), SSE_MAX_DURATION)
+
+    def generate():
+        seq = since
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while True:
+            try:
+                batch = changes.since(seq, DEFAULT_CHANGES_LIMIT)
+            except ChangesExpired as error:
+                yield sse_event("resync", {"first_seq": error.first_seq})
+                return
+            if batch:
+                yield "".join(sse_event("change", change, change["seq"]) for change in batch)
+                seq = batch[-1]["seq"]
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not changes.wait(seq, min(SSE_HEARTBEAT, remaining)):
+                yield ": keep-alive\n\n"
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # pas de mise en tampon par un proxy nginx
+    return response
+
+# --- Import / export en masse (NDJSON : un objet JSON par ligne) ---
+BULK_BATCH_SIZE = 1000
+BULK_READ_BUFFER = 64 * 1024
+BULK_MAX_CONTENT_LENGTH = 1024 ** 3  # corps d'import lu en flux : limite bien plus haute
+
+def iter_ndjson(stream):
+    """Lit un flux NDJSON ligne par ligne : (numéro de ligne, objet ou None, erreur).
+
+    Une ligne de plus de MAX_JSON_BODY octets est refusée sans être gardée en mémoire.
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(MAX_JSON_BODY + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) > MAX_JSON_BODY and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(BULK_READ_BUFFER)
+            yield line_number, None, f"Line too long (max {MAX_JSON_BODY} bytes)"
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Each line must be a JSON object"
+            continue
+        yield line_number, data, None
+
+def bulk_import(record_schema, insert_batch):
+    """Valide et insère le corps NDJSON de la requête par lots de BULK_BATCH_SIZE.
+
+    Chaque ligne est validée par `record_schema` (validation.Schema) au flush
+    du lot ; `insert_batch(lines, entrées)` insère les entrées valides et
+    retourne les erreurs par ligne.
+    """
+    created = 0
+    errors = []
+    batch_lines, batch = [], []
+
+    @metrics.timed('validate')
+    def validate_batch():
+        valid_lines, entries, batch_errors = [], [], []
+        for line_number, data in zip(batch_lines, batch):
+            values, error = record_schema.validate(data)
+            if error is None:
+                valid_lines.append(line_number)
+                entries.append(values)
+            else:
+                batch_errors.append({"line": line_number, "error": error})
+        return valid_lines, entries, batch_errors
+
+    def flush():
+        nonlocal created
+        valid_lines, entries, batch_errors = validate_batch()
+        errors.extend(batch_errors)
+        if entries:
+            insert_errors = insert_batch(valid_lines, entries)
+            created += len(entries) - len(insert_errors)
+            errors.extend(insert_errors)
+        batch_lines.clear()
+        batch.clear()
+
+    # Lecture bufferisée : le flux brut de Werkzeug lit octet par octet en mode ligne
+    stream = io.BufferedReader(request.stream, buffer_size=BULK_READ_BUFFER)
+    for line_number, data, error in iter_ndjson(stream):
+        if error:
+            errors.append({"line": line_number, "error": error})
+            continue
+        batch_lines.append(line_number)
+        batch.append(data)
+        if len(batch) >= BULK_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    # Les erreurs de validation et d'insertion arrivent au flush du lot : on remet l'ordre des lignes
+    errors.sort(key=lambda error: error["line"])
+
+    status = 201 if created else 400 if errors else 200
+    return jsonify({"created": created, "errors": errors}), status
+
+@app.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    def insert_batch(lines, entries):
+        # Entrées (id, name, email) : un id fourni (ligne d'un export) est conservé,
+        # pour que les articles réimportés gardent leur auteur
+        users = storage.add_users([(name, email, user_id) for user_id, name, email in entries])
+        failed = [(line_number, entry[0]) for line_number, entry, user in zip(lines, entries, users) if user is None]
+        taken_ids = storage.existing_user_ids([user_id for _, user_id in failed if user_id is not None])
+        return [
+            {"line": line_number,
+             "error": "User with this id already exists" if user_id in taken_ids
+             else "User with this email already exists"}
+            for line_number, user_id in failed
+        ]
+
+    return bulk_import(schema(UserInfos, exclude=(), optional=('id',)), insert_batch)
+
+@app.route('/articles/bulk', methods=['POST'])
+def bulk_create_articles():
+    def insert_batch(lines, entries):
+        # L'existence des auteurs est vérifiée par le stockage, dans l'insertion du lot
+        return [
+            {"line": line_number, "error": "User not found"}
+            for line_number, article in zip(lines, storage.add_articles(entries)) if article is None
+        ]
+
+    # Entrées (user_id, title, content, tags, created_at) : created_at optionnel, ISO 8601
+    return bulk_import(schema(ArticleInfos), insert_batch)
+
+@app.route('/export', methods=['GET'])
+def export_all():
+    def generate():
+        for user in iter_paged(storage.list_users, lambda user: user.id):
+            yield app.json.dumps({"type": "user", **user.to_dict()}, separators=COMPACT_SEPARATORS) + "\n"
+        for article in iter_paged(storage.query_articles, lambda article: article.id):
+            yield app.json.dumps({"type": "article", **article.to_dict()}, separators=COMPACT_SEPARATORS) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+# --- Métriques ---
+metrics.gauge('app_store_records', 'Number of records in each store.', lambda: [
+    ((('store', 'users'),), storage.count_users()),
+    ((('store', 'articles'),), storage.count_articles()),
+])
+metrics.gauge('app_store_version', 'Write version of each store.', lambda: [
+    ((('store', name),), storage.store_version(name)[0]) for name in ('users', 'articles')
+])
+metrics.gauge('app_changes_last_seq', 'Sequence number of the last published change.', lambda: [
+    ((), changes.last_seq),
+])
+metrics.gauge('app_response_cache_entries', 'Entries in the articles response cache.', lambda: [
+    ((), len(articles_response_cache)),
+])
+metrics.gauge('app_in_flight_requests', 'Requests being processed (counted when MAX_IN_FLIGHT is set).', lambda: [
+    ((), rate_limiter.in_flight),
+])
+metrics.gauge('app_rejected_requests', 'Requests rejected by admission control, by route class and status.',
+              lambda: [((('class', route_class), ('status', status)), count)
+                       for (route_class, status), count in sorted(rate_limiter.rejected.items())])
+metrics.install(app)
+
+# --- Admission des requêtes (limitation de débit et délestage, voir ratelimit.py) ---
+# configurée par RATE_LIMIT_ENABLED, RATE_LIMITS, RATE_LIMIT_BACKEND,
+# RATE_LIMIT_CLIENT_HEADER et MAX_IN_FLIGHT
+rate_limiter = RateLimiter.from_env()
+
+# Classe de chaque route ("read" par défaut) : un seau par client et par classe
+ROUTE_CLASSES = {
+    'create_user': 'write', 'update_user': 'write', 'delete_user': 'write', 'create_article': 'write',
+    'get_users': 'list', 'get_articles': 'list', 'get_user_articles': 'list',
+    'bulk_create_users': 'bulk', 'bulk_create_articles': 'bulk', 'export_all': 'bulk',
+}
+RATE_LIMIT_EXEMPT = {'metrics', 'static'}
+LIST_DUMP_COST = 10  # jetons d'une liste non paginée (ni limit, ni after, ni ids)
+BODY_LIMITS = {'bulk': BULK_MAX_CONTENT_LENGTH}  # imports lus en flux ; MAX_JSON_BODY sinon
+
+def route_class():
+    return ROUTE_CLASSES.get(request.endpoint, 'read')
+
+def body_limit(endpoint):
+    """Taille maximale du corps d'une requête vers `endpoint` (appliquée aussi par asgi.py à la réception)."""
+    return BODY_LIMITS.get(ROUTE_CLASSES.get(endpoint, 'read'), MAX_JSON_BODY)
+
+def admission_class():
+    """(classe de la route, coût en jetons) ; None pour une route exemptée."""
+    if request.endpoint in RATE_LIMIT_EXEMPT:
+        return None
+    name = route_class()
+    if name == 'list' and not request.args.keys() & {'limit', 'after', 'ids'}:
+        return name, LIST_DUMP_COST
+    return name, 1
+
+@app.before_request
+def check_body_size():
+    """Refuse (413) un corps annoncé trop gros, avant la limitation de débit et toute lecture."""
+    # La lecture d'un corps sans Content-Length est limitée par LimitedRequest
+    if request.content_length is not None and request.content_length > request.max_content_length:
+        abort(413)
+
+rate_limiter.install(app, admission_class)
+
 # Point d'entrée pour lancer l'application
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,255 @@
+# asgi.py
+# Mode de service asynchrone : expose l'API de `app.py` comme application ASGI.
+#
+#   uvicorn asgi:application --http h11 --port 5000
+#
+# Les connexions (keep-alive compris) sont tenues par la boucle asyncio du
+# serveur ASGI : une connexion inactive ne coûte aucun thread. Chaque requête
+# est ensuite traitée par un handler asynchrone qui appelle les mêmes routes
+# Flask (validation, stockage, sérialisation, cache HTTP) :
+#   - avec un stockage non bloquant (Storage.blocking faux : MemoryStorage
+#     sans journal), directement dans la boucle : les routes ne font aucune
+#     E/S et ne durent que quelques microsecondes ;
+#   - avec un stockage bloquant (journal sur disque avec fsync, SQLite) ou un
+#     gros corps (import NDJSON), dans un pool de threads borné, pour ne
+#     jamais bloquer la boucle.
+# Les réponses streamées sont envoyées morceau par morceau, en laissant la
+# boucle servir les autres connexions entre deux morceaux. Un flux
+# d'évènements (text/event-stream, GET /changes/stream) attend les
+# changements en bloquant : ses morceaux sont toujours produits dans un pool
+# de threads à part, pour ne bloquer ni la boucle ni les requêtes.
+# Le corps d'une requête est limité pendant sa réception (app.body_limit) :
+# au-delà, la réception s'arrête et l'app répond 413. Celui d'un import
+# (routes "bulk") n'est pas mis en mémoire : wsgi.input le lit au fil des
+# messages ASGI, depuis le thread qui traite la requête.
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from werkzeug.exceptions import ClientDisconnected, HTTPException
+
+from app import ROUTE_CLASSES, app, body_limit, storage
+
+INLINE_BODY_LIMIT = 64 * 1024  # au-delà, la requête est traitée dans le pool de threads
+MAX_WORKERS = 32
+MAX_STREAMS = 256  # flux d'évènements ouverts en même temps (un thread chacun pendant l'attente)
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+class ReceiveStream(io.RawIOBase):
+    """wsgi.input qui lit le corps au fil des messages ASGI, sans le garder en entier.
+
+    Les lectures se font dans un thread du pool : chacune attend, si besoin,
+    le message suivant de la boucle.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._chunk = memoryview(b"")
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._chunk and not self._done:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected()
+            self._chunk = memoryview(message.get("body", b""))
+            self._done = not message.get("more_body")
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+def build_environ(scope, body):
+    """Environnement WSGI (PEP 3333) équivalent à une requête HTTP ASGI.
+
+    `body` est le corps lu (bytes) ou un flux lisible (voir ReceiveStream).
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body) if isinstance(body, bytes) else body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if isinstance(body, bytes):
+        environ.setdefault("CONTENT_LENGTH", str(len(body)))
+    elif "CONTENT_LENGTH" not in environ:
+        environ["wsgi.input_terminated"] = True  # corps "chunked" : lu jusqu'à la fin du flux
+    return environ
+
+
+def content_length(scope):
+    """Valeur de l'en-tête Content-Length, ou None (absent ou invalide)."""
+    for name, value in scope.get("headers", []):
+        if name.lower() == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class AsgiApp:
+    """Application ASGI qui sert une application WSGI (ici l'app Flask).
+
+    `inline` choisit si les requêtes à petit corps sont traitées directement
+    dans la boucle (None : seulement si le stockage n'est pas bloquant).
+    """
+
+    def __init__(self, wsgi_app, inline=None, max_workers=MAX_WORKERS):
+        self.wsgi_app = wsgi_app
+        self.inline = not storage.blocking if inline is None else inline
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asgi")
+        self.stream_executor = ThreadPoolExecutor(max_workers=MAX_STREAMS, thread_name_prefix="asgi-stream")
+        # Routes de l'app Flask : limite de taille et lecture en flux du corps, avant de le recevoir
+        self.url_adapter = wsgi_app.url_map.bind("localhost") if hasattr(wsgi_app, "url_map") else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self.handle_http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self.handle_lifespan(receive, send)
+
+    async def handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                self.stream_executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def endpoint(self, scope):
+        """Endpoint Flask de la requête (None si aucune route ne correspond)."""
+        if self.url_adapter is None:
+            return None
+        try:
+            return self.url_adapter.match(scope["path"], scope["method"])[0]
+        except HTTPException:
+            return None
+
+    async def read_body(self, receive, limit):
+        """Lit le corps complet : (corps, taille reçue) ; None si le client s'est déconnecté.
+
+        Au-delà de `limit` octets, la réception s'arrête et le corps est vide.
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                return b"", size
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks), size
+
+    async def handle_http(self, scope, receive, send):
+        endpoint = self.endpoint(scope)
+        limit = body_limit(endpoint)
+        announced = content_length(scope)
+        too_large = None
+        if ROUTE_CLASSES.get(endpoint) == 'bulk':
+            # Import : lu en flux par la route, dans le pool de threads
+            body = io.BufferedReader(ReceiveStream(receive, asyncio.get_running_loop()), STREAM_BUFFER_SIZE)
+        elif announced is not None and announced > limit:
+            body = b""  # refusé par l'app (413) sans rien lire
+        else:
+            received = await self.read_body(receive, limit)
+            if received is None:
+                return
+            body, size = received
+            if size > limit:
+                too_large = size
+
+        if self.inline and isinstance(body, bytes) and len(body) <= INLINE_BODY_LIMIT:
+            run = self.run_inline
+        else:
+            run = partial(asyncio.get_running_loop().run_in_executor, self.executor)
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                                   for name, value in headers]
+            return response.setdefault("written", []).append
+
+        environ = build_environ(scope, body)
+        if too_large is not None:
+            # Taille reçue en Content-Length : l'app répond 413 avant de lire le corps
+            environ["CONTENT_LENGTH"] = str(too_large)
+        iterable = await run(partial(self.wsgi_app, environ, start_response))
+        if (b"content-type", b"text/event-stream") in ((name, value.split(b";", 1)[0])
+                                                      for name, value in response["headers"]):
+            run = partial(asyncio.get_running_loop().run_in_executor, self.stream_executor)
+        try:
+            chunks = iter(iterable)
+            started = False
+            while True:
+                chunk = await run(partial(next, chunks, None))
+                if not started:
+                    await send({"type": "http.response.start", "status": response["status"],
+                                "headers": response["headers"]})
+                    started = True
+                    for written in response.get("written", ()):
+                        await send({"type": "http.response.body", "body": written, "more_body": True})
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                await run(close)
+
+    @staticmethod
+    async def run_inline(func):
+        return func()
+
+
+application = AsgiApp(app)
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:  # uvicorn est optionnel
+        sys.exit("Le mode ASGI nécessite un serveur ASGI : pip install uvicorn")
+    uvicorn.run("asgi:application", port=5000)
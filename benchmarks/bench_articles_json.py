@@ -0,0 +1,62 @@
+# benchmarks/bench_articles_json.py
+# Débit de GET /articles (liste complète et pages de 100) sur 100k articles,
+# avec le fournisseur JSON standard puis avec orjson + cache de sérialisation.
+#
+# Usage : python benchmarks/bench_articles_json.py [nombre_d_articles]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import app, storage, articles_response_cache
+from json_provider import install_json_provider
+
+FULL_REQUESTS = 3
+PAGE_REQUESTS = 2_000
+
+
+def seed(count):
+    storage.clear()
+    user = storage.add_user('bench', 'bench@example.com')
+    storage.add_articles((user.id, f'title {i}', f'content {i}', ['python', 'flask'], None) for i in range(count))
+
+
+def reset_cache():
+    for article in storage.articles.values():
+        article._json = None
+
+
+def timed(label, requests, func):
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<28} {requests / elapsed:10.2f} req/s")
+
+
+def get(client, url):
+    # On mesure la sérialisation, pas le cache de réponses HTTP
+    articles_response_cache.clear()
+    return client.get(url).data
+
+
+def run(client, label):
+    print(label)
+    reset_cache()
+    timed("GET /articles (cache froid)", 1, lambda: get(client, '/articles'))
+    timed("GET /articles (cache chaud)", FULL_REQUESTS, lambda: get(client, '/articles'))
+    timed("GET /articles?limit=100", PAGE_REQUESTS, lambda: get(client, '/articles?limit=100'))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    seed(count)
+    client = app.test_client()
+
+    app.json = DefaultJSONProvider(app)
+    run(client, "json (stdlib)")
+    install_json_provider(app)
+    run(client, f"{type(app.json).__name__}")
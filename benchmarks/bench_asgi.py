@@ -0,0 +1,147 @@
+# benchmarks/bench_asgi.py
+# Test de charge : compare les modes WSGI (serveur threadé de Werkzeug) et
+# ASGI (uvicorn + asgi.application) en requêtes/s et latence p50/p99, avec
+# N connexions simultanées qui enchaînent lectures et écritures (keep-alive
+# côté ASGI ; le serveur de Werkzeug ferme la connexion après chaque réponse).
+#
+# Usage : python benchmarks/bench_asgi.py [connexions] [durée_en_secondes]
+# (le mode ASGI nécessite uvicorn : pip install uvicorn)
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_USERS = 500
+
+SERVERS = {
+    "wsgi": [sys.executable, "-c",
+             "import sys; from werkzeug.serving import run_simple; from app import app; "
+             "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"],
+    "asgi": [sys.executable, "-c",
+             "import sys, uvicorn; "
+             "uvicorn.run('asgi:application', host='127.0.0.1', port=int(sys.argv[1]), "
+             "log_level='warning', access_log=False, backlog=4096)"],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"le serveur n'écoute pas sur le port {port}")
+
+
+async def http_request(reader, writer, method, path, body=None):
+    """Envoie une requête HTTP/1.1 et lit la réponse (Content-Length ou chunked).
+
+    Retourne (status, keep_alive) : keep_alive est faux si le serveur ferme la connexion.
+    """
+    payload = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(payload)}\r\n"
+    if payload:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode() + b"\r\n" + payload)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connexion fermée par le serveur")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(port, worker, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    try:
+        while time.monotonic() < deadline:
+            i += 1
+            if i % 10 == 0:
+                method, path, body = "POST", "/users", {"name": "load", "email": f"w{worker}-{i}@example.com"}
+            elif i % 2:
+                method, path, body = "GET", f"/users/{i % SEED_USERS + 1}", None
+            else:
+                method, path, body = "GET", "/users?limit=20", None
+            start = time.perf_counter()
+            status, keep_alive = await http_request(reader, writer, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                errors.append(status)
+            if not keep_alive:  # serveur de Werkzeug : une connexion par requête
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except (OSError, asyncio.IncompleteReadError):
+        errors.append("connexion")
+    finally:
+        writer.close()
+
+
+async def load(port, connections, duration):
+    # Données de départ (une connexion par requête, valable pour les deux serveurs)
+    for i in range(SEED_USERS):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await http_request(reader, writer, "POST", "/users", {"name": f"seed{i}", "email": f"seed{i}@example.com"})
+        writer.close()
+
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, worker, deadline, latencies, errors) for worker in range(connections)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def bench(mode, connections, duration):
+    port = free_port()
+    server = subprocess.Popen(SERVERS[mode] + [str(port)], cwd=ROOT,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        latencies, errors, elapsed = asyncio.run(load(port, connections, duration))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(f"{mode:<6} {connections:>6} conn.  {len(latencies) / elapsed:10,.0f} req/s"
+          f"   p50 {percentile(0.50):8.2f} ms   p99 {percentile(0.99):8.2f} ms   erreurs {len(errors)}")
+
+
+if __name__ == "__main__":
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    bench("wsgi", connections, duration)
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        print("asgi   ignoré : uvicorn n'est pas installé")
+    else:
+        bench("asgi", connections, duration)
@@ -0,0 +1,58 @@
+# benchmarks/bench_batch_reads.py
+# Affichage d'une liste d'articles avec leurs auteurs : N+1 requêtes
+# (GET /articles/<id> puis GET /users/<id> par article) contre une seule
+# lecture groupée GET /articles?ids=...&include=author.
+#
+# Usage : python benchmarks/bench_batch_reads.py [articles_par_liste] [nombre_de_listes]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, storage
+
+USERS = 10_000
+ARTICLES = 100_000
+
+
+def seed():
+    storage.clear()
+    storage.add_users([(f'user{i}', f'user{i}@example.com') for i in range(USERS)])
+    rng = random.Random(42)
+    storage.add_articles([(rng.randrange(USERS) + 1, f'Title {i}', 'Content', ['python'], None)
+                          for i in range(ARTICLES)])
+
+
+def one_by_one(client, ids):
+    for article_id in ids:
+        article = client.get(f'/articles/{article_id}').json
+        client.get(f"/users/{article['user_id']}")
+    return 2 * len(ids)
+
+
+def batched(client, ids):
+    client.get('/articles?include=author&ids=' + ','.join(map(str, ids)))
+    return 1
+
+
+def bench(label, fetch, lists):
+    client = app.test_client()
+    requests = 0
+    start = time.perf_counter()
+    for ids in lists:
+        requests += fetch(client, ids)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {len(lists) / elapsed:10,.1f} listes/s   {elapsed / len(lists) * 1000:8.2f} ms/liste"
+          f"   {requests // len(lists)} requête(s)/liste")
+
+
+if __name__ == '__main__':
+    per_list = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    seed()
+    rng = random.Random(7)
+    lists = [rng.sample(range(1, ARTICLES + 1), per_list) for _ in range(count)]
+    bench("N+1", one_by_one, lists)
+    bench("groupée", batched, lists)
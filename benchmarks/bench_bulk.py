@@ -0,0 +1,43 @@
+# benchmarks/bench_bulk.py
+# Mesure le chargement en masse via POST /users/bulk et POST /articles/bulk,
+# puis l'export complet via GET /export.
+#
+# Usage : python benchmarks/bench_bulk.py [nombre_d_articles]
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, storage
+
+USERS = 10_000
+
+
+def ndjson(records):
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {count:>10,} enr. en {elapsed:6.2f} s ({count / elapsed:,.0f} enr./s)")
+    return result
+
+
+if __name__ == '__main__':
+    articles = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    storage.clear()
+    client = app.test_client()
+
+    users_body = ndjson({'name': f'user{i}', 'email': f'user{i}@example.com'} for i in range(USERS))
+    articles_body = ndjson(
+        {'user_id': i % USERS + 1, 'title': f'title {i}', 'content': f'content {i}', 'tags': 'python,flask'}
+        for i in range(articles)
+    )
+
+    timed("POST /users/bulk", USERS, lambda: client.post('/users/bulk', data=users_body))
+    timed("POST /articles/bulk", articles, lambda: client.post('/articles/bulk', data=articles_body))
+    timed("GET /export", USERS + articles, lambda: sum(1 for _ in client.get('/export').response))
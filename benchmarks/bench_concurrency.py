@@ -0,0 +1,54 @@
+# benchmarks/bench_concurrency.py
+# Débit d'une charge mixte (90 % lectures, 10 % écritures) sur les backends
+# selon le nombre de threads, et contrôle d'intégrité à la fin de chaque passe.
+#
+# Usage : python benchmarks/bench_concurrency.py [opérations_par_thread]
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import open_storage
+
+THREAD_COUNTS = [1, 2, 4, 8]
+SEED_USERS = 1_000
+
+
+def workload(storage, worker, operations):
+    created = []
+    for i in range(operations):
+        if i % 10 == 0:
+            created.append(storage.add_user(f'w{worker}-{i}', f'w{worker}-{i}@example.com').id)
+            storage.add_article(created[-1], f'title {i}', 'content', ['bench'])
+        elif i % 10 < 5:
+            storage.get_user(i % SEED_USERS + 1)
+        else:
+            storage.list_users(after=i % SEED_USERS, limit=20)
+    return created
+
+
+def bench(url, operations):
+    print(url)
+    for threads in THREAD_COUNTS:
+        storage = open_storage(url)
+        storage.clear()
+        storage.add_users([(f'seed{i}', f'seed{i}@example.com') for i in range(SEED_USERS)])
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            results = list(executor.map(workload, [storage] * threads, range(threads), [operations] * threads))
+        elapsed = time.perf_counter() - start
+        ids = [user_id for created in results for user_id in created]
+        intact = len(set(ids)) == len(ids) and storage.count_users() == SEED_USERS + len(ids)
+        print(f"    {threads} thread(s) {threads * operations / elapsed:12,.0f} ops/s"
+              f"    intégrité : {'ok' if intact else 'ÉCHEC'}")
+        storage.close()
+
+
+if __name__ == '__main__':
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    bench('memory', operations)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bench('sqlite:///' + os.path.join(tmpdir, 'bench.db'), operations // 10)
@@ -0,0 +1,45 @@
+# benchmarks/bench_list_streaming.py
+# Temps jusqu'au premier octet et pic mémoire de GET /articles (liste complète)
+# en fonction du nombre d'articles : en streaming, les deux restent plats.
+#
+# Usage : python benchmarks/bench_list_streaming.py [taille1 taille2 ...]
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, storage
+
+DEFAULT_SIZES = [10_000, 100_000, 300_000]
+
+
+def seed(count):
+    storage.clear()
+    user = storage.add_user('bench', 'bench@example.com')
+    storage.add_articles((user.id, f'title {i}', f'content {i}', ['python'], None) for i in range(count))
+
+
+def measure(count):
+    seed(count)
+    client = app.test_client()
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get('/articles', buffered=False)
+    body = iter(response.response)
+    next(body)
+    first_byte = time.perf_counter() - start
+    for _ in body:
+        pass
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, total, peak
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        first_byte, total, peak = measure(size)
+        print(f"{size:>8} articles : TTFB {first_byte * 1000:7.1f} ms, total {total:6.2f} s, pic {peak / 1e6:7.1f} Mo")
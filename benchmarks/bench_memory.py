@@ -0,0 +1,55 @@
+# benchmarks/bench_memory.py
+# Compare l'empreinte mémoire par enregistrement : dict "historiques"
+# contre enregistrements à __slots__ (models.User / models.Article).
+#
+# Usage : python benchmarks/bench_memory.py [nombre_d_enregistrements]
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import User, UserInfos, Article, ArticleInfos
+
+TAGS = ['python', 'flask', 'java', 'rust', 'go']
+
+
+def user_dict(i):
+    return {'id': i, 'name': f'user{i}', 'email': f'user{i}@example.com'}
+
+
+def user_record(i):
+    return User(UserInfos(id=i, name=f'user{i}', email=f'user{i}@example.com'))
+
+
+def article_dict(i, now):
+    # Les tags arrivent d'un split() de la requête : une nouvelle chaîne par article
+    tags = ','.join(TAGS[:i % 3 + 1]).split(',')
+    return {'id': i, 'user_id': i, 'title': f'title {i}', 'content': f'content {i}', 'tags': tags, 'created_at': now}
+
+
+def article_record(i, now):
+    tags = ','.join(TAGS[:i % 3 + 1]).split(',')
+    return Article(ArticleInfos(id=i, user_id=i, title=f'title {i}', content=f'content {i}', tags=tags, created_at=now))
+
+
+def bytes_per_record(build, count):
+    tracemalloc.start()
+    records = [build(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size / count
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    now = datetime.now()
+    for label, build_dict, build_record in [
+        ('users', user_dict, user_record),
+        ('articles', lambda i: article_dict(i, now), lambda i: article_record(i, now)),
+    ]:
+        before = bytes_per_record(build_dict, count)
+        after = bytes_per_record(build_record, count)
+        print(f"{label:>8} : dict {before:7.1f} o/enr. -> slots {after:7.1f} o/enr. ({after / before:.0%})")
@@ -0,0 +1,33 @@
+# benchmarks/bench_metrics.py
+# Surcoût des métriques : requêtes/s avec METRICS_ENABLED=0 puis 1
+# (chaque mesure dans un processus neuf, via le client de test Flask).
+#
+# Usage : python benchmarks/bench_metrics.py [requêtes]
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE = """
+import sys, time
+from app import app
+client = app.test_client()
+for i in range(100):
+    client.post('/users', json={'name': f'user{i}', 'email': f'user{i}@example.com'})
+requests = int(sys.argv[1])
+for path in ('/users/1', '/users?limit=20'):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    print(f"{path:<18} {requests / (time.perf_counter() - start):10,.0f} req/s")
+"""
+
+if __name__ == '__main__':
+    requests = sys.argv[1] if len(sys.argv) > 1 else '20000'
+    for enabled in ('0', '1'):
+        print(f"METRICS_ENABLED={enabled}")
+        env = dict(os.environ, METRICS_ENABLED=enabled)
+        output = subprocess.run([sys.executable, '-c', MEASURE, requests], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        print("    " + output.strip().replace("\n", "\n    "))
@@ -0,0 +1,77 @@
+# benchmarks/bench_persistence.py
+# Persistance des stores en mémoire (journal + instantanés) :
+#   - débit d'écriture selon la politique de fsync, avec 1 et 8 threads ;
+#   - temps d'écriture d'un instantané et de reprise (instantané + fin du journal).
+#
+# Usage : python benchmarks/bench_persistence.py [nombre_d_enregistrements]
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import PersistentMemoryStorage
+
+TAGS = ['python', 'flask', 'java', 'rust', 'go']
+WRITES = {'always': 2_000, 'interval': 50_000, 'never': 50_000}
+TAIL = 50_000  # mutations après l'instantané, rejouées depuis le journal
+
+
+def bench_writes(policy, threads):
+    count = WRITES[policy]
+    with tempfile.TemporaryDirectory() as directory:
+        storage = PersistentMemoryStorage(directory, fsync=policy, snapshot_every=0)
+
+        def signup(worker):
+            for i in range(count // threads):
+                storage.add_user(f'user{i}', f'w{worker}-{i}@example.com')
+
+        workers = [threading.Thread(target=signup, args=(worker,)) for worker in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        storage.close()
+    print(f"    fsync={policy:<9} {threads} thread(s) {count / elapsed:12,.0f} écritures/s")
+
+
+def bench_recovery(records):
+    users = records * 4 // 5
+    articles = records - users
+    base = datetime(2024, 1, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        storage = PersistentMemoryStorage(directory, fsync='never', snapshot_every=0)
+        start = time.perf_counter()
+        storage.add_users([(f'user{i}', f'user{i}@example.com') for i in range(users)])
+        storage.add_articles([(i % users + 1, f'title {i}', f'content {i}', TAGS[:i % 3 + 1],
+                               base + timedelta(minutes=i)) for i in range(articles)])
+        print(f"    chargement de {records:,} enregistrements  {time.perf_counter() - start:8.2f} s")
+
+        start = time.perf_counter()
+        storage.snapshot()
+        print(f"    écriture de l'instantané              {time.perf_counter() - start:8.2f} s"
+              f"   ({os.path.getsize(os.path.join(directory, 'snapshot-00000002.bin')) / 1e6:,.0f} Mo)")
+        storage.add_users([(f'tail{i}', f'tail{i}@example.com') for i in range(TAIL)])
+        storage.close()
+
+        start = time.perf_counter()
+        recovered = PersistentMemoryStorage(directory)
+        elapsed = time.perf_counter() - start
+        assert recovered.count_users() == users + TAIL and recovered.count_articles() == articles
+        print(f"    reprise (instantané + {TAIL:,} mutations) {elapsed:8.2f} s")
+        recovered.close()
+
+
+if __name__ == '__main__':
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print("écritures")
+    for policy in WRITES:
+        for threads in (1, 8):
+            bench_writes(policy, threads)
+    print("reprise")
+    bench_recovery(records)
@@ -0,0 +1,69 @@
+# benchmarks/bench_ratelimit.py
+# Contrôle d'admission (ratelimit.py) :
+#   - surcoût par requête : limiteur désactivé, seaux en mémoire, seaux SQLite
+#     (limites assez hautes pour ne rien refuser) ;
+#   - client abusif : un client inonde POST /users avec les limites par
+#     défaut ; part des requêtes admises et latence des refus (429).
+# Chaque mesure tourne dans un processus neuf, via le client de test Flask.
+#
+# Usage : python benchmarks/bench_ratelimit.py [requêtes]
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OVERHEAD = """
+import sys, time
+from app import app
+client = app.test_client()
+for i in range(100):
+    client.post('/users', json={'name': f'user{i}', 'email': f'user{i}@example.com'})
+requests = int(sys.argv[1])
+for path in ('/users/1', '/users?limit=20'):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    print(f"{path:<18} {requests / (time.perf_counter() - start):10,.0f} req/s")
+"""
+
+FLOOD = """
+import sys, time
+from app import app
+client = app.test_client()
+requests = int(sys.argv[1])
+latencies = {}
+start = time.perf_counter()
+for i in range(requests):
+    begin = time.perf_counter()
+    status = client.post('/users', json={'name': f'user{i}', 'email': f'user{i}@example.com'}).status_code
+    latencies.setdefault(status, []).append(time.perf_counter() - begin)
+elapsed = time.perf_counter() - start
+for status, values in sorted(latencies.items()):
+    values.sort()
+    p99 = values[int(len(values) * 0.99) - 1] * 1000 if len(values) >= 100 else values[-1] * 1000
+    print(f"{status}  {len(values):8,} requêtes   p50 {values[len(values) // 2] * 1000:7.3f} ms   p99 {p99:7.3f} ms")
+print(f"en {elapsed:.2f} s")
+"""
+
+
+def run(code, requests, **env):
+    output = subprocess.run([sys.executable, '-c', code, requests], cwd=ROOT, env=dict(os.environ, **env),
+                            capture_output=True, text=True, check=True).stdout
+    print("    " + output.strip().replace("\n", "\n    "))
+
+
+if __name__ == '__main__':
+    requests = sys.argv[1] if len(sys.argv) > 1 else '20000'
+    high = 'read=1000000:1000000,list=1000000:1000000,write=1000000:1000000'
+    with tempfile.TemporaryDirectory() as tmpdir:
+        backends = [('désactivé', {'RATE_LIMIT_ENABLED': '0'}),
+                    ('memory', {'RATE_LIMIT_ENABLED': '1', 'RATE_LIMITS': high}),
+                    ('sqlite', {'RATE_LIMIT_ENABLED': '1', 'RATE_LIMITS': high,
+                                'RATE_LIMIT_BACKEND': 'sqlite:///' + os.path.join(tmpdir, 'limits.db')})]
+        for label, env in backends:
+            print(f"Surcoût, limiteur {label}")
+            run(OVERHEAD, requests, METRICS_ENABLED='0', **env)
+        print("Client abusif sur POST /users (limites par défaut, seaux en mémoire)")
+        run(FLOOD, requests, METRICS_ENABLED='0', RATE_LIMIT_ENABLED='1')
@@ -0,0 +1,363 @@
+# benchmarks/bench_routes.py
+# Suite de benchmarks reproductible : pour chaque taille de jeu de données,
+# remplit les stores (données déterministes, graine fixe) puis mesure chaque
+# route de l'API : opérations/s et latences p50/p90/p99/max.
+#
+# Une taille N = N articles et N/10 utilisateurs (au moins 10).
+# Deux modes :
+#   inprocess  client de test Flask, dans ce processus (pas de réseau)
+#   http       vraies requêtes HTTP ; sans --url, un serveur (server.py, un
+#              worker, stockage en mémoire) est relancé pour chaque taille
+# Les résultats sont écrits en JSON (--output) pour comparer deux commits
+# (--compare ancien.json).
+#
+# Usage :
+#   python benchmarks/bench_routes.py --sizes 1000 100000 1000000 --output results.json
+#   python benchmarks/bench_routes.py --mode http --concurrency 8 --compare results.json
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+TAGS = [f"tag{i}" for i in range(50)]
+WORDS = ["python", "flask", "api", "cache", "index", "search", "stream", "json", "query", "storage",
+         "thread", "latency", "memory", "cursor", "bulk", "export", "metrics", "profile", "server", "worker"]
+BASE_DATE = datetime(2024, 1, 1)
+SEED_CHUNK = 50_000  # lignes NDJSON par requête de chargement (mode http)
+
+
+# --- Jeu de données ---
+
+class Dataset:
+    """Données déterministes d'une taille donnée (même graine -> mêmes requêtes)."""
+
+    def __init__(self, size, seed):
+        self.articles = size
+        self.users = max(size // 10, 10)
+        self.seed = seed
+
+    def user_rows(self):
+        for i in range(self.users):
+            yield {"name": f"user{i}", "email": f"user{i}@example.com"}
+
+    def article_rows(self):
+        rng = random.Random(self.seed)
+        for i in range(self.articles):
+            yield {
+                "user_id": rng.randrange(self.users) + 1,
+                "title": " ".join(rng.choices(WORDS, k=3)),
+                "content": " ".join(rng.choices(WORDS, k=20)),
+                "tags": rng.sample(TAGS, rng.randint(1, 3)),
+                "created_at": (BASE_DATE + timedelta(minutes=i)).isoformat(),
+            }
+
+    def random_date(self, rng):
+        return (BASE_DATE + timedelta(minutes=rng.randrange(self.articles))).strftime("%Y-%m-%d")
+
+
+def json_body(data):
+    return json.dumps(data).encode()
+
+
+def ndjson_body(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+# --- Scénarios : (nom, fabrique de requêtes, nombre max d'opérations) ---
+# Une fabrique reçoit (rng, dataset, i) et retourne (méthode, chemin, corps).
+# L'ordre compte : lectures d'abord, puis écritures, suppressions en dernier.
+
+def scenarios(dataset):
+    users, articles = dataset.users, dataset.articles
+    run_id = random.Random(dataset.seed).randrange(10 ** 9)
+    return [
+        ("GET /users/<id>", lambda rng, i: ("GET", f"/users/{rng.randrange(users) + 1}", None), None),
+        ("GET /users?limit=100", lambda rng, i: ("GET", "/users?limit=100", None), None),
+        ("GET /users (complet)", lambda rng, i: ("GET", "/users", None), 20),
+        ("GET /users/<id>/articles", lambda rng, i: ("GET", f"/users/{rng.randrange(users) + 1}/articles", None), None),
+        ("GET /articles/<id>", lambda rng, i: ("GET", f"/articles/{rng.randrange(articles) + 1}", None), None),
+        ("GET /articles?limit=100", lambda rng, i: ("GET", f"/articles?limit={rng.randint(90, 110)}", None), None),
+        ("GET /articles?tag", lambda rng, i: ("GET", f"/articles?tag={rng.choice(TAGS)}&limit=100", None), None),
+        ("GET /articles?date_after", lambda rng, i: (
+            "GET", f"/articles?date_after={dataset.random_date(rng)}&limit=100", None), None),
+        ("GET /articles?tag&date_after&order", lambda rng, i: (
+            "GET", f"/articles?tag={rng.choice(TAGS)}&date_after={dataset.random_date(rng)}"
+                   f"&order=created_at&limit=100", None), None),
+        ("GET /articles (complet)", lambda rng, i: ("GET", "/articles", None), 10),
+        ("GET /users?ids (100)", lambda rng, i: (
+            "GET", "/users?ids=" + ",".join(str(rng.randrange(users) + 1) for _ in range(100)), None), None),
+        ("GET /articles?ids&include=author (100)", lambda rng, i: (
+            "GET", "/articles?include=author&ids=" + ",".join(str(rng.randrange(articles) + 1) for _ in range(100)),
+            None), None),
+        ("GET /articles/search", lambda rng, i: (
+            "GET", f"/articles/search?q={rng.choice(WORDS)}+{rng.choice(WORDS)[:3]}*", None), None),
+        ("GET /export", lambda rng, i: ("GET", "/export", None), 3),
+        ("GET /tags?limit=10", lambda rng, i: ("GET", "/tags?limit=10", None), None),
+        ("GET /tags/<tag>", lambda rng, i: ("GET", f"/tags/{rng.choice(TAGS)}", None), None),
+        ("GET /users/<id>/stats", lambda rng, i: ("GET", f"/users/{rng.randrange(users) + 1}/stats", None), None),
+        # Sans since : les 100 plus anciens changements encore dans l'anneau
+        ("GET /changes?limit=100", lambda rng, i: ("GET", "/changes?limit=100", None), None),
+        ("POST /users", lambda rng, i: (
+            "POST", "/users", json_body({"name": "bench", "email": f"bench{run_id}-{i}@example.com"})), None),
+        ("PUT /users/<id>", lambda rng, i: (
+            "PUT", f"/users/{rng.randrange(users) + 1}", json_body({"name": f"renamed{i}"})), None),
+        ("POST /articles", lambda rng, i: ("POST", "/articles", json_body({
+            "user_id": rng.randrange(users) + 1, "title": "bench", "content": "bench content",
+            "tags": ",".join(rng.sample(TAGS, 2))})), None),
+        ("POST /users/bulk (100)", lambda rng, i: ("POST", "/users/bulk", ndjson_body(
+            {"name": "bulk", "email": f"bulk{run_id}-{i}-{n}@example.com"} for n in range(100))), None),
+        ("POST /articles/bulk (100)", lambda rng, i: ("POST", "/articles/bulk", ndjson_body(
+            {"user_id": rng.randrange(users) + 1, "title": "bulk", "content": "bulk"} for _ in range(100))), None),
+        # Chaque suppression retire un utilisateur distinct (et ses articles)
+        ("DELETE /users/<id>", lambda rng, i: ("DELETE", f"/users/{users - i}", None), users // 2),
+    ]
+
+
+# --- Clients ---
+
+class InProcessClient:
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, data=body,
+                                    content_type="application/json" if body else None)
+        for _ in response.response:  # consomme aussi les corps streamés
+            pass
+        response.close()
+        return response.status_code
+
+
+class HttpClient:
+    """Une connexion HTTP/1.1 par thread, rouverte si le serveur la ferme."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=300)
+        return conn
+
+    def request(self, method, path, body):
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body,
+                             headers={"Content-Type": "application/json"} if body else {})
+                response = conn.getresponse()
+                response.read()
+                if response.will_close:
+                    conn.close()
+                    self.local.conn = None
+                return response.status
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                self.local.conn = None
+                if attempt:
+                    raise
+
+
+# --- Chargement des données ---
+
+def seed_inprocess(dataset):
+    from app import storage
+    storage.clear()
+    storage.add_users([(row["name"], row["email"]) for row in dataset.user_rows()])
+    rows = dataset.article_rows()
+    while True:
+        batch = [(row["user_id"], row["title"], row["content"], row["tags"],
+                  datetime.fromisoformat(row["created_at"])) for _, row in zip(range(SEED_CHUNK), rows)]
+        if not batch:
+            break
+        storage.add_articles(batch)
+
+
+def seed_http(client, dataset):
+    for path, rows in (("/users/bulk", dataset.user_rows()), ("/articles/bulk", dataset.article_rows())):
+        while True:
+            chunk = [row for _, row in zip(range(SEED_CHUNK), rows)]
+            if not chunk:
+                break
+            status = client.request("POST", path, ndjson_body(chunk))
+            if status not in (200, 201):
+                raise RuntimeError(f"chargement {path} : statut {status}")
+
+
+def start_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "server.py", "--workers", "1", "--bind", f"127.0.0.1:{port}", "--storage", "memory"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, METRICS_ENABLED=os.environ.get("METRICS_ENABLED", "0")),
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("le serveur de benchmark ne démarre pas")
+
+
+# --- Mesure ---
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_scenario(client, dataset, name, make_request, max_ops, duration, concurrency, seed):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(max_ops if max_ops is not None else sys.maxsize))
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = random.Random(f"{seed}-{name}-{worker_id}")
+        local = []
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            method, path, body = make_request(rng, i)
+            start = time.perf_counter()
+            status = client.request(method, path, body)
+            local.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(worker_id,)) for worker_id in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "size": dataset.articles,
+        "route": name,
+        "ops": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)) if latencies else None,
+        "p90_ms": ms(percentile(latencies, 0.90)) if latencies else None,
+        "p99_ms": ms(percentile(latencies, 0.99)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "errors": len(errors),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result, baseline=None):
+    line = (f"{result['size']:>9,}  {result['route']:<36} {result['ops_per_sec']:>10,.0f} ops/s"
+            f"   p50 {result['p50_ms'] or 0:8.3f}   p99 {result['p99_ms'] or 0:8.3f} ms")
+    if result["errors"]:
+        line += f"   erreurs {result['errors']}"
+    if baseline and baseline.get("ops_per_sec"):
+        line += f"   {result['ops_per_sec'] / baseline['ops_per_sec'] - 1:+7.1%}"
+    print(line, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de toutes les routes de l'API.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--url", help="serveur à mesurer en mode http (vide au départ) ; sinon server.py est lancé")
+    parser.add_argument("--concurrency", type=int, default=1, help="clients simultanés (mode http)")
+    parser.add_argument("--duration", type=float, default=2.0, help="durée max par route, en secondes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--routes", nargs="*", help="ne mesure que les routes contenant ces textes")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--compare", help="résultats JSON de référence (écart d'ops/s affiché)")
+    options = parser.parse_args(argv)
+    if options.mode == "inprocess" and options.concurrency != 1:
+        parser.error("--concurrency n'est disponible qu'en mode http")
+
+    baseline = {}
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = {(r["size"], r["route"]): r for r in json.load(baseline_file)["results"]}
+
+    results = []
+    for size in options.sizes:
+        dataset = Dataset(size, options.seed)
+        server = None
+        if options.mode == "inprocess":
+            client = InProcessClient()
+            seed_inprocess(dataset)
+        else:
+            url = options.url
+            if url is None:
+                server, url = start_server()
+            client = HttpClient(url)
+            seed_http(client, dataset)
+        try:
+            for name, make_request, max_ops in scenarios(dataset):
+                if options.routes and not any(text in name for text in options.routes):
+                    continue
+                result = run_scenario(client, dataset, name, make_request, max_ops,
+                                      options.duration, options.concurrency, options.seed)
+                results.append(result)
+                print_result(result, baseline.get((size, name)))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    if options.output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "mode": options.mode,
+                "concurrency": options.concurrency,
+                "duration": options.duration,
+                "seed": options.seed,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "storage": (os.environ.get("STORAGE_URL", "memory") if options.mode == "inprocess"
+                            else options.url or "server.py --storage memory"),
+            },
+            "results": results,
+        }
+        with open(options.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
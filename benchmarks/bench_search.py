@@ -0,0 +1,54 @@
+# benchmarks/bench_search.py
+# Mesure la recherche plein texte des deux backends
+# (index inversé en mémoire, FTS5 pour SQLite) : terme exact, préfixe, ET.
+# Un terme seul reste sous la milliseconde quelle que soit la taille ; un ET
+# de termes fréquents (tous les mots du corpus le sont ici) croît avec elle.
+#
+# Usage : python benchmarks/bench_search.py [nombre_d_articles] [--memory-only]
+#         python benchmarks/bench_search.py 1000000 --memory-only   (cible : 1M d'articles)
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import open_storage
+
+WORDS = ['python', 'flask', 'java', 'rust', 'go', 'api', 'index', 'cache', 'search', 'storage',
+         'thread', 'process', 'async', 'stream', 'json', 'query', 'cursor', 'benchmark', 'latency', 'memory']
+QUERIES = ['python', 'pyth*', 'flask api', 'cach* stream', 'rust memory latency', 's*']
+SEARCHES = 20
+LOAD_BATCH = 100_000
+
+
+def bench(url, articles):
+    print(url)
+    storage = open_storage(url)
+    rng = random.Random(42)
+    user = storage.add_user('bench', 'bench@example.com')
+    for start in range(0, articles, LOAD_BATCH):
+        storage.add_articles([
+            (user.id, ' '.join(rng.choices(WORDS, k=4)), ' '.join(rng.choices(WORDS, k=60)), [], None)
+            for _ in range(min(LOAD_BATCH, articles - start))
+        ])
+    for query in QUERIES:
+        timings = []
+        for _ in range(SEARCHES):
+            start = time.perf_counter()
+            storage.search_articles(query, limit=20)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"    {query!r:<24} médiane {timings[len(timings) // 2] * 1000:9.3f} ms"
+              f"   max {timings[-1] * 1000:9.3f} ms")
+    storage.close()
+
+
+if __name__ == '__main__':
+    arguments = [argument for argument in sys.argv[1:] if argument != '--memory-only']
+    articles = int(arguments[0]) if arguments else 20_000
+    bench('memory', articles)
+    if '--memory-only' not in sys.argv:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bench('sqlite:///' + os.path.join(tmpdir, 'bench.db'), articles)
@@ -0,0 +1,38 @@
+# benchmarks/bench_signup.py
+# Mesure la latence de POST /users en fonction du nombre d'utilisateurs existants.
+# Avec l'index email, la latence doit rester plate de 1k à 1M utilisateurs.
+#
+# Usage : python benchmarks/bench_signup.py [taille1 taille2 ...]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, users_db, articles_db
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SIGNUPS = 2_000
+
+
+def seed_users(count):
+    users_db.clear()
+    articles_db.clear()
+    for user_id in range(1, count + 1):
+        users_db[user_id] = {'id': user_id, 'name': f'user{user_id}', 'email': f'user{user_id}@example.com'}
+
+
+def bench_signup(count):
+    seed_users(count)
+    client = app.test_client()
+    start = time.perf_counter()
+    for i in range(SIGNUPS):
+        client.post('/users', json={'name': 'new', 'email': f'new{i}@bench.com'})
+    elapsed = time.perf_counter() - start
+    return elapsed / SIGNUPS * 1e6
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        print(f"{size:>10} utilisateurs : {bench_signup(size):8.1f} µs / signup")
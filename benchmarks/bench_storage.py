@@ -0,0 +1,62 @@
+# benchmarks/bench_storage.py
+# Compare le débit des backends MemoryStorage et SQLiteStorage
+# (écritures, lectures par id, requêtes filtrées paginées).
+#
+# Usage : python benchmarks/bench_storage.py [nombre_d_articles]
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import open_storage
+
+TAGS = ['python', 'flask', 'java', 'rust', 'go']
+USERS = 1_000
+READS = 20_000
+QUERIES = 2_000
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<28} {count / elapsed:12,.0f} ops/s")
+
+
+def bench(url, articles):
+    print(url)
+    storage = open_storage(url)
+    base = datetime.now() - timedelta(days=365)
+
+    def add_users():
+        for i in range(USERS):
+            storage.add_user(f'user{i}', f'user{i}@example.com')
+
+    def add_articles():
+        for i in range(articles):
+            storage.add_article(i % USERS + 1, f'title {i}', f'content {i}', TAGS[:i % 3 + 1],
+                                created_at=base + timedelta(minutes=i))
+
+    def get_articles():
+        for i in range(READS):
+            storage.get_article(i % articles + 1)
+
+    def query_articles():
+        for i in range(QUERIES):
+            storage.query_articles(tag=TAGS[i % 3], date_after=base + timedelta(minutes=i), limit=50)
+
+    timed("add_user", USERS, add_users)
+    timed("add_article", articles, add_articles)
+    timed("get_article", READS, get_articles)
+    timed("query_articles (tag+date, 50)", QUERIES, query_articles)
+    storage.close()
+
+
+if __name__ == '__main__':
+    articles = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    bench('memory', articles)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bench('sqlite:///' + os.path.join(tmpdir, 'bench.db'), articles)
@@ -0,0 +1,43 @@
+# benchmarks/bench_workers.py
+# Débit de server.py selon le nombre de workers (stockage SQLite partagé),
+# avec la charge mixte de bench_asgi.py.
+#
+# Usage : python benchmarks/bench_workers.py [connexions] [durée_en_secondes]
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_asgi import ROOT, free_port, load, wait_for_port
+
+WORKER_COUNTS = sorted({1, 2, 4, os.cpu_count() or 1})
+
+
+def bench(workers, connections, duration, tmpdir):
+    port = free_port()
+    db_path = os.path.join(tmpdir, f"bench-{workers}.db")
+    server = subprocess.Popen(
+        [sys.executable, "server.py", "--workers", str(workers), "--bind", f"127.0.0.1:{port}",
+         "--storage", f"sqlite:///{db_path}", "--preload"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        latencies, errors, elapsed = asyncio.run(load(port, connections, duration))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{workers:>3} worker(s)  {len(latencies) / elapsed:10,.0f} req/s   p99 {p99:8.2f} ms   erreurs {len(errors)}")
+
+
+if __name__ == "__main__":
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for workers in WORKER_COUNTS:
+            bench(workers, connections, duration, tmpdir)
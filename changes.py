@@ -0,0 +1,121 @@
+# changes.py
+# Flux des mutations du stockage, pour la réplication incrémentale :
+# GET /changes?since=N (pages) et GET /changes/stream (server-sent events).
+#
+# Chaque mutation reçoit un numéro de séquence strictement croissant et est
+# gardée dans un anneau de taille fixe : les plus anciennes sont évincées.
+# Un consommateur trop en retard (ou dont le numéro vient d'un processus
+# précédent) reçoit ChangesExpired et doit se resynchroniser par les routes
+# de liste. La séquence part de l'horloge (µs) au démarrage : elle reste
+# croissante d'un redémarrage à l'autre. Aucun numéro ne vaut 0 : since=0
+# signifie, sur les deux flux, « depuis le plus ancien changement gardé ».
+# ChangeFeed est propre au processus : avec plusieurs workers (server.py),
+# chacun ne verrait que ses propres écritures. Sur un stockage partagé,
+# SharedChangeFeed lit le journal que le stockage écrit dans la transaction
+# de chaque mutation : mêmes numéros pour tous les workers.
+
+import json
+import threading
+import time
+
+DEFAULT_CAPACITY = 10_000
+
+
+class ChangesExpired(Exception):
+    """Les changements demandés ont été évincés de l'anneau."""
+
+    def __init__(self, first_seq):
+        super().__init__(f"changes before {first_seq} are no longer available")
+        self.first_seq = first_seq
+
+
+class ChangeFeed:
+    """Anneau borné de changements {"seq", "type", "op", "id", "data"}."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self.start_seq = time.time_ns() // 1000  # dernier numéro "avant" le premier changement
+        self.last_seq = self.start_seq
+        self._condition = threading.Condition(threading.Lock())
+
+    @property
+    def first_seq(self):
+        """Plus petit numéro encore disponible (last_seq + 1 si l'anneau est vide)."""
+        return max(self.start_seq, self.last_seq - self.capacity) + 1
+
+    def publish(self, kind, op, record_id, data=None):
+        """Ajoute un changement et réveille les lecteurs en attente. Retourne son numéro."""
+        with self._condition:
+            seq = self.last_seq + 1
+            self._ring[seq % self.capacity] = {"seq": seq, "type": kind, "op": op, "id": record_id, "data": data}
+            self.last_seq = seq
+            self._condition.notify_all()
+        return seq
+
+    def since(self, seq=None, limit=None):
+        """Changements de numéro > `seq` (tous ceux de l'anneau si None ou 0), au plus `limit`.
+
+        Lève ChangesExpired si des changements après `seq` ont déjà été évincés,
+        ou si `seq` n'a jamais été attribué (numéro d'un autre processus).
+        """
+        with self._condition:
+            first_seq = self.first_seq
+            if not seq:
+                seq = first_seq - 1
+            elif seq < first_seq - 1 or seq > self.last_seq:
+                raise ChangesExpired(first_seq)
+            end = self.last_seq if limit is None else min(self.last_seq, seq + limit)
+            ring, capacity = self._ring, self.capacity
+            return [ring[position % capacity] for position in range(seq + 1, end + 1)]
+
+    def wait(self, seq, timeout):
+        """Attend un changement de numéro > `seq` ; retourne faux à l'expiration du délai."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.last_seq > seq, timeout)
+
+
+class SharedChangeFeed:
+    """Même interface que ChangeFeed (sans publish), sur le journal d'un stockage partagé.
+
+    Le stockage (voir Storage.keep_changes) écrit et purge le journal ; une
+    attente est réveillée par notify() (écritures du processus, via
+    storage.on_change) ou, pour celles des autres workers, au plus tard après
+    POLL_INTERVAL secondes.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._condition = threading.Condition(threading.Lock())
+
+    @property
+    def first_seq(self):
+        return self.storage.changes_since(0, 0)[1]
+
+    @property
+    def last_seq(self):
+        return self.storage.changes_since(0, 0)[2]
+
+    def notify(self, *change):
+        with self._condition:
+            self._condition.notify_all()
+
+    def since(self, seq=None, limit=None):
+        rows, first_seq, last_seq = self.storage.changes_since(seq or 0, limit)
+        if seq and (seq < first_seq - 1 or seq > last_seq):
+            raise ChangesExpired(first_seq)
+        return [{"seq": change_seq, "type": kind, "op": op, "id": record_id,
+                 "data": json.loads(data) if data is not None else None}
+                for change_seq, kind, op, record_id, data in rows]
+
+    def wait(self, seq, timeout):
+        deadline = time.monotonic() + timeout
+        while self.last_seq <= seq:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._condition:
+                self._condition.wait(min(self.POLL_INTERVAL, remaining))
+        return True
@@ -0,0 +1,60 @@
+# connections.py
+# Connexions SQLite par thread (stockage, seaux de ratelimit.py).
+#
+# Chaque thread ouvre sa propre connexion à la première utilisation et la
+# garde dans un threading.local. Quand le thread se termine (le serveur
+# threadé de Werkzeug en démarre un par connexion client), le threading.local
+# libère son entrée et la connexion est fermée : rien ne s'accumule.
+
+import threading
+import weakref
+
+
+class _Slot:
+    """Entrée du threading.local ; sa libération à la fin du thread ferme la connexion."""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _release(connections, lock, conn):
+    with lock:
+        connections.discard(conn)
+    conn.close()
+
+
+class ThreadConnections:
+    """Une connexion par thread, ouverte par `connect()`, fermée avec son thread ou par close()."""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._local = threading.local()
+        self._open = set()  # connexions ouvertes, pour close()
+        self._lock = threading.Lock()
+
+    def get(self):
+        slot = getattr(self._local, 'slot', None)
+        if slot is None:
+            conn = self._connect()
+            slot = self._local.slot = _Slot(conn)
+            with self._lock:
+                self._open.add(conn)
+            # Le finaliseur ne référence pas self : le pool peut être libéré avant les threads
+            weakref.finalize(slot, _release, self._open, self._lock, conn)
+        return slot.conn
+
+    def __len__(self):
+        """Nombre de connexions ouvertes."""
+        with self._lock:
+            return len(self._open)
+
+    def close(self):
+        """Ferme toutes les connexions ; les threads en rouvriront une au besoin."""
+        with self._lock:
+            connections = list(self._open)
+            self._open.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
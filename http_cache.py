@@ -0,0 +1,109 @@
+# http_cache.py
+# Cache HTTP des lectures : requêtes conditionnelles (ETag / Last-Modified)
+# et cache en mémoire des corps de réponse, indexé par URL + version du stockage.
+
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+
+def is_not_modified(etag, last_modified):
+    """Vrai si le client possède déjà cette version (If-None-Match prioritaire)."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        # Last-Modified n'a qu'une précision à la seconde
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+class ResponseCache:
+    """Cache LRU borné de réponses JSON : (corps, en-têtes) par clé.
+
+    Les clés incluent la version du stockage : une écriture rend les anciennes
+    entrées inaccessibles, et le LRU finit par les évincer. Les en-têtes posés
+    par build() (Content-Type...) sont rejoués avec le corps.
+    """
+
+    def __init__(self, max_entries=256, max_body_size=1024 * 1024):
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Retourne (corps, en-têtes) ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, headers=()):
+        if len(body) > self.max_body_size:
+            return
+        with self._lock:
+            self._entries[key] = (body, tuple(headers))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def tee(self, key, chunks, headers=()):
+        """Relaie un corps en streaming et le met en cache s'il reste sous max_body_size."""
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                data = chunk.encode() if isinstance(chunk, str) else chunk
+                size += len(data)
+                if size > self.max_body_size:
+                    parts = None
+                else:
+                    parts.append(data)
+            yield chunk
+        if parts is not None:
+            self.put(key, b"".join(parts), headers)
+
+    def store(self, key, response):
+        """Met en cache le corps d'une réponse 200 (en le relayant si elle est streamée)."""
+        if response.status_code != 200:
+            return response
+        # Content-Length est recalculé à chaque service
+        headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+        if response.is_streamed:
+            response.response = self.tee(key, response.response, headers)
+        else:
+            self.put(key, response.get_data(), headers)
+        return response
+
+
+def conditional_response(app, etag, last_modified, build, cache=None, cache_key=None):
+    """Sert une lecture avec validateurs HTTP.
+
+    Répond 304 sans rien sérialiser si le client est à jour ; sinon reprend le
+    corps du cache de réponses ou appelle build(), qui retourne une réponse Flask.
+    """
+    if is_not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        entry = cache.get(cache_key) if cache is not None else None
+        if entry is not None:
+            body, headers = entry
+            response = Response(body, headers=headers)
+        else:
+            response = app.make_response(build())
+            if cache is not None:
+                cache.store(cache_key, response)
+    if response.status_code in (200, 304):
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+    return response
@@ -0,0 +1,49 @@
+# json_provider.py
+# Fournisseur JSON de Flask basé sur orjson, avec repli sur la bibliothèque standard.
+# La sortie reste identique octet pour octet à celle de DefaultJSONProvider
+# pour les données de l'API (chaînes, entiers, listes, dict, None, booléens).
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel
+    orjson = None
+
+COMPACT_SEPARATORS = (",", ":")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider dont le chemin compact (celui des réponses) passe par orjson.
+
+    orjson n'échappe pas les caractères non ASCII (ni DEL) comme le fait
+    ensure_ascii : dans ce cas, comme pour tout appel non compact ou avec des
+    options inconnues, on délègue à l'implémentation standard.
+    """
+
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                      | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get("separators") != COMPACT_SEPARATORS or len(kwargs) > 1 \
+                or not self.sort_keys or not self.ensure_ascii:
+            return super().dumps(obj, **kwargs)
+        try:
+            output = orjson.dumps(obj, default=self.default, option=self.ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().dumps(obj, **kwargs)
+        if not output.isascii() or b"\x7f" in output:
+            return super().dumps(obj, **kwargs)
+        return output.decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def install_json_provider(app):
+    """Installe OrjsonProvider sur l'application si orjson est disponible."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    return app.json
@@ -0,0 +1,61 @@
+# locks.py
+# Primitives de synchronisation des stores en mémoire.
+
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """Verrou lecteurs / rédacteur : lectures en parallèle, écritures exclusives.
+
+    Les rédacteurs sont prioritaires : dès qu'une écriture attend, les
+    nouvelles lectures patientent, pour qu'un flux continu de GET ne bloque
+    pas indéfiniment les écritures. Le verrou n'est pas réentrant.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
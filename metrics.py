@@ -0,0 +1,230 @@
+# metrics.py
+# Métriques de l'API au format texte de Prometheus (GET /metrics) :
+#   - histogramme de latence par route et compteur de requêtes par statut ;
+#   - histogrammes par étape (validation, stockage, sérialisation) ;
+#   - jauges évaluées au moment de la collecte (taille des stores, ...).
+# Profilage optionnel : un échantillon des requêtes tourne sous cProfile et
+# les statistiques des requêtes lentes sont écrites dans un répertoire.
+#
+# Désactivées, les métriques ne coûtent rien : aucun hook n'est installé et
+# timed() retourne la fonction décorée telle quelle.
+# Chaque processus a ses propres compteurs (un worker par scrape avec server.py).
+
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from flask import Response, g, request
+
+# Bornes (secondes) communes aux histogrammes de requêtes et d'étapes
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4"
+
+# Depuis Python 3.12, un seul profileur peut être actif par processus : une
+# requête échantillonnée pendant qu'une autre est profilée n'est pas profilée
+_profiler_lock = threading.Lock()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Histogramme à bornes fixes (compteurs par intervalle, cumulés à l'export)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier intervalle : +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[position] += 1
+            self.sum += value
+
+    def render(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels((*labels, ('le', bound)))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Registre des métriques d'une application Flask."""
+
+    def __init__(self, enabled=True, profile_slow_ms=None, profile_sample_rate=1.0, profile_dir="profiles"):
+        self.enabled = enabled
+        self.profile_slow = profile_slow_ms / 1000 if profile_slow_ms is not None else None
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_dir = profile_dir
+        self.request_latency = {}  # {(route, method): Histogram}
+        self.request_counts = {}   # {(route, method, status): nombre}
+        self.stage_latency = {}    # {stage: Histogram}
+        self.gauges = []           # [(nom, aide, fonction -> [(labels, valeur)])]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Configuration par variables d'environnement.
+
+        METRICS_ENABLED (1 par défaut), PROFILE_SLOW_MS (profilage désactivé si
+        absent), PROFILE_SAMPLE_RATE (1.0), PROFILE_DIR ("profiles").
+        """
+        slow_ms = environ.get("PROFILE_SLOW_MS")
+        return cls(
+            enabled=environ.get("METRICS_ENABLED", "1") not in ("0", "false", "no"),
+            profile_slow_ms=float(slow_ms) if slow_ms else None,
+            profile_sample_rate=float(environ.get("PROFILE_SAMPLE_RATE", "1.0")),
+            profile_dir=environ.get("PROFILE_DIR", "profiles"),
+        )
+
+    def _histogram(self, registry, key):
+        histogram = registry.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = registry.setdefault(key, Histogram())
+        return histogram
+
+    # --- Étapes ---
+    def observe_stage(self, stage, seconds):
+        self._histogram(self.stage_latency, stage).observe(seconds)
+
+    def timed(self, stage):
+        """Décorateur : mesure chaque appel de la fonction comme l'étape `stage`."""
+        def decorator(func):
+            if not self.enabled:
+                return func
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe_stage(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def instrument(self, obj, methods, prefix):
+        """Mesure les méthodes `methods` d'un objet (étapes "<prefix>.<méthode>")."""
+        if not self.enabled:
+            return obj
+        for name in methods:
+            setattr(obj, name, self.timed(f"{prefix}.{name}")(getattr(obj, name)))
+        return obj
+
+    # --- Jauges ---
+    def gauge(self, name, help_text, collect):
+        """Déclare une jauge ; `collect()` retourne [(labels, valeur), ...] à chaque collecte."""
+        self.gauges.append((name, help_text, collect))
+
+    # --- Requêtes ---
+    def install(self, app):
+        """Installe les hooks de mesure des requêtes et la route GET /metrics."""
+        app.add_url_rule("/metrics", "metrics", self.metrics_response, methods=["GET"])
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        if (self.profile_slow is not None and random.random() < self.profile_sample_rate
+                and _profiler_lock.acquire(blocking=False)):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # un autre outil de profilage est actif
+                _profiler_lock.release()
+                return
+            g.metrics_profiler = profiler
+
+    def _after_request(self, response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        method = request.method
+        self._histogram(self.request_latency, (route, method)).observe(elapsed)
+        key = (route, method, response.status_code)
+        with self._lock:
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+        profiler = self._stop_profiler()
+        if profiler is not None and elapsed >= self.profile_slow:
+            self._dump_profile(profiler, route, method, elapsed)
+        return response
+
+    def _teardown_request(self, exc):
+        # Requête interrompue par une exception : le profileur ne doit pas rester actif
+        self._stop_profiler()
+
+    @staticmethod
+    def _stop_profiler():
+        """Arrête le profileur de la requête (s'il y en a un) et libère la place."""
+        profiler = g.pop("metrics_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+        return profiler
+
+    def _dump_profile(self, profiler, route, method, elapsed):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{slug}-{elapsed * 1000:.0f}ms-{os.getpid()}.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+
+    # --- Export ---
+    def render(self):
+        lines = [
+            "# HELP app_request_duration_seconds Request latency by route.",
+            "# TYPE app_request_duration_seconds histogram",
+        ]
+        for (route, method), histogram in sorted(self.request_latency.items()):
+            lines += histogram.render("app_request_duration_seconds", (("route", route), ("method", method)))
+
+        lines += ["# HELP app_requests_total Requests by route and status.",
+                  "# TYPE app_requests_total counter"]
+        with self._lock:
+            counts = sorted(self.request_counts.items())
+        for (route, method, status), count in counts:
+            labels = (("route", route), ("method", method), ("status", status))
+            lines.append(f"app_requests_total{_format_labels(labels)} {count}")
+
+        lines += ["# HELP app_stage_duration_seconds Time spent in each stage of request handling.",
+                  "# TYPE app_stage_duration_seconds histogram"]
+        for stage, histogram in sorted(self.stage_latency.items()):
+            lines += histogram.render("app_stage_duration_seconds", (("stage", stage),))
+
+        for name, help_text, collect in self.gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, value in collect():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def metrics_response(self):
+        return Response(self.render(), mimetype=PROMETHEUS_MIMETYPE)
@@ -1,50 +1,104 @@
 # models.py
-# Ce fichier pourrait contenir des classes pour User et Article
-# par exemple, pour valider les données ou gérer la persistance
+# Enregistrements compacts (__slots__) pour les utilisateurs et les articles.
+# Les stores de `store.py` conservent ces objets plutôt que des dict ;
+# la conversion en dict (`to_dict`) n'a lieu qu'au moment de la sérialisation.
 
+import sys
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 
+@dataclass
 class UserInfos:
     id: int
     name: str
     email: str
 
-class User:
+class Record:
+    """Base des enregistrements : accès style dict conservé pour le code existant.
+
+    `_json` garde la forme sérialisée de la réponse (voir app.record_json) ;
+    toute écriture d'un champ l'invalide. `_version` est la version du
+    stockage lors de la dernière modification (voir store.IndexedStore).
+    """
+    __slots__ = ('_json', '_version')
+
+    def __setattr__(self, key, value):
+        object.__setattr__(self, key, value)
+        if key[0] != '_':
+            object.__setattr__(self, '_json', None)
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+class User(Record):
+    __slots__ = ('id', 'name', 'email')
+
     def __init__(self, infos: UserInfos):
-        self.id = infos.id
-        self.name = infos.name
-        self.email = infos.email
+        # object.__setattr__ : pas d'invalidation de _json à la construction
+        init = object.__setattr__
+        init(self, 'id', infos.id)
+        init(self, 'name', infos.name)
+        init(self, 'email', infos.email)
+        init(self, '_json', None)
+        init(self, '_version', 0)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(UserInfos(id=data['id'], name=data['name'], email=data['email']))
 
     def to_dict(self):
         return {'id': self.id, 'name': self.name, 'email': self.email}
 
+@dataclass
 class ArticleInfos:
     id: int
     user_id: int
     title: str
     content: str
     tags: Optional[list[str]] = None
-    created_at: Optional[datetime] = datetime.now()
+    created_at: datetime = field(default_factory=datetime.now)
+
+class Article(Record):
+    __slots__ = ('id', 'user_id', 'title', 'content', 'tags', 'created_at')
 
-class Article:
     def __init__(self, infos: ArticleInfos):
-        self.id = infos.id
-        self.user_id = infos.user_id
-        self.title = infos.title
-        self.content = infos.content
-        self.tags = infos.tags
-        self.created_at = infos.created_at
+        init = object.__setattr__
+        init(self, 'id', infos.id)
+        init(self, 'user_id', infos.user_id)
+        init(self, 'title', infos.title)
+        init(self, 'content', infos.content)
+        # Tuple de chaînes internées : un seul exemplaire de chaque tag en mémoire
+        init(self, 'tags', tuple(sys.intern(tag) for tag in infos.tags or ()))
+        init(self, 'created_at', infos.created_at)
+        init(self, '_json', None)
+        init(self, '_version', 0)
 
-    def to_dict(self):
+    @classmethod
+    def from_dict(cls, data):
+        return cls(ArticleInfos(
+            id=data['id'],
+            user_id=data['user_id'],
+            title=data['title'],
+            content=data['content'],
+            tags=data.get('tags'),
+            created_at=data.get('created_at') or datetime.now(),
+        ))
+
+    def to_dict(self, format_date=None):
+        """Sérialise l'article ; `format_date` remplace le format ISO par défaut."""
         return {
             'id': self.id,
             'user_id': self.user_id,
             'title': self.title,
             'content': self.content,
-            'tags': self.tags,
-            'created_at': self.created_at.isoformat() # Utiliser ISO format par défaut
+            'tags': list(self.tags),
+            'created_at': format_date(self.created_at) if format_date else self.created_at.isoformat()
         }
-
-# Pour l'instant, l'implémentation de `app.py` n'utilise pas ces classes directement.
-# C'est une opportunité de refactoring !
\ No newline at end of file
@@ -0,0 +1,321 @@
+# persistence.py
+# Persistance des stores en mémoire : journal d'écriture (WAL) en ajout seul
+# et instantanés binaires. Utilisé par storage.PersistentMemoryStorage.
+#
+# Un répertoire de données contient :
+#   wal-00000003.log       segments du journal, un enregistrement par mutation
+#   snapshot-00000003.bin  état complet au début du segment 3
+# La reprise charge le dernier instantané (via mmap) puis rejoue les segments
+# suivants. Les mutations rejouées sont idempotentes (ajout = écrasement,
+# suppression d'un id absent ignorée) : un instantané peut donc être écrit
+# pendant que les écritures continuent dans le segment suivant.
+
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+# --- Encodage binaire des mutations ---
+# Une mutation = des entiers (int64) puis des chaînes UTF-8 préfixées par leur longueur.
+
+OP_ADD_USER = 1     # id ; name, email
+OP_UPDATE_USER = 2  # id ; name, email ("" = inchangé)
+OP_DELETE_USER = 3  # id (et ses articles)
+OP_ADD_ARTICLE = 4  # id, user_id, created_at (µs), nombre de tags ; title, content, tags...
+OP_CLEAR = 5
+
+INT_COUNTS = {OP_ADD_USER: 1, OP_UPDATE_USER: 1, OP_DELETE_USER: 1, OP_ADD_ARTICLE: 4, OP_CLEAR: 0}
+STRING_COUNTS = {OP_ADD_USER: 2, OP_UPDATE_USER: 2, OP_DELETE_USER: 0, OP_ADD_ARTICLE: 2, OP_CLEAR: 0}
+TAG_COUNT = struct.Struct("<q")
+TAG_COUNT_OFFSET = 24  # 4e entier d'un article
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+WAL_FRAME = struct.Struct("<IIB")       # longueur, crc32, opération
+SNAPSHOT_FRAME = struct.Struct("<IB")   # longueur, opération
+SNAPSHOT_MAGIC = b"APISNAP\x01"
+SNAPSHOT_HEADER = struct.Struct("<qqqq")  # nb users, nb articles, dernier id user, dernier id article
+
+_STRUCTS = {}
+
+
+def _struct(ints, strings):
+    key = (ints, strings)
+    packer = _STRUCTS.get(key)
+    if packer is None:
+        packer = _STRUCTS[key] = struct.Struct(f"<{ints}q{strings}I")
+    return packer
+
+
+PACKERS = {op: _struct(INT_COUNTS[op], STRING_COUNTS[op]) for op in INT_COUNTS if op != OP_ADD_ARTICLE}
+
+
+def encode(op, ints, strings):
+    """Encode une mutation : (opération, charge utile)."""
+    data = [string.encode() for string in strings]
+    return op, _struct(len(ints), len(data)).pack(*ints, *map(len, data)) + b"".join(data)
+
+
+def decode(op, buffer, offset=0):
+    """Décode la charge utile d'une mutation : (entiers, chaînes)."""
+    packer = PACKERS.get(op)
+    if packer is None:  # article : le nombre de chaînes dépend du nombre de tags
+        tag_count = TAG_COUNT.unpack_from(buffer, offset + TAG_COUNT_OFFSET)[0]
+        packer = _struct(INT_COUNTS[op], STRING_COUNTS[op] + tag_count)
+    values = packer.unpack_from(buffer, offset)
+    offset += packer.size
+    int_count = INT_COUNTS[op]
+    strings = []
+    for length in values[int_count:]:
+        end = offset + length
+        strings.append(str(buffer[offset:end], "utf-8"))
+        offset = end
+    return values[:int_count], strings
+
+
+def encode_user(user):
+    return encode(OP_ADD_USER, (user.id,), (user.name, user.email))
+
+
+def encode_update_user(user_id, name, email):
+    return encode(OP_UPDATE_USER, (user_id,), (name or "", email or ""))
+
+
+def encode_delete_user(user_id):
+    return encode(OP_DELETE_USER, (user_id,), ())
+
+
+def encode_article(article):
+    created_at = (article.created_at - EPOCH) // ONE_MICROSECOND
+    return encode(OP_ADD_ARTICLE, (article.id, article.user_id, created_at, len(article.tags)),
+                  (article.title, article.content, *article.tags))
+
+
+def encode_clear():
+    return encode(OP_CLEAR, (), ())
+
+
+def article_created_at(microseconds):
+    return EPOCH + timedelta(microseconds=microseconds)
+
+
+# --- Fichiers du répertoire de données ---
+
+SEGMENT_RE = re.compile(r"^(wal|snapshot)-(\d{8})\.(log|bin)$")
+
+
+def wal_path(directory, segment):
+    return os.path.join(directory, f"wal-{segment:08d}.log")
+
+
+def snapshot_path(directory, segment):
+    return os.path.join(directory, f"snapshot-{segment:08d}.bin")
+
+
+def list_files(directory):
+    """Retourne (segments du journal, segments des instantanés), triés."""
+    wals, snapshots = [], []
+    for name in os.listdir(directory):
+        match = SEGMENT_RE.match(name)
+        if match:
+            (wals if match.group(1) == "wal" else snapshots).append(int(match.group(2)))
+    return sorted(wals), sorted(snapshots)
+
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# --- Journal ---
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class WriteAheadLog:
+    """Journal en ajout seul avec validation groupée (group commit).
+
+    append() ajoute une mutation au tampon et retourne son numéro d'ordre ;
+    commit(lsn) rend la mutation durable selon la politique `fsync` :
+      - "always"   : commit attend l'écriture et le fsync ; les threads qui
+                     valident en même temps partagent un seul fsync ;
+      - "interval" : un thread écrit et fait fsync toutes les `interval`
+                     secondes (une panne perd au plus cet intervalle) ;
+      - "never"    : même écriture périodique, sans fsync (le système décide).
+    """
+
+    MAX_BUFFER_SIZE = 4 * 1024 * 1024  # au-delà, commit() écrit le tampon lui-même
+
+    def __init__(self, path, fsync="interval", interval=0.01):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self.fsync = fsync
+        self.interval = interval
+        self._file = open(path, "ab")
+        self._condition = threading.Condition(threading.Lock())
+        self._buffer = []
+        self._buffer_size = 0
+        self._lsn = 0          # dernière mutation ajoutée
+        self._written_lsn = 0  # dernière mutation écrite (et synchronisée selon la politique)
+        self._writing = False
+        self._closed = False
+        self.appended = 0      # mutations depuis l'ouverture du segment
+        self._flusher = None
+        if fsync != "always":
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(target=self._flush_periodically, name="wal-flush", daemon=True)
+            self._flusher.start()
+
+    def append(self, mutation):
+        op, payload = mutation
+        frame = WAL_FRAME.pack(len(payload), zlib.crc32(payload, op), op) + payload
+        with self._condition:
+            if self._closed:
+                # Une mutation acceptée ici ne serait jamais écrite
+                raise ValueError("write-ahead log is closed")
+            self._buffer.append(frame)
+            self._buffer_size += len(frame)
+            self._lsn += 1
+            self.appended += 1
+            return self._lsn
+
+    def commit(self, lsn):
+        if self.fsync == "always":
+            self.flush(lsn)
+        elif self._buffer_size > self.MAX_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self, lsn=None):
+        """Écrit le tampon (jusqu'à `lsn` au moins) ; un seul thread écrit à la fois."""
+        with self._condition:
+            target = self._lsn if lsn is None else lsn
+            while self._written_lsn < target:
+                if self._writing:
+                    # Un autre thread écrit : sa passe ou la suivante couvrira notre mutation
+                    self._condition.wait()
+                    continue
+                self._write_locked()
+
+    def _write_locked(self):
+        data = b"".join(self._buffer)
+        lsn = self._lsn
+        self._buffer.clear()
+        self._buffer_size = 0
+        self._writing = True
+        self._condition.release()
+        try:
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+        finally:
+            self._condition.acquire()
+            self._writing = False
+            self._written_lsn = lsn
+            self._condition.notify_all()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.interval):
+            if self._written_lsn < self._lsn:
+                self.flush()
+
+    def rotate(self, path):
+        """Termine le segment courant (écrit et synchronisé) et continue dans `path`."""
+        self.flush()
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = open(path, "ab")
+            self.appended = 0
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            self._stop.set()
+            self._flusher.join()
+        self.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+def read_wal(path):
+    """Parcourt un segment : (opération, charge utile) jusqu'à la fin ou au premier enregistrement incomplet.
+
+    Un enregistrement tronqué ou corrompu (écriture interrompue par une panne)
+    termine le segment : le fichier est tronqué à cet endroit.
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return
+    with open(path, "r+b") as wal_file, mmap.mmap(wal_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        offset = 0
+        while offset + WAL_FRAME.size <= size:
+            length, crc, op = WAL_FRAME.unpack_from(data, offset)
+            start = offset + WAL_FRAME.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload, op) != crc or op not in INT_COUNTS:
+                break
+            yield op, payload
+            offset = start + length
+        truncate = offset < size
+    if truncate:
+        with open(path, "r+b") as wal_file:
+            wal_file.truncate(offset)
+
+
+# --- Instantanés ---
+
+def write_snapshot(path, users, articles, last_user_id, last_article_id):
+    """Écrit un instantané complet de façon atomique (fichier temporaire puis rename)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb", buffering=1024 * 1024) as snapshot_file:
+        snapshot_file.write(SNAPSHOT_MAGIC)
+        snapshot_file.write(SNAPSHOT_HEADER.pack(len(users), len(articles), last_user_id, last_article_id))
+        pack_frame = SNAPSHOT_FRAME.pack
+        for mutation in map(encode_user, users):
+            snapshot_file.write(pack_frame(len(mutation[1]), mutation[0]) + mutation[1])
+        for mutation in map(encode_article, articles):
+            snapshot_file.write(pack_frame(len(mutation[1]), mutation[0]) + mutation[1])
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(path) or ".")
+
+
+def read_snapshot(path):
+    """Lit un instantané via mmap : (en-tête, itérateur de (opération, entiers, chaînes))."""
+    snapshot_file = open(path, "rb")
+    data = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        data.close()
+        snapshot_file.close()
+        raise ValueError(f"{path} is not a snapshot file")
+    header = SNAPSHOT_HEADER.unpack_from(data, len(SNAPSHOT_MAGIC))
+
+    def records():
+        view = memoryview(data)
+        try:
+            offset = len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER.size
+            unpack_frame = SNAPSHOT_FRAME.unpack_from
+            while offset < len(data):
+                length, op = unpack_frame(data, offset)
+                offset += SNAPSHOT_FRAME.size
+                yield op, decode(op, view, offset)
+                offset += length
+        finally:
+            view.release()
+            data.close()
+            snapshot_file.close()
+
+    return header, records()
@@ -0,0 +1,275 @@
+# ratelimit.py
+# Contrôle d'admission des requêtes :
+#   - limitation de débit par client et par classe de routes (seau à jetons) :
+#     429 Too Many Requests avec Retry-After une fois le seau vide ;
+#   - délestage : au-delà de MAX_IN_FLIGHT requêtes en cours dans le
+#     processus, 503 Service Unavailable immédiat plutôt qu'une file d'attente
+#     qui ferait monter la latence de tout le monde.
+#
+# Un seau de capacité `burst` se remplit de `rate` jetons par seconde ; une
+# requête en consomme un (ou plus, selon son coût). L'état des seaux est tenu
+# par un backend interchangeable : "memory" (propre au processus) ou
+# "sqlite:///chemin" (fichier partagé par tous les workers de server.py).
+# Un backend indisponible laisse passer les requêtes (fail open).
+#
+# Désactivé (par défaut), le limiteur ne coûte rien : aucun hook n'est installé.
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from connections import ThreadConnections
+
+logger = logging.getLogger("ratelimit")
+
+# {classe de routes: (jetons par seconde, capacité du seau)}
+DEFAULT_LIMITS = {
+    'read': (100.0, 200),
+    'list': (20.0, 40),
+    'write': (10.0, 20),
+    'bulk': (0.1, 2),
+}
+MAX_BUCKETS = 100_000  # au-delà, les seaux pleins (équivalents à un seau absent) sont oubliés
+PURGE_INTERVAL = 1000  # prises entre deux purges des seaux pleins (SQLite)
+SHED_RETRY_AFTER = 1
+
+
+def parse_limits(spec):
+    """Lit "classe=débit:capacité,..." (ex. "read=100:200,bulk=0.1:2")."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            name, value = item.split('=', 1)
+            rate, burst = value.split(':', 1)
+            rate, burst = float(rate), int(burst)
+            # Un débit nul ne remplirait jamais le seau ; une capacité nulle n'admettrait rien
+            if not (math.isfinite(rate) and rate > 0 and burst >= 1):
+                raise ValueError(item)
+            limits[name.strip()] = (rate, burst)
+        except ValueError:
+            raise ValueError(f"Invalid rate limit {item!r}, expected class=rate:burst") from None
+    return limits
+
+
+def _refill(tokens, updated, now, rate, burst, cost):
+    """Seau à jetons : (jetons restants, attente avant admission ou 0, instant où le seau sera plein).
+
+    Un coût supérieur à la capacité est ramené à la capacité : la requête
+    attend un seau plein au lieu d'être refusée indéfiniment.
+    """
+    cost = min(cost, burst)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        tokens -= cost
+        wait = 0.0
+    else:
+        wait = (cost - tokens) / rate
+    return tokens, wait, now + (burst - tokens) / rate
+
+
+class MemoryBuckets:
+    """Seaux gardés dans un dict du processus."""
+
+    def __init__(self, clock=time.time, max_buckets=MAX_BUCKETS):
+        self.clock = clock
+        self.max_buckets = max_buckets
+        self._buckets = {}  # {clé: (jetons, mis à jour à, plein à)}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        """Prend `cost` jetons du seau `key` ; retourne 0 si admis, sinon l'attente en secondes."""
+        now = self.clock()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            tokens, wait, full_at = _refill(tokens, updated, now, rate, burst, cost)
+            self._buckets[key] = (tokens, now, full_at)
+            if len(self._buckets) > self.max_buckets:
+                self._purge(now)
+        return wait
+
+    def _purge(self, now):
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def close(self):
+        pass
+
+
+class SQLiteBuckets:
+    """Seaux dans un fichier SQLite partagé entre processus (une connexion par thread, voir connections.py).
+
+    Chaque prise est une transaction BEGIN IMMEDIATE : lecture, calcul et
+    écriture du seau sont atomiques d'un worker à l'autre.
+    """
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS rate_buckets ("
+              "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)")
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._connections = ThreadConnections(self._connect)
+        self._takes = 0
+        self._connection().execute(self.SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")  # état reconstructible : pas besoin de durabilité
+        conn.execute("PRAGMA busy_timeout=1000")
+        return conn
+
+    def _connection(self):
+        return self._connections.get()
+
+    def take(self, key, rate, burst, cost=1):
+        now = self.clock()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens, wait, full_at = _refill(tokens, updated, now, rate, burst, cost)
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                         (key, tokens, now, full_at))
+            self._takes += 1
+            if self._takes % PURGE_INTERVAL == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+    def close(self):
+        self._connections.close()
+
+
+def open_buckets(url='memory'):
+    """Ouvre le backend des seaux correspondant à `url` ("memory" ou "sqlite:///chemin")."""
+    if url in (None, '', 'memory'):
+        return MemoryBuckets()
+    if url.startswith('sqlite:///'):
+        return SQLiteBuckets(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported rate limit backend URL: {url}")
+
+
+class RateLimiter:
+    """Contrôle d'admission d'une application Flask (limitation de débit et délestage).
+
+    `classify()`, appelée dans le contexte de la requête, retourne
+    (classe de routes, coût en jetons), ou None pour une requête exemptée.
+    Une classe absente de `limits` n'est pas limitée en débit. Le délestage
+    (`max_in_flight`) s'applique même quand la limitation de débit est désactivée.
+    """
+
+    def __init__(self, enabled=True, limits=None, backend=None, client_header=None, max_in_flight=0):
+        self.enabled = enabled
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.backend = backend if backend is not None else MemoryBuckets()
+        self.client_header = client_header
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rejected = {}  # {(classe, statut): nombre}
+        self.classify = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Configuration par variables d'environnement.
+
+        RATE_LIMIT_ENABLED (0 par défaut), RATE_LIMITS ("classe=débit:capacité,...",
+        complète DEFAULT_LIMITS), RATE_LIMIT_BACKEND ("memory" ou "sqlite:///chemin"),
+        RATE_LIMIT_CLIENT_HEADER (en-tête identifiant le client, par exemple
+        X-API-Key ; adresse IP sinon), MAX_IN_FLIGHT (0 : pas de délestage).
+        """
+        enabled = environ.get("RATE_LIMIT_ENABLED", "0") not in ("0", "false", "no")
+        return cls(
+            enabled=enabled,
+            limits={**DEFAULT_LIMITS, **parse_limits(environ.get("RATE_LIMITS", ""))},
+            backend=open_buckets(environ.get("RATE_LIMIT_BACKEND", "memory")) if enabled else None,
+            client_header=environ.get("RATE_LIMIT_CLIENT_HEADER") or None,
+            max_in_flight=int(environ.get("MAX_IN_FLIGHT", "0")),
+        )
+
+    def install(self, app, classify):
+        """Installe le hook d'admission (à appeler après Metrics.install, pour compter les refus)."""
+        self.classify = classify
+        if not self.enabled and not self.max_in_flight:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def client_key(self):
+        if self.client_header:
+            value = request.headers.get(self.client_header)
+            if value:
+                return value
+        return request.remote_addr or "-"
+
+    def _before_request(self):
+        admission = self.classify()
+        if admission is None:
+            return None
+        route_class, cost = admission
+
+        if self.max_in_flight:
+            with self._lock:
+                if self.in_flight >= self.max_in_flight:
+                    shed = True
+                else:
+                    shed = False
+                    self.in_flight += 1
+                    g.ratelimit_admitted = True
+            if shed:
+                return self._reject(route_class, 503, "Server overloaded, retry later", SHED_RETRY_AFTER)
+
+        limit = self.limits.get(route_class) if self.enabled else None
+        if limit is None:
+            return None
+        rate, burst = limit
+        try:
+            wait = self.backend.take(f"{route_class}:{self.client_key()}", rate, burst, cost)
+        except sqlite3.Error:
+            logger.warning("rate limit backend unavailable, request admitted", exc_info=True)
+            return None
+        if wait:
+            return self._reject(route_class, 429, "Too many requests", wait)
+        return None
+
+    def _after_request(self, response):
+        # Une réponse streamée (liste complète) est encore en cours d'envoi après
+        # le teardown de la requête : la place est rendue à la fermeture du corps
+        if g.pop("ratelimit_admitted", False):
+            response.call_on_close(self._release)
+        return response
+
+    def _teardown_request(self, exc):
+        # Réponse jamais produite (exception non gérée) : after_request n'a pas tourné
+        if g.pop("ratelimit_admitted", False):
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _reject(self, route_class, status, message, retry_after):
+        key = (route_class, status)
+        with self._lock:
+            self.rejected[key] = self.rejected.get(key, 0) + 1
+        response = jsonify({"error": message})
+        response.status_code = status
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
@@ -0,0 +1,258 @@
+# search.py
+# Index de recherche plein texte sur le titre et le contenu des articles.
+# Maintenu incrémentalement par store.ArticleStore ; classement BM25,
+# recherche par préfixe avec "terme*", tous les termes sont requis (ET).
+#
+# Les résultats sont toujours exacts, sans borne de travail. Un terme seul
+# ou un préfixe coûte ~limit, quelle que soit la taille du corpus ; un ET
+# s'arrête au plus tard une fois parcourus les articles de son terme le plus
+# rare. Un ET de termes tous fréquents n'a pas de coût borné : il croît avec
+# le corpus (voir benchmarks/bench_search.py), la cible sous la milliseconde
+# sur 1M d'articles ne vaut que pour les deux premiers cas.
+
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import heappop, heappush, heapreplace
+from math import log
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_TERM_RE = re.compile(r"(\w+)(\*?)")
+
+
+def tokenize(text):
+    """Découpe un texte en termes (mots unicode, casse ignorée)."""
+    return TOKEN_RE.findall(text.casefold())
+
+
+def parse_query(query):
+    """Retourne [(terme, préfixe ?), ...] ; "pyth*" est une recherche par préfixe."""
+    return [(term, bool(star)) for term, star in QUERY_TERM_RE.findall(query.casefold())]
+
+
+def article_text(article):
+    return f"{article.title}\n{article.content}"
+
+
+class SearchIndex:
+    """Index inversé {terme: {article_id: fréquence}} avec vocabulaire trié.
+
+    Chaque terme a aussi ses postings rangés par impact : un palier par
+    fréquence, trié par longueur d'article. Dans un palier, un article plus
+    court a toujours un meilleur score BM25, quelles que soient les
+    statistiques globales (nombre d'articles, longueur moyenne) au moment de
+    la recherche : l'ordre reste exact sans rien recalculer après une écriture.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.postings = {}
+        self.impacts = {}      # {terme: {fréquence: [(longueur, article_id), ...] triés}}
+        self.vocabulary = []   # termes triés, pour la recherche par préfixe
+        self.doc_lengths = {}  # {article_id: nombre de termes}
+        self.total_length = 0
+        self._insert_term = insort  # list.append entre begin_bulk() et end_bulk()
+        self._insert_impact = insort
+        self._unsorted = {}    # {id(palier): palier} ajoutés en masse, triés par end_bulk()
+
+    def add(self, article_id, text):
+        tokens = tokenize(text)
+        length = len(tokens)
+        self.doc_lengths[article_id] = length
+        self.total_length += length
+        for term, count in Counter(tokens).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self.impacts[term] = {}
+                self._insert_term(self.vocabulary, term)
+            postings[article_id] = count
+            tiers = self.impacts[term]
+            tier = tiers.get(count)
+            if tier is None:
+                tier = tiers[count] = []
+            self._insert_impact(tier, (length, article_id))
+
+    def _append_impact(self, tier, key):
+        tier.append(key)
+        self._unsorted[id(tier)] = tier
+
+    def begin_bulk(self):
+        """Ajouts en masse : vocabulaire et paliers ne seront triés qu'une fois, par end_bulk()."""
+        self._insert_term = list.append
+        self._insert_impact = self._append_impact
+
+    def end_bulk(self):
+        self._insert_term = insort
+        self._insert_impact = insort
+        self.vocabulary.sort()
+        for tier in self._unsorted.values():
+            tier.sort()
+        self._unsorted.clear()
+
+    def remove(self, article_id, text):
+        length = self.doc_lengths.pop(article_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            count = postings.pop(article_id, None)
+            if count is not None:
+                tiers = self.impacts[term]
+                tier = tiers[count]
+                del tier[bisect_left(tier, (length, article_id))]
+                if not tier:
+                    del tiers[count]
+            if not postings:
+                del self.postings[term]
+                del self.impacts[term]
+                position = bisect_left(self.vocabulary, term)
+                del self.vocabulary[position]
+
+    def _expand(self, term, prefix):
+        if not prefix:
+            return [term] if term in self.postings else []
+        terms = []
+        for position in range(bisect_left(self.vocabulary, term), len(self.vocabulary)):
+            candidate = self.vocabulary[position]
+            if not candidate.startswith(term):
+                break
+            terms.append(candidate)
+        return terms
+
+    def _weights(self, terms):
+        """Retourne (somme des fréquences documentaires, [(terme, idf * (k1 + 1)), ...])."""
+        article_count = len(self.doc_lengths)
+        size = 0
+        weights = []
+        for term in terms:
+            doc_count = len(self.postings[term])
+            size += doc_count
+            weights.append((term, (self.K1 + 1) * log(1 + (article_count - doc_count + 0.5) / (doc_count + 0.5))))
+        return size, weights
+
+    def search(self, query, offset=0, limit=20):
+        """Retourne les ids des articles de rang [offset, offset + limit), par score décroissant.
+
+        Top-k avec arrêt anticipé (algorithme à seuil de Fagin) : chaque
+        clause est parcourue à tour de rôle par impact décroissant (fusion de
+        ses paliers, et de ceux de ses expansions pour un préfixe) ; un
+        article rencontré est noté par accès direct aux postings des autres
+        clauses. Un article jamais rencontré ne peut dépasser la somme des
+        têtes des clauses : le parcours s'arrête dès que le k-ième score
+        retenu la dépasse, ou dès qu'une clause est épuisée (plus aucun
+        article ne peut réunir tous les termes).
+        """
+        clauses = []
+        for term, prefix in parse_query(query):
+            terms = self._expand(term, prefix)
+            if not terms:
+                return []
+            clauses.append(self._weights(terms))
+        if not clauses:
+            return []
+
+        k1, b = self.K1, self.B
+        doc_lengths = self.doc_lengths
+        # norm(article) = base + per_term * longueur de l'article
+        base = k1 * (1 - b)
+        per_term = k1 * b * len(doc_lengths) / self.total_length
+        # La plus sélective d'abord : un article sans un des termes est écarté au plus tôt
+        clauses.sort(key=lambda item: item[0])
+        cursors = [_ClauseCursor(self, weights, base, per_term) for _, weights in clauses]
+
+        need = offset + limit
+        top = []  # tas des `need` meilleurs (score, -article_id)
+        seen = set()
+        turn = 0
+        while True:
+            heads = [cursor.bound() for cursor in cursors]
+            if not all(heads):
+                break  # une clause épuisée : plus aucun article ne réunit tous les termes
+            bound = sum(heads)
+            cursor = cursors[turn]
+            if len(top) == need:
+                # Une seule clause : les suivants arrivent dans l'ordre (score, id) ; à
+                # score égal, un id plus grand ne passe pas devant
+                if top[0] > (bound, -cursor.heads[0][1]) if len(cursors) == 1 else top[0][0] > bound:
+                    break
+            article_id = cursor.next()
+            turn = (turn + 1) % len(cursors)
+            if article_id in seen:
+                continue
+            seen.add(article_id)
+
+            score = 0.0
+            length = doc_lengths[article_id]
+            for other in cursors:
+                contribution = other.score(article_id, length)
+                if not contribution:
+                    break
+                score += contribution
+            else:
+                key = (score, -article_id)
+                if len(top) < need:
+                    heappush(top, key)
+                elif key > top[0]:
+                    heapreplace(top, key)
+
+        ranked = sorted(top, reverse=True)
+        return [-negated_id for _, negated_id in ranked[offset:]]
+
+
+class _ClauseCursor:
+    """Parcours d'une clause (un terme, ou les expansions d'un préfixe) par impact décroissant.
+
+    Les paliers d'une expansion ne sont chargés que lorsque son poids (borne
+    de toutes ses contributions) peut dépasser la tête du parcours.
+    """
+
+    def __init__(self, index, weights, base, per_term):
+        self.impacts = index.impacts
+        self.checks = [(index.postings[term], weight) for term, weight in weights]
+        self.pending = sorted(weights, key=lambda item: item[1])
+        # Têtes des paliers chargés : (-contribution, article_id, fréquence, poids, palier, position)
+        self.heads = []
+        self.base = base
+        self.per_term = per_term
+
+    def bound(self):
+        """Meilleure contribution d'un article pas encore parcouru (0.0 : clause épuisée)."""
+        heads, pending = self.heads, self.pending
+        while pending and (not heads or pending[-1][1] > -heads[0][0]):
+            term, weight = pending.pop()
+            for frequency, tier in self.impacts[term].items():
+                length, article_id = tier[0]
+                heappush(heads, (-weight * frequency / (frequency + self.base + self.per_term * length),
+                                 article_id, frequency, weight, tier, 0))
+        return -heads[0][0] if heads else 0.0
+
+    def next(self):
+        """Retourne l'article de tête et avance dans son palier (après bound())."""
+        heads = self.heads
+        _, article_id, frequency, weight, tier, position = heads[0]
+        position += 1
+        if position < len(tier):
+            length, next_id = tier[position]
+            heapreplace(heads, (-weight * frequency / (frequency + self.base + self.per_term * length),
+                                next_id, frequency, weight, tier, position))
+        else:
+            heappop(heads)
+        return article_id
+
+    def score(self, article_id, length):
+        """Contribution de l'article à la clause : la meilleure de ses expansions (0.0 s'il n'en a aucune)."""
+        norm = self.base + self.per_term * length
+        best = 0.0
+        for postings, weight in self.checks:
+            occurrences = postings.get(article_id)
+            if occurrences is not None:
+                contribution = weight * occurrences / (occurrences + norm)
+                if contribution > best:
+                    best = contribution
+        return best
@@ -0,0 +1,308 @@
+# server.py
+# Lanceur de production : un processus maître ouvre le socket d'écoute puis
+# "pré-forke" N workers (un par cœur par défaut) qui acceptent les connexions
+# sur ce même socket. Les workers partagent les données via un stockage
+# commun (fichier SQLite en mode WAL) : les versions des stores, donc les ETag
+# et les caches de réponses, sont cohérentes d'un worker à l'autre.
+#
+#   python server.py --workers 4 --bind 0.0.0.0:8000 --storage sqlite:///data/app.db --preload
+#
+# Signaux envoyés au maître :
+#   SIGHUP          rechargement gracieux : nouvelle génération de workers,
+#                   puis arrêt des anciens une fois leurs requêtes terminées
+#                   (sans --preload, les nouveaux workers réimportent le code).
+#                   Avec un stockage non partagé (memory:///), l'ancien worker
+#                   s'arrête d'abord : deux processus n'ouvrent jamais ensemble
+#                   le même journal
+#   SIGTERM/SIGINT  arrêt gracieux de tous les workers
+# Un worker qui meurt est remplacé.
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from storage import open_storage
+
+logger = logging.getLogger("server")
+
+GRACEFUL_TIMEOUT = 30  # secondes laissées aux requêtes en cours à l'arrêt d'un worker
+REAP_INTERVAL = 0.2
+MASTER_CHECK_INTERVAL = 1.0  # un worker vérifie que son maître vit encore
+
+
+def load_application(asgi=False):
+    """Importe l'application (WSGI ou ASGI) ; déjà en cache si le maître l'a préchargée."""
+    if asgi:
+        from asgi import application
+    else:
+        from app import app as application
+    return application
+
+
+def release_storage():
+    """Ferme les connexions ouvertes par l'import de l'app : elles ne doivent pas traverser un fork."""
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.storage.close()
+        app_module.rate_limiter.backend.close()  # seaux SQLite partagés (voir ratelimit.py)
+
+
+class RequestTracker:
+    """Middleware WSGI qui compte les requêtes en cours (arrêt gracieux)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.active = 0
+        self._condition = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._condition:
+            self.active += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), self._done)
+        except BaseException:
+            self._done()
+            raise
+
+    def _done(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def wait_idle(self, timeout):
+        with self._condition:
+            return self._condition.wait_for(lambda: self.active == 0, timeout)
+
+
+def serve_wsgi(listener, application):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    tracker = RequestTracker(application)
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, tracker, threaded=True,
+                         request_handler=QuietRequestHandler, fd=listener.fileno())
+
+    def stop(signum, frame):
+        # shutdown() attend la fin de serve_forever : on l'appelle depuis un autre thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    server.serve_forever()
+    if not tracker.wait_idle(GRACEFUL_TIMEOUT):
+        logger.warning("worker %d: %d requête(s) interrompue(s)", os.getpid(), tracker.active)
+    server.server_close()
+
+
+def serve_asgi(listener, application):
+    import uvicorn
+
+    config = uvicorn.Config(application, log_level="warning", access_log=False,
+                            timeout_graceful_shutdown=GRACEFUL_TIMEOUT)
+    # uvicorn gère lui-même SIGTERM (fin des requêtes en cours puis arrêt)
+    uvicorn.Server(config).run(sockets=[listener])
+
+
+def watch_master(master_pid):
+    """Arrête le worker (comme un SIGTERM du maître) si son maître disparaît.
+
+    Un worker orphelin continuerait sinon d'accepter des connexions sur le
+    socket hérité, sans que personne ne l'arrête jamais.
+    """
+    def watch():
+        while os.getppid() == master_pid:
+            time.sleep(MASTER_CHECK_INTERVAL)
+        logger.warning("worker %d: maître %d disparu, arrêt", os.getpid(), master_pid)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=watch, name="watch-master", daemon=True).start()
+
+
+def run_worker(listener, options, master_pid):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # le maître pilote l'arrêt
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    watch_master(master_pid)
+    application = load_application(options.asgi)
+    logger.info("worker %d prêt", os.getpid())
+    if options.asgi:
+        serve_asgi(listener, application)
+    else:
+        serve_wsgi(listener, application)
+
+
+class Arbiter:
+    """Processus maître : crée, surveille, recharge et arrête les workers."""
+
+    def __init__(self, listener, options, shared=True):
+        self.listener = listener
+        self.options = options
+        self.shared = shared  # faux : un seul processus à la fois sur le stockage
+        self.workers = {}  # {pid: génération}
+        self.generation = 0
+        self.signals = []
+
+    def spawn(self):
+        master_pid = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.listener, self.options, master_pid)
+            except BaseException:
+                logger.exception("worker %d: arrêt sur erreur", os.getpid())
+                status = 1
+            finally:
+                try:
+                    release_storage()  # journal de memory:/// vidé et synchronisé
+                except Exception:
+                    logger.exception("worker %d: fermeture du stockage", os.getpid())
+                    status = 1
+                logging.shutdown()
+                os._exit(status)
+        self.workers[pid] = self.generation
+        return pid
+
+    def spawn_generation(self):
+        for _ in range(self.options.workers):
+            self.spawn()
+
+    def reload(self):
+        old_workers = [pid for pid, generation in self.workers.items() if generation == self.generation]
+        self.generation += 1
+        logger.info("rechargement : génération %d", self.generation)
+        if not self.shared:
+            # Stockage propre au processus : l'ancien worker termine ses écritures
+            # et ferme son journal avant que le nouveau ne le rejoue
+            self.kill(old_workers, signal.SIGTERM)
+            self.wait(old_workers)
+            self.spawn_generation()
+            return
+        self.spawn_generation()
+        self.kill(old_workers, signal.SIGTERM)
+
+    def kill(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        """Récupère les workers terminés ; remplace ceux de la génération courante."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            generation = self.workers.pop(pid, None)
+            if generation == self.generation:
+                logger.warning("worker %d terminé (statut %d), remplacement", pid, os.waitstatus_to_exitcode(status))
+                self.spawn()
+
+    def wait(self, pids):
+        """Attend la fin des workers `pids` (déjà signalés) ; tue ceux qui dépassent le délai."""
+        pending = set(pids)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        while pending and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.workers.pop(pid, None)
+                pending.discard(pid)
+            else:
+                time.sleep(REAP_INTERVAL)
+        self.kill(pending, signal.SIGKILL)
+        for pid in pending:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            self.workers.pop(pid, None)
+
+    def stop(self):
+        logger.info("arrêt de %d worker(s)", len(self.workers))
+        self.kill(list(self.workers), signal.SIGTERM)
+        self.wait(list(self.workers))
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+        self.spawn_generation()
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                else:
+                    # Les anciens workers en cours d'arrêt ne sont plus remplacés
+                    self.generation += 1
+                    self.stop()
+                    return
+            self.reap()
+            time.sleep(REAP_INTERVAL)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Lanceur multi-processus de l'API.")
+    parser.add_argument("--bind", default="127.0.0.1:8000", help="adresse hôte:port (défaut : %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="nombre de workers (défaut : un par cœur)")
+    parser.add_argument("--storage", default=os.environ.get("STORAGE_URL", "sqlite:///app.db"),
+                        help="URL du stockage partagé (défaut : $STORAGE_URL ou %(default)s)")
+    parser.add_argument("--preload", action="store_true",
+                        help="importe l'application dans le maître avant le fork (démarrage à chaud ; "
+                             "stockage partagé uniquement)")
+    parser.add_argument("--asgi", action="store_true", help="workers ASGI (uvicorn) au lieu de WSGI")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="[%(process)d] %(message)s")
+    host, _, port = options.bind.rpartition(":")
+
+    # Les workers importent app.py, qui lit STORAGE_URL
+    os.environ["STORAGE_URL"] = options.storage
+    os.environ["WEB_CONCURRENCY"] = str(options.workers)  # voir app.CHANGES_AVAILABLE
+    storage = open_storage(options.storage)  # crée le schéma une seule fois, avant les workers
+    if not storage.shared and options.workers > 1:
+        sys.exit(f"Le stockage {options.storage!r} n'est pas partagé entre processus : "
+                 "utilisez sqlite:///chemin ou --workers 1")
+    if options.preload and not storage.shared:
+        # L'état chargé dans le maître (et le journal de memory:///, fermé avant
+        # le fork) ne suivrait pas les écritures du worker : un worker remplacé
+        # ou rechargé repartirait de cet état, sans journal
+        sys.exit(f"--preload exige un stockage partagé (sqlite:///chemin), pas {options.storage!r}")
+    storage.warm_up()
+    storage.close()
+
+    if options.preload:
+        load_application(options.asgi)
+        release_storage()
+
+    listener = socket.create_server((host or "127.0.0.1", int(port)), backlog=2048)
+    logger.info("écoute sur %s:%d, %d worker(s) %s", *listener.getsockname()[:2], options.workers,
+                "ASGI" if options.asgi else "WSGI")
+    try:
+        Arbiter(listener, options, shared=storage.shared).run()
+    finally:
+        listener.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1139 @@
+# storage.py
+# Couche de stockage appelée par les routes de `app.py`.
+# Deux implémentations : MemoryStorage (les dict indexés de `store.py`) et
+# SQLiteStorage (fichier partagé entre processus, mode WAL).
+# Le backend est choisi par open_storage() à partir d'une URL :
+#   "memory"                  -> MemoryStorage
+#   "memory:///chemin/donnees" -> PersistentMemoryStorage (journal + instantanés)
+#   "sqlite:///chemin/app.db" -> SQLiteStorage
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import islice
+from urllib.parse import parse_qsl, urlsplit
+
+from connections import ThreadConnections
+from models import User, UserInfos, Article, ArticleInfos
+from persistence import (
+    OP_ADD_USER, OP_UPDATE_USER, OP_DELETE_USER, OP_ADD_ARTICLE, OP_CLEAR,
+    WriteAheadLog, article_created_at, decode, encode_article, encode_clear, encode_delete_user,
+    encode_update_user, encode_user, list_files, read_snapshot, read_wal, snapshot_path, wal_path,
+    write_snapshot,
+)
+from search import parse_query
+from store import UserStore, ArticleStore, normalize_email
+
+
+class DuplicateEmailError(Exception):
+    """Un autre utilisateur possède déjà cet email."""
+
+
+class DuplicateIdError(Exception):
+    """Un utilisateur possède déjà cet id (import avec ids imposés)."""
+
+
+def article_sort_key(article, order='id'):
+    """Clé de tri (et de curseur) d'un article pour l'ordre donné."""
+    if order == 'created_at':
+        return (article.created_at, article.id)
+    return article.id
+
+
+class Storage(ABC):
+    """Interface commune aux backends de stockage."""
+
+    shared = False  # vrai si plusieurs processus peuvent ouvrir le même stockage
+    blocking = True  # faux si aucune opération ne fait d'E/S ni n'attend longtemps un verrou
+
+    # --- Utilisateurs ---
+    @abstractmethod
+    def add_user(self, name, email, user_id=None):
+        """Crée un utilisateur et le retourne. Lève DuplicateEmailError.
+
+        `user_id` impose l'id (import d'un export) ; sinon le stockage l'attribue.
+        Lève DuplicateIdError si l'id est déjà pris.
+        """
+
+    def add_users(self, entries):
+        """Crée des utilisateurs à partir de couples (name, email), ou de
+        triplets (name, email, user_id) pour garder l'id d'un export.
+
+        Retourne, dans le même ordre, le User créé ou None si l'email ou l'id est déjà pris.
+        """
+        results = []
+        for entry in entries:
+            try:
+                results.append(self.add_user(*entry))
+            except (DuplicateEmailError, DuplicateIdError):
+                results.append(None)
+        return results
+
+    @abstractmethod
+    def get_user(self, user_id):
+        """Retourne l'utilisateur ou None."""
+
+    def get_users(self, user_ids):
+        """Retourne {id: User} pour les ids existants parmi `user_ids`."""
+        users = {}
+        for user_id in user_ids:
+            user = self.get_user(user_id)
+            if user is not None:
+                users[user_id] = user
+        return users
+
+    def existing_user_ids(self, user_ids):
+        """Retourne le sous-ensemble des ids correspondant à des utilisateurs existants."""
+        return {user_id for user_id in user_ids if self.get_user(user_id) is not None}
+
+    @abstractmethod
+    def find_user_by_email(self, email):
+        """Retourne l'id de l'utilisateur possédant cet email, ou None."""
+
+    @abstractmethod
+    def update_user(self, user_id, name=None, email=None):
+        """Met à jour un utilisateur et le retourne, ou None s'il n'existe pas. Lève DuplicateEmailError.
+
+        L'existence est vérifiée dans la même opération atomique que l'écriture.
+        """
+
+    @abstractmethod
+    def delete_user(self, user_id):
+        """Supprime un utilisateur et ses articles. Retourne False s'il n'existe pas."""
+
+    @abstractmethod
+    def list_users(self, after=None, limit=None):
+        """Retourne les utilisateurs triés par id, strictement après `after`."""
+
+    @abstractmethod
+    def count_users(self):
+        """Nombre d'utilisateurs."""
+
+    # --- Articles ---
+    @abstractmethod
+    def add_article(self, user_id, title, content, tags, created_at=None):
+        """Crée un article et le retourne, ou None si l'utilisateur n'existe pas.
+
+        L'existence de l'auteur est vérifiée dans la même opération atomique
+        que l'insertion : une suppression concurrente ne laisse pas d'article orphelin.
+        """
+
+    def add_articles(self, entries):
+        """Crée des articles à partir de tuples (user_id, title, content, tags, created_at).
+
+        Retourne, dans le même ordre, l'Article créé ou None si l'utilisateur n'existe pas.
+        """
+        return [self.add_article(*entry) for entry in entries]
+
+    @abstractmethod
+    def get_article(self, article_id):
+        """Retourne l'article ou None."""
+
+    def get_articles(self, article_ids):
+        """Retourne {id: Article} pour les ids existants parmi `article_ids`."""
+        articles = {}
+        for article_id in article_ids:
+            article = self.get_article(article_id)
+            if article is not None:
+                articles[article_id] = article
+        return articles
+
+    @abstractmethod
+    def query_articles(self, tag=None, date_after=None, order='id', after=None, limit=None):
+        """Retourne les articles filtrés, dans l'ordre demandé ('id' ou 'created_at').
+
+        `after` est la clé de tri (voir article_sort_key) du dernier article de
+        la page précédente.
+        """
+
+    @abstractmethod
+    def user_articles(self, user_id, after=None, limit=None):
+        """Retourne les articles d'un utilisateur, triés par id."""
+
+    @abstractmethod
+    def search_articles(self, query, offset=0, limit=20):
+        """Recherche plein texte (titre + contenu) : articles classés par pertinence BM25.
+
+        Tous les termes sont requis ; "terme*" recherche par préfixe.
+        Retourne les articles de rang [offset, offset + limit).
+        """
+
+    @abstractmethod
+    def tag_counts(self, limit=None):
+        """Retourne [(tag, nombre d'articles)] par nombre décroissant puis par tag, au plus `limit`."""
+
+    @abstractmethod
+    def tag_count(self, tag):
+        """Nombre d'articles portant ce tag."""
+
+    @abstractmethod
+    def count_tags(self):
+        """Nombre de tags distincts."""
+
+    @abstractmethod
+    def user_stats(self, user_id, limit=None):
+        """Retourne (nombre d'articles, [(tag, nombre)] comme tag_counts, nombre de tags distincts)."""
+
+    @abstractmethod
+    def count_articles(self):
+        """Nombre d'articles."""
+
+    # --- Versions (cache HTTP) ---
+    @abstractmethod
+    def store_version(self, name):
+        """Retourne (version, modified_at en UTC) du store 'users' ou 'articles'.
+
+        La version augmente à chaque écriture ; chaque enregistrement porte dans
+        `_version` la version de sa dernière modification.
+        """
+
+    def warm_up(self):
+        """Précharge les données avant de servir (démarrage à chaud des workers)."""
+
+    @abstractmethod
+    def on_change(self, listener):
+        """Appelle listener(type, op, id, enregistrement) à chaque mutation, dans l'ordre où elles s'appliquent.
+
+        `type` vaut "user" ou "article", `op` "create", "update", "delete" ou
+        "clear" (id et enregistrement None) ; l'enregistrement n'est fourni
+        que pour "create" et "update". La suppression d'un utilisateur est
+        suivie de celle de chacun de ses articles.
+        """
+
+    # --- Journal de changements partagé (backends `shared` uniquement) ---
+    def keep_changes(self, serialize, capacity):
+        """Écrit chaque changement dans le stockage, dans la transaction de sa mutation.
+
+        `serialize(type, op, enregistrement)` retourne les données du changement
+        en JSON (texte) ou None ; seuls les `capacity` derniers sont gardés.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no shared change log")
+
+    def changes_since(self, seq, limit=None):
+        """Retourne ([(seq, type, op, id, données JSON)] de numéro > seq, au plus `limit`,
+        plus petit numéro gardé, dernier numéro attribué), lus dans un même instantané."""
+        raise NotImplementedError(f"{type(self).__name__} has no shared change log")
+
+    @abstractmethod
+    def clear(self):
+        """Vide le stockage (tests, benchmarks)."""
+
+    def close(self):
+        """Libère les ressources du backend."""
+
+
+class MemoryStorage(Storage):
+    """Stockage en mémoire du processus, via les dict indexés de `store.py`.
+
+    Chaque store a son verrou lecteurs / rédacteur : les lectures avancent en
+    parallèle, les écritures (allocation d'id, contrôle d'unicité de l'email
+    et insertion) sont atomiques. Quand une opération touche les deux stores,
+    elle verrouille toujours `users` avant `articles`.
+    """
+
+    blocking = False  # tout se passe en mémoire, sous des verrous tenus quelques µs
+
+    def __init__(self):
+        self.users = UserStore()
+        self.articles = ArticleStore()
+
+    def on_change(self, listener):
+        # Les stores préviennent sous leur verrou d'écriture (voir store.IndexedStore)
+        self.users.listener = lambda op, user_id, user: listener("user", op, user_id, user)
+        self.articles.listener = lambda op, article_id, article: listener("article", op, article_id, article)
+
+    def _new_user(self, name, email, user_id=None):
+        """Vérifie l'unicité et construit l'utilisateur, sans l'ajouter au store."""
+        if user_id is not None and user_id in self.users:
+            raise DuplicateIdError(user_id)
+        if self.users.find_by_email(email) is not None:
+            raise DuplicateEmailError(email)
+        if user_id is None:
+            user_id = self.users.next_id()
+        return User(UserInfos(id=user_id, name=name, email=email))
+
+    def _insert_user(self, name, email, user_id=None):
+        user = self._new_user(name, email, user_id)
+        self.users[user.id] = user  # un id imposé avance last_id
+        return user
+
+    def add_user(self, name, email, user_id=None):
+        with self.users.lock.write():
+            return self._insert_user(name, email, user_id)
+
+    def add_users(self, entries):
+        results = []
+        with self.users.lock.write():
+            for entry in entries:
+                try:
+                    results.append(self._insert_user(*entry))
+                except (DuplicateEmailError, DuplicateIdError):
+                    results.append(None)
+        return results
+
+    def get_user(self, user_id):
+        with self.users.lock.read():
+            return self.users.get(user_id)
+
+    def get_users(self, user_ids):
+        # Un seul verrou pour tout le lot, une recherche dans le dict par id
+        users = self.users
+        with users.lock.read():
+            return {user_id: users[user_id] for user_id in user_ids if user_id in users}
+
+    def existing_user_ids(self, user_ids):
+        with self.users.lock.read():
+            return {user_id for user_id in user_ids if user_id in self.users}
+
+    def find_user_by_email(self, email):
+        with self.users.lock.read():
+            return self.users.find_by_email(email)
+
+    def update_user(self, user_id, name=None, email=None):
+        with self.users.lock.write():
+            if user_id not in self.users:
+                return None
+            if email:
+                existing_user_id = self.users.find_by_email(email)
+                if existing_user_id is not None and existing_user_id != user_id:
+                    raise DuplicateEmailError(email)
+            user, _ = self.users.update_fields(user_id, name=name, email=email)
+            return user
+
+    def delete_user(self, user_id):
+        with self.users.lock.write(), self.articles.lock.write():
+            if user_id not in self.users:
+                return False
+            del self.users[user_id]
+            self.articles.delete_by_user(user_id)
+            return True
+
+    def list_users(self, after=None, limit=None):
+        with self.users.lock.read():
+            return [self.users[user_id] for user_id in self.users.page(after=after, limit=limit)]
+
+    def count_users(self):
+        return len(self.users)
+
+    def _new_article(self, user_id, title, content, tags, created_at=None):
+        return Article(ArticleInfos(id=self.articles.next_id(), user_id=user_id, title=title, content=content,
+                                    tags=tags, created_at=created_at or datetime.now()))
+
+    def _insert_article(self, user_id, title, content, tags, created_at=None):
+        article = self._new_article(user_id, title, content, tags, created_at)
+        self.articles[article.id] = article
+        return article
+
+    # L'auteur doit exister : le verrou en lecture de `users` (pris avant celui
+    # de `articles`) écarte une suppression concurrente jusqu'à l'insertion
+    def add_article(self, user_id, title, content, tags, created_at=None):
+        with self.users.lock.read(), self.articles.lock.write():
+            if user_id not in self.users:
+                return None
+            return self._insert_article(user_id, title, content, tags, created_at)
+
+    def add_articles(self, entries):
+        users = self.users
+        with users.lock.read(), self.articles.lock.write():
+            return [self._insert_article(*entry) if entry[0] in users else None for entry in entries]
+
+    def get_article(self, article_id):
+        with self.articles.lock.read():
+            return self.articles.get(article_id)
+
+    def get_articles(self, article_ids):
+        articles = self.articles
+        with articles.lock.read():
+            return {article_id: articles[article_id] for article_id in article_ids if article_id in articles}
+
+    def query_articles(self, tag=None, date_after=None, order='id', after=None, limit=None):
+        with self.articles.lock.read():
+            article_ids = self.articles.query(tag=tag, date_after=date_after, order=order, after=after, limit=limit)
+            return [self.articles[article_id] for article_id in article_ids]
+
+    def user_articles(self, user_id, after=None, limit=None):
+        with self.articles.lock.read():
+            return [self.articles[article_id]
+                    for article_id in self.articles.by_user(user_id, after=after, limit=limit)]
+
+    def search_articles(self, query, offset=0, limit=20):
+        with self.articles.lock.read():
+            article_ids = self.articles.search_index.search(query, offset, limit)
+            return [self.articles[article_id] for article_id in article_ids]
+
+    def count_articles(self):
+        return len(self.articles)
+
+    # Compteurs tenus à jour par ArticleStore : coût ~ limit, sans parcours des articles
+    def tag_counts(self, limit=None):
+        with self.articles.lock.read():
+            return self.articles.top_tags(limit)
+
+    def tag_count(self, tag):
+        return self.articles.tag_count(tag)
+
+    def count_tags(self):
+        return len(self.articles.tag_index)
+
+    def user_stats(self, user_id, limit=None):
+        with self.articles.lock.read():
+            return self.articles.user_stats(user_id, limit)
+
+    def store_version(self, name):
+        # Lecture sans verrou : un couple légèrement décalé ne fait qu'invalider le cache HTTP
+        store = self.users if name == 'users' else self.articles
+        return store.version, store.modified_at
+
+    def clear(self):
+        with self.users.lock.write(), self.articles.lock.write():
+            self.users.clear()
+            self.articles.clear()
+
+
+class PersistentMemoryStorage(MemoryStorage):
+    """MemoryStorage dont chaque mutation est journalisée sur disque (voir persistence.py).
+
+    Les lectures restent celles des dict en mémoire. Chaque mutation est
+    ajoutée au journal sous le verrou d'écriture du store (l'ordre du journal
+    est celui des écritures), avant d'être appliquée aux dict : une mutation
+    que le journal refuse (encodage impossible, journal fermé) ne laisse pas
+    d'état en mémoire qu'une reprise perdrait. Elle est ensuite validée hors
+    du verrou pour que les écritures concurrentes partagent le même fsync.
+    Toutes les
+    `snapshot_every` mutations, un instantané est écrit en arrière-plan et
+    les segments de journal qu'il couvre sont supprimés.
+    """
+
+    blocking = True  # fsync du journal ; les lectures attendent le verrou pendant un instantané
+
+    def __init__(self, directory, fsync='interval', snapshot_every=100_000):
+        super().__init__()
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread = None
+        os.makedirs(directory, exist_ok=True)
+        self.segment = self._recover()
+        self.wal = WriteAheadLog(wal_path(directory, self.segment), fsync=fsync)
+
+    # --- Reprise ---
+    def _recover(self):
+        """Charge le dernier instantané puis rejoue le journal ; retourne le segment courant."""
+        # Les versions des stores partent de l'horloge (voir store.IndexedStore) :
+        # celles de l'instantané et du journal ne sont pas reprises
+        wals, snapshots = list_files(self.directory)
+        segment = 1
+        if snapshots:
+            segment = snapshots[-1]
+            header, records = read_snapshot(snapshot_path(self.directory, segment))
+            # L'instantané contient les utilisateurs puis les articles
+            users = islice(records, header[0])
+            self.users.load(User(UserInfos(id=ints[0], name=strings[0], email=strings[1]))
+                            for _, (ints, strings) in users)
+            self.articles.load(self._article(ints, strings) for _, (ints, strings) in records)
+            self.users.last_id = max(self.users.last_id, header[2])
+            self.articles.last_id = max(self.articles.last_id, header[3])
+        for wal_segment in wals:
+            if wal_segment >= segment:
+                for op, payload in read_wal(wal_path(self.directory, wal_segment)):
+                    self._apply(op, *decode(op, payload))
+        return max([segment, *wals])
+
+    def _apply(self, op, ints, strings):
+        """Rejoue une mutation (idempotent)."""
+        if op == OP_ADD_USER:
+            self.users[ints[0]] = User(UserInfos(id=ints[0], name=strings[0], email=strings[1]))
+        elif op == OP_UPDATE_USER:
+            if ints[0] in self.users:
+                self.users.update_fields(ints[0], name=strings[0] or None, email=strings[1] or None)
+        elif op == OP_DELETE_USER:
+            if ints[0] in self.users:
+                del self.users[ints[0]]
+            self.articles.delete_by_user(ints[0])
+        elif op == OP_ADD_ARTICLE:
+            self.articles[ints[0]] = self._article(ints, strings)
+        elif op == OP_CLEAR:
+            self.users.clear()
+            self.articles.clear()
+
+    @staticmethod
+    def _article(ints, strings):
+        article_id, user_id, created_at, _ = ints
+        return Article(ArticleInfos(id=article_id, user_id=user_id, title=strings[0], content=strings[1],
+                                    tags=strings[2:], created_at=article_created_at(created_at)))
+
+    # --- Mutations journalisées ---
+    def _commit(self, lsn):
+        self.wal.commit(lsn)
+        if (self.snapshot_every and self.wal.appended >= self.snapshot_every
+                and self._snapshot_lock.acquire(blocking=False)):
+            self._snapshot_thread = threading.Thread(target=self._background_snapshot, name="snapshot", daemon=True)
+            self._snapshot_thread.start()
+
+    def add_user(self, name, email, user_id=None):
+        with self.users.lock.write():
+            user = self._new_user(name, email, user_id)
+            lsn = self.wal.append(encode_user(user))
+            self.users[user.id] = user
+        self._commit(lsn)
+        return user
+
+    def add_users(self, entries):
+        results = []
+        lsn = None
+        with self.users.lock.write():
+            for entry in entries:
+                try:
+                    user = self._new_user(*entry)
+                except (DuplicateEmailError, DuplicateIdError):
+                    results.append(None)
+                    continue
+                lsn = self.wal.append(encode_user(user))
+                self.users[user.id] = user
+                results.append(user)
+        if lsn is not None:
+            self._commit(lsn)
+        return results
+
+    def update_user(self, user_id, name=None, email=None):
+        with self.users.lock.write():
+            if user_id not in self.users:
+                return None
+            if email:
+                existing_user_id = self.users.find_by_email(email)
+                if existing_user_id is not None and existing_user_id != user_id:
+                    raise DuplicateEmailError(email)
+            user = self.users[user_id]
+            if (not name or name == user.name) and (not email or email == user.email):
+                return user  # rien ne change : ni journal ni version
+            lsn = self.wal.append(encode_update_user(user_id, name, email))
+            self.users.update_fields(user_id, name=name, email=email)
+        self._commit(lsn)
+        return user
+
+    def delete_user(self, user_id):
+        with self.users.lock.write(), self.articles.lock.write():
+            if user_id not in self.users:
+                return False
+            lsn = self.wal.append(encode_delete_user(user_id))
+            del self.users[user_id]
+            self.articles.delete_by_user(user_id)
+        self._commit(lsn)
+        return True
+
+    def add_article(self, user_id, title, content, tags, created_at=None):
+        with self.users.lock.read(), self.articles.lock.write():
+            if user_id not in self.users:
+                return None
+            article = self._new_article(user_id, title, content, tags, created_at)
+            lsn = self.wal.append(encode_article(article))
+            self.articles[article.id] = article
+        self._commit(lsn)
+        return article
+
+    def add_articles(self, entries):
+        results = []
+        lsn = None
+        users = self.users
+        with users.lock.read(), self.articles.lock.write():
+            for entry in entries:
+                if entry[0] not in users:
+                    results.append(None)
+                    continue
+                article = self._new_article(*entry)
+                lsn = self.wal.append(encode_article(article))
+                self.articles[article.id] = article
+                results.append(article)
+        if lsn is not None:
+            self._commit(lsn)
+        return results
+
+    def clear(self):
+        with self.users.lock.write(), self.articles.lock.write():
+            lsn = self.wal.append(encode_clear())
+            self.users.clear()
+            self.articles.clear()
+        self._commit(lsn)
+
+    # --- Instantanés ---
+    def snapshot(self):
+        """Écrit un instantané de l'état courant et supprime les fichiers qu'il rend inutiles."""
+        with self._snapshot_lock:
+            self._write_snapshot()
+
+    def _background_snapshot(self):
+        try:
+            self._write_snapshot()
+        finally:
+            self._snapshot_lock.release()
+
+    def _write_snapshot(self):
+        # Sous les verrous : liste des enregistrements et bascule sur un nouveau
+        # segment. L'écriture se fait ensuite sans bloquer les requêtes ; les
+        # mutations qui suivent sont dans le nouveau segment et seront rejouées.
+        with self.users.lock.write(), self.articles.lock.write():
+            users = list(self.users.values())
+            articles = list(self.articles.values())
+            last_ids = self.users.last_id, self.articles.last_id
+            self.segment += 1
+            segment = self.segment
+            self.wal.rotate(wal_path(self.directory, segment))
+        write_snapshot(snapshot_path(self.directory, segment), users, articles, *last_ids)
+
+        wals, snapshots = list_files(self.directory)
+        for old_segment in wals:
+            if old_segment < segment:
+                os.remove(wal_path(self.directory, old_segment))
+        for old_segment in snapshots:
+            if old_segment < segment:
+                os.remove(snapshot_path(self.directory, old_segment))
+
+    def close(self):
+        with self._snapshot_lock:  # attend un instantané en cours
+            self.wal.close()
+
+
+# --- SQLite ---
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL UNIQUE,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_articles_user ON articles(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_articles_created_at ON articles(created_at, id);
+CREATE TABLE IF NOT EXISTS article_tags (
+    tag TEXT NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, article_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_article_tags_article ON article_tags(article_id);
+-- Compteurs tenus à jour par triggers (GET /tags, GET /users/<id>/stats)
+CREATE TABLE IF NOT EXISTS tag_counts (
+    tag TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_tag_counts_ranking ON tag_counts(count DESC, tag);
+CREATE TABLE IF NOT EXISTS user_tag_counts (
+    user_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_tag_counts_ranking ON user_tag_counts(user_id, count DESC, tag);
+-- Nombre de tags distincts par utilisateur (lignes de user_tag_counts)
+CREATE TABLE IF NOT EXISTS user_distinct_tags (
+    user_id INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS user_tag_counts_insert AFTER INSERT ON user_tag_counts BEGIN
+    INSERT INTO user_distinct_tags (user_id, count) VALUES (new.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS user_tag_counts_delete AFTER DELETE ON user_tag_counts BEGIN
+    UPDATE user_distinct_tags SET count = count - 1 WHERE user_id = old.user_id;
+    DELETE FROM user_distinct_tags WHERE user_id = old.user_id AND count <= 0;
+END;
+CREATE TABLE IF NOT EXISTS user_article_counts (
+    user_id INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS article_tags_count_insert AFTER INSERT ON article_tags BEGIN
+    INSERT INTO tag_counts (tag, count) VALUES (new.tag, 1)
+        ON CONFLICT (tag) DO UPDATE SET count = count + 1;
+    INSERT INTO user_tag_counts (user_id, tag, count)
+        SELECT user_id, new.tag, 1 FROM articles WHERE id = new.article_id
+        ON CONFLICT (user_id, tag) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS articles_count_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO user_article_counts (user_id, count) VALUES (new.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET count = count + 1;
+END;
+-- BEFORE : les tags de l'article (supprimés ensuite par cascade) sont encore visibles
+CREATE TRIGGER IF NOT EXISTS articles_count_delete BEFORE DELETE ON articles BEGIN
+    UPDATE tag_counts SET count = count - 1
+        WHERE tag IN (SELECT tag FROM article_tags WHERE article_id = old.id);
+    DELETE FROM tag_counts WHERE count <= 0
+        AND tag IN (SELECT tag FROM article_tags WHERE article_id = old.id);
+    UPDATE user_tag_counts SET count = count - 1
+        WHERE user_id = old.user_id AND tag IN (SELECT tag FROM article_tags WHERE article_id = old.id);
+    DELETE FROM user_tag_counts WHERE user_id = old.user_id AND count <= 0;
+    UPDATE user_article_counts SET count = count - 1 WHERE user_id = old.user_id;
+    DELETE FROM user_article_counts WHERE user_id = old.user_id AND count <= 0;
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, content, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TABLE IF NOT EXISTS store_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    modified_at TEXT NOT NULL
+);
+-- Journal des changements (GET /changes), écrit dans la transaction de chaque
+-- mutation : AUTOINCREMENT donne des numéros croissants et jamais réutilisés,
+-- communs à tous les processus
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    op TEXT NOT NULL,
+    record_id INTEGER,
+    data TEXT
+);
+INSERT OR IGNORE INTO store_versions (name, version, modified_at)
+    VALUES ('users', 0, strftime('%Y-%m-%d %H:%M:%f000', 'now')),
+           ('articles', 0, strftime('%Y-%m-%d %H:%M:%f000', 'now'));
+"""
+
+SQLITE_COUNTERS_BACKFILL = """
+BEGIN;
+DELETE FROM tag_counts;
+DELETE FROM user_tag_counts;
+DELETE FROM user_distinct_tags;  -- recalculé par le trigger de user_tag_counts
+DELETE FROM user_article_counts;
+INSERT INTO tag_counts (tag, count) SELECT tag, COUNT(*) FROM article_tags GROUP BY tag;
+INSERT INTO user_tag_counts (user_id, tag, count)
+    SELECT a.user_id, t.tag, COUNT(*) FROM article_tags t JOIN articles a ON a.id = t.article_id
+    GROUP BY a.user_id, t.tag;
+INSERT INTO user_article_counts (user_id, count) SELECT user_id, COUNT(*) FROM articles GROUP BY user_id;
+COMMIT;
+"""
+
+USER_COLUMNS = "id, name, email, version"
+ARTICLE_COLUMNS = "a.id, a.user_id, a.title, a.content, a.tags, a.created_at, a.version"
+
+
+def _user_from_row(row):
+    user = User(UserInfos(id=row[0], name=row[1], email=row[2]))
+    user._version = row[3]
+    return user
+
+
+def _article_from_row(row):
+    article = Article(ArticleInfos(
+        id=row[0],
+        user_id=row[1],
+        title=row[2],
+        content=row[3],
+        # validation.parse_tags refuse les virgules dans un tag : join/split sans perte
+        tags=row[4].split(',') if row[4] else [],
+        created_at=datetime.fromisoformat(row[5]),
+    ))
+    article._version = row[6]
+    return article
+
+
+# "AAAA-MM-JJ HH:MM:SS.ffffff" : largeur fixe, l'ordre texte suit l'ordre
+# chronologique. L'année a quatre chiffres parce que l'API refuse les dates
+# avant validation.MIN_YEAR ; isoformat() complète aussi par des zéros une
+# année antérieure écrite directement par le stockage.
+def _format_date(dt_obj):
+    return dt_obj.replace(tzinfo=None).isoformat(' ', 'microseconds')
+
+
+class SQLiteStorage(Storage):
+    """Stockage SQLite partagé entre threads et processus.
+
+    Chaque thread garde sa propre connexion, fermée avec lui (voir
+    connections.py) ; les requêtes
+    sont des chaînes constantes paramétrées, que sqlite3 garde compilées dans
+    son cache de statements. Les ids sont en AUTOINCREMENT : jamais réutilisés
+    après une suppression ; l'unicité de l'email est garantie par la contrainte
+    UNIQUE sur email_key, dans la même transaction que l'insertion.
+    """
+
+    STATEMENT_CACHE_SIZE = 256
+    WARM_UP_READ_SIZE = 1024 * 1024
+    CHANGES_TRIM_INTERVAL = 100  # écritures entre deux purges du journal de changements
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._connections = ThreadConnections(self._connect)
+        self._listener = None
+        self._write_lock = threading.Lock()
+        self._serialize_change = None
+        self._changes_capacity = 0
+        self._logged_writes = 0
+        with self._connection() as conn:
+            has_counters = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_distinct_tags'"
+            ).fetchone()
+            conn.executescript(SQLITE_SCHEMA)
+            if not has_counters:
+                # Base créée avant les compteurs (ou avant user_distinct_tags) : on les calcule une fois
+                conn.executescript(SQLITE_COUNTERS_BACKFILL)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=self.STATEMENT_CACHE_SIZE)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _connection(self):
+        return self._connections.get()
+
+    def warm_up(self):
+        # Lecture séquentielle du fichier (et du WAL) : les pages passent dans le
+        # cache du système, partagé par tous les processus qui ouvrent la base
+        for path in (self.path, self.path + '-wal'):
+            try:
+                with open(path, 'rb') as db_file:
+                    while db_file.read(self.WARM_UP_READ_SIZE):
+                        pass
+            except FileNotFoundError:
+                pass
+
+    def on_change(self, listener):
+        self._listener = listener
+
+    def keep_changes(self, serialize, capacity):
+        self._serialize_change = serialize
+        self._changes_capacity = capacity
+
+    def changes_since(self, seq, limit=None):
+        conn = self._connection()
+        conn.execute("BEGIN")  # transaction de lecture : bornes et lignes du même instantané
+        try:
+            first_seq, last_seq = conn.execute(
+                "SELECT (SELECT MIN(seq) FROM changes), "
+                "COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'changes'), 0)"
+            ).fetchone()
+            rows = conn.execute(
+                "SELECT seq, type, op, record_id, data FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit if limit is not None else -1),
+            ).fetchall()
+        finally:
+            conn.commit()
+        return rows, (first_seq if first_seq is not None else last_seq + 1), last_seq
+
+    def _log_changes(self, conn, changes):
+        serialize = self._serialize_change
+        conn.executemany(
+            "INSERT INTO changes (type, op, record_id, data) VALUES (?, ?, ?, ?)",
+            [(kind, op, record_id, serialize(kind, op, record)) for kind, op, record_id, record in changes],
+        )
+        self._logged_writes += 1
+        if self._logged_writes % self.CHANGES_TRIM_INTERVAL == 0:
+            conn.execute(
+                "DELETE FROM changes WHERE seq <= (SELECT seq FROM sqlite_sequence WHERE name = 'changes') - ?",
+                (self._changes_capacity,),
+            )
+
+    @contextmanager
+    def _write(self):
+        """Transaction d'écriture : (connexion, liste de changements à publier après le commit).
+
+        Le verrou fait publier les changements dans l'ordre des commits de ce processus.
+        Avec keep_changes, ils sont aussi écrits dans la table `changes`, dans la transaction.
+        """
+        conn = self._connection()
+        changes = []
+        with self._write_lock:
+            with conn:
+                yield conn, changes
+                if changes and self._serialize_change is not None:
+                    self._log_changes(conn, changes)
+            if self._listener is not None:
+                for change in changes:
+                    self._listener(*change)
+
+    @staticmethod
+    def _bump(conn, name):
+        """Incrémente la version d'un store dans la transaction en cours et la retourne."""
+        return conn.execute(
+            "UPDATE store_versions SET version = version + 1, modified_at = ? WHERE name = ? RETURNING version",
+            (_format_date(datetime.now(timezone.utc)), name),
+        ).fetchone()[0]
+
+    def add_user(self, name, email, user_id=None):
+        try:
+            with self._write() as (conn, changes):
+                version = self._bump(conn, 'users')
+                # id NULL : SQLite attribue le suivant ; un id imposé avance la séquence
+                cursor = conn.execute(
+                    "INSERT INTO users (id, name, email, email_key, version) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, name, email, normalize_email(email), version),
+                )
+                user = _user_from_row((cursor.lastrowid, name, email, version))
+                changes.append(("user", "create", user.id, user))
+        except sqlite3.IntegrityError as error:
+            if 'users.id' in str(error):
+                raise DuplicateIdError(user_id)
+            raise DuplicateEmailError(email)
+        return user
+
+    def add_users(self, entries):
+        # Une seule transaction pour tout le lot ; les doublons sont ignorés ligne par ligne
+        results = []
+        with self._write() as (conn, changes):
+            version = None  # la version du store n'avance qu'à la première ligne insérée
+            for entry in entries:
+                name, email = entry[:2]
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO users (id, name, email, email_key, version) VALUES (?, ?, ?, ?, ?)",
+                    (entry[2] if len(entry) > 2 else None, name, email, normalize_email(email), version or 0),
+                )
+                if cursor.rowcount:
+                    if version is None:
+                        version = self._bump(conn, 'users')
+                        conn.execute("UPDATE users SET version = ? WHERE id = ?", (version, cursor.lastrowid))
+                    user = _user_from_row((cursor.lastrowid, name, email, version))
+                    changes.append(("user", "create", user.id, user))
+                    results.append(user)
+                else:
+                    results.append(None)
+        return results
+
+    def get_user(self, user_id):
+        row = self._connection().execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+        return _user_from_row(row) if row else None
+
+    def find_user_by_email(self, email):
+        row = self._connection().execute(
+            "SELECT id FROM users WHERE email_key = ?", (normalize_email(email),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _select_ids(self, query, ids):
+        """Exécute `query` (dont le "{}" reçoit les paramètres) pour tous les ids, par tranches."""
+        ids = list(set(ids))
+        conn = self._connection()
+        # SQLite limite le nombre de paramètres par requête : on découpe
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            yield from conn.execute(query.format(", ".join("?" * len(chunk))), chunk)
+
+    def get_users(self, user_ids):
+        rows = self._select_ids(f"SELECT {USER_COLUMNS} FROM users WHERE id IN ({{}})", user_ids)
+        return {user.id: user for user in map(_user_from_row, rows)}
+
+    def existing_user_ids(self, user_ids):
+        return {row[0] for row in self._select_ids("SELECT id FROM users WHERE id IN ({})", user_ids)}
+
+    def update_user(self, user_id, name=None, email=None):
+        try:
+            with self._write() as (conn, changes):
+                # Un champ vide (None) garde sa valeur ; un utilisateur absent ou
+                # inchangé ne touche aucune ligne et la version du store n'avance pas
+                name, email = name or None, email or None
+                cursor = conn.execute(
+                    "UPDATE users SET name = COALESCE(?, name), email = COALESCE(?, email), "
+                    "email_key = COALESCE(?, email_key) "
+                    "WHERE id = ? AND (name <> COALESCE(?, name) OR email <> COALESCE(?, email))",
+                    (name, email, normalize_email(email) if email else None, user_id, name, email),
+                )
+                if not cursor.rowcount:
+                    row = conn.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (user_id,)).fetchone()
+                    return _user_from_row(row) if row else None
+                version = self._bump(conn, 'users')
+                row = conn.execute(
+                    f"UPDATE users SET version = ? WHERE id = ? RETURNING {USER_COLUMNS}", (version, user_id)
+                ).fetchone()
+                user = _user_from_row(row)
+                changes.append(("user", "update", user_id, user))
+        except sqlite3.IntegrityError:
+            raise DuplicateEmailError(email)
+        return user
+
+    def delete_user(self, user_id):
+        with self._write() as (conn, changes):
+            article_ids = [row[0] for row in conn.execute("SELECT id FROM articles WHERE user_id = ?", (user_id,))]
+            # Les articles et leurs tags suivent par ON DELETE CASCADE
+            cursor = conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            if cursor.rowcount:
+                self._bump(conn, 'users')
+                if article_ids:  # sans article, les réponses d'articles restent valides
+                    self._bump(conn, 'articles')
+                changes.append(("user", "delete", user_id, None))
+                changes.extend(("article", "delete", article_id, None) for article_id in article_ids)
+        return cursor.rowcount > 0
+
+    def list_users(self, after=None, limit=None):
+        rows = self._connection().execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE id > ? ORDER BY id LIMIT ?",
+            (after if after is not None else 0, limit if limit is not None else -1),
+        )
+        return [_user_from_row(row) for row in rows]
+
+    def count_users(self):
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def add_article(self, user_id, title, content, tags, created_at=None):
+        return self.add_articles([(user_id, title, content, tags, created_at)])[0]
+
+    def add_articles(self, entries):
+        articles = []
+        with self._write() as (conn, changes):
+            version = None  # la version du store n'avance qu'au premier article inséré
+            for user_id, title, content, tags, created_at in entries:
+                created_at = created_at or datetime.now()
+                # INSERT ... SELECT : rien n'est inséré si l'auteur n'existe pas (la
+                # transaction, déjà en écriture, exclut une suppression concurrente)
+                cursor = conn.execute(
+                    "INSERT INTO articles (user_id, title, content, tags, created_at, version) "
+                    "SELECT id, ?, ?, ?, ?, ? FROM users WHERE id = ?",
+                    (title, content, ','.join(tags), _format_date(created_at), version or 0, user_id),
+                )
+                if not cursor.rowcount:
+                    articles.append(None)
+                    continue
+                article_id = cursor.lastrowid
+                if version is None:
+                    version = self._bump(conn, 'articles')
+                    conn.execute("UPDATE articles SET version = ? WHERE id = ?", (version, article_id))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO article_tags (tag, article_id) VALUES (?, ?)",
+                    [(tag, article_id) for tag in tags],
+                )
+                article = Article(ArticleInfos(id=article_id, user_id=user_id, title=title, content=content,
+                                               tags=tags, created_at=created_at))
+                article._version = version
+                articles.append(article)
+                changes.append(("article", "create", article_id, article))
+        return articles
+
+    def get_article(self, article_id):
+        row = self._connection().execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM articles a WHERE a.id = ?", (article_id,)
+        ).fetchone()
+        return _article_from_row(row) if row else None
+
+    def get_articles(self, article_ids):
+        rows = self._select_ids(f"SELECT {ARTICLE_COLUMNS} FROM articles a WHERE a.id IN ({{}})", article_ids)
+        return {article.id: article for article in map(_article_from_row, rows)}
+
+    def query_articles(self, tag=None, date_after=None, order='id', after=None, limit=None):
+        sql = [f"SELECT {ARTICLE_COLUMNS} FROM articles a"]
+        where = []
+        params = []
+        if tag is not None:
+            sql.append("JOIN article_tags t ON t.article_id = a.id AND t.tag = ?")
+            params.append(tag)
+        if date_after is not None:
+            where.append("a.created_at >= ?")
+            params.append(_format_date(date_after))
+        if after is not None:
+            if order == 'created_at':
+                where.append("(a.created_at > ? OR (a.created_at = ? AND a.id > ?))")
+                params.extend([_format_date(after[0]), _format_date(after[0]), after[1]])
+            else:
+                where.append("a.id > ?")
+                params.append(after)
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append("ORDER BY a.created_at, a.id" if order == 'created_at' else "ORDER BY a.id")
+        sql.append("LIMIT ?")
+        params.append(limit if limit is not None else -1)
+        rows = self._connection().execute(" ".join(sql), params)
+        return [_article_from_row(row) for row in rows]
+
+    def user_articles(self, user_id, after=None, limit=None):
+        rows = self._connection().execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM articles a WHERE a.user_id = ? AND a.id > ? ORDER BY a.id LIMIT ?",
+            (user_id, after if after is not None else 0, limit if limit is not None else -1),
+        )
+        return [_article_from_row(row) for row in rows]
+
+    def search_articles(self, query, offset=0, limit=20):
+        # Les termes ne contiennent que des caractères de mot : on peut les citer tels quels
+        terms = parse_query(query)
+        if not terms:
+            return []
+        match = " AND ".join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+        rows = self._connection().execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM articles_fts f JOIN articles a ON a.id = f.rowid "
+            "WHERE articles_fts MATCH ? ORDER BY bm25(articles_fts), a.id LIMIT ? OFFSET ?",
+            (match, limit, offset),
+        )
+        return [_article_from_row(row) for row in rows]
+
+    def count_articles(self):
+        return self._connection().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def tag_counts(self, limit=None):
+        rows = self._connection().execute(
+            "SELECT tag, count FROM tag_counts ORDER BY count DESC, tag LIMIT ?",
+            (limit if limit is not None else -1,),
+        )
+        return [tuple(row) for row in rows]
+
+    def tag_count(self, tag):
+        row = self._connection().execute("SELECT count FROM tag_counts WHERE tag = ?", (tag,)).fetchone()
+        return row[0] if row else 0
+
+    def count_tags(self):
+        return self._connection().execute("SELECT COUNT(*) FROM tag_counts").fetchone()[0]
+
+    def user_stats(self, user_id, limit=None):
+        conn = self._connection()
+        row = conn.execute("SELECT count FROM user_article_counts WHERE user_id = ?", (user_id,)).fetchone()
+        # Les K premiers dans l'index de classement, puis le total tenu à jour : coût ~ limit
+        tags = conn.execute(
+            "SELECT tag, count FROM user_tag_counts WHERE user_id = ? ORDER BY count DESC, tag LIMIT ?",
+            (user_id, limit if limit is not None else -1),
+        )
+        distinct = conn.execute("SELECT count FROM user_distinct_tags WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0, [tuple(tag) for tag in tags], distinct[0] if distinct else 0
+
+    def store_version(self, name):
+        version, modified_at = self._connection().execute(
+            "SELECT version, modified_at FROM store_versions WHERE name = ?", (name,)
+        ).fetchone()
+        return version, datetime.fromisoformat(modified_at).replace(tzinfo=timezone.utc)
+
+    def clear(self):
+        with self._write() as (conn, changes):
+            conn.execute("DELETE FROM article_tags")
+            conn.execute("DELETE FROM articles")
+            conn.execute("DELETE FROM users")
+            for table in ('tag_counts', 'user_tag_counts', 'user_distinct_tags', 'user_article_counts'):
+                conn.execute(f"DELETE FROM {table}")
+            # La séquence du journal de changements continue (les consommateurs se resynchronisent)
+            conn.execute("DELETE FROM sqlite_sequence WHERE name != 'changes'")
+            self._bump(conn, 'users')
+            self._bump(conn, 'articles')
+            changes += [("user", "clear", None, None), ("article", "clear", None, None)]
+
+    def close(self):
+        self._connections.close()
+
+
+def open_storage(url='memory'):
+    """Ouvre le backend correspondant à `url` ("memory", "memory:///chemin" ou "sqlite:///chemin")."""
+    if url in (None, '', 'memory'):
+        return MemoryStorage()
+    if url.startswith('memory:///'):
+        # memory:///chemin?fsync=always|interval|never&snapshot_every=N
+        parts = urlsplit(url)
+        options = dict(parse_qsl(parts.query))
+        if 'snapshot_every' in options:
+            options['snapshot_every'] = int(options['snapshot_every'])
+        return PersistentMemoryStorage(parts.path, **options)
+    if url.startswith('sqlite:///'):
+        return SQLiteStorage(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported storage URL: {url}")
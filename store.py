@@ -0,0 +1,427 @@
+# store.py
+# Conteneurs "in-memory" pour les utilisateurs et les articles.
+# Ce sont des dict classiques (les routes et les tests y accèdent directement)
+# qui maintiennent en plus des index secondaires à chaque écriture.
+# Les valeurs sont des enregistrements `models.User` / `models.Article` ;
+# un dict inséré directement est converti à l'insertion.
+
+import heapq
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from itertools import islice
+
+from locks import RWLock
+from models import User, Article
+from search import SearchIndex, article_text
+
+
+def normalize_email(email):
+    """Normalise un email pour les comparaisons d'unicité (casse, espaces)."""
+    return email.strip().lower()
+
+
+def _remove_sorted(values, value):
+    """Retire `value` d'une liste triée (recherche dichotomique)."""
+    position = bisect_left(values, value)
+    if position < len(values) and values[position] == value:
+        del values[position]
+
+
+def _iter_sorted(values, after=None, start=0):
+    """Parcourt une liste triée à partir de `start`, strictement après `after`."""
+    if after is not None:
+        start = max(start, bisect_right(values, after))
+    for position in range(start, len(values)):
+        yield values[position]
+
+
+class IndexedStore(dict):
+    """Base des stores : {id: Record} qui maintient ses index à chaque écriture.
+
+    `version` augmente à chaque écriture (jamais remis à zéro, même par clear)
+    et part de l'horloge (µs) à la création du store : elle dépasse celles
+    d'une exécution précédente, un client ne reçoit donc pas de 304 pour un
+    ETag d'avant le redémarrage. Chaque enregistrement garde dans `_version` la version du store lors de
+    sa dernière modification ; `modified_at` date (UTC) la dernière écriture.
+
+    Les ids viennent de `next_id()` : ils ne sont jamais réutilisés après une
+    suppression (seul clear remet la séquence à zéro). Le store lui-même ne
+    verrouille rien : les accès concurrents passent par `lock` (voir
+    storage.MemoryStorage).
+
+    `_index` est tout ou rien : ce qui peut échouer (valeur invalide) est
+    vérifié avant de toucher aux index, et une écriture refusée laisse le
+    store tel qu'il était.
+
+    `listener(op, id, enregistrement)`, si défini, est appelé après chaque
+    écriture ("create", "update", "delete" ou "clear") : sous le verrou
+    d'écriture, donc dans l'ordre où les écritures s'appliquent. load() ne le
+    déclenche pas.
+    """
+
+    record_class = None
+    listener = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.lock = RWLock()
+        self.last_id = 0
+        self.version = time.time_ns() // 1000
+        self.modified_at = datetime.now(timezone.utc)
+        self._insert = insort  # insertion dans les index triés (list.append pendant load)
+        self._create_indexes()
+        self.update(*args, **kwargs)
+
+    def _create_indexes(self):
+        self.ids = []  # ids triés, pour la pagination par clé
+
+    def _index(self, record_id, record):
+        self._insert(self.ids, record_id)
+
+    def _unindex(self, record_id, record):
+        _remove_sorted(self.ids, record_id)
+
+    def __setitem__(self, record_id, record):
+        if isinstance(record, dict):
+            record = self.record_class.from_dict(record)
+        previous = self.get(record_id)
+        replaced = previous is not None
+        if replaced:
+            self._unindex(record_id, previous)
+        super().__setitem__(record_id, record)
+        try:
+            self._index(record_id, record)
+        except BaseException:
+            # _index n'a rien modifié (voir IndexedStore) : on remet l'état d'avant
+            if replaced:
+                super().__setitem__(record_id, previous)
+                self._index(record_id, previous)
+            else:
+                super().__delitem__(record_id)
+            raise
+        if record_id > self.last_id:
+            self.last_id = record_id
+        self.touch(record)
+        if self.listener is not None:
+            self.listener("update" if replaced else "create", record_id, record)
+
+    def __delitem__(self, record_id):
+        record = self[record_id]
+        self._unindex(record_id, record)
+        super().__delitem__(record_id)
+        self.touch()
+        if self.listener is not None:
+            self.listener("delete", record_id, record)
+
+    def pop(self, record_id, *default):
+        if record_id not in self:
+            return super().pop(record_id, *default)
+        record = self[record_id]
+        del self[record_id]
+        return record
+
+    def load(self, records):
+        """Remplit un store vide en masse (reprise) : une seule version pour tout le lot.
+
+        Les index sont remplis sans tri puis triés une fois à la fin.
+        """
+        if self:
+            raise ValueError("load() expects an empty store")
+        version = self.version + 1
+        set_item = super().__setitem__
+        set_version = object.__setattr__  # "_version" n'invalide pas _json
+        self._begin_load()
+        try:
+            for record in records:
+                record_id = record.id
+                set_item(record_id, record)
+                self._index(record_id, record)
+                set_version(record, '_version', version)
+        finally:
+            self._end_load()
+        if self.ids:
+            self.last_id = max(self.last_id, self.ids[-1])
+        self.touch()
+
+    def _begin_load(self):
+        self._insert = list.append
+
+    def _end_load(self):
+        self._insert = insort
+        self.ids.sort()
+
+    def update(self, *args, **kwargs):
+        for record_id, record in dict(*args, **kwargs).items():
+            self[record_id] = record
+
+    def clear(self):
+        super().clear()
+        self._create_indexes()
+        self.last_id = 0
+        self.touch()
+        if self.listener is not None:
+            self.listener("clear", None, None)
+
+    def next_id(self):
+        """Réserve l'id suivant (à appeler sous le verrou d'écriture)."""
+        self.last_id += 1
+        return self.last_id
+
+    def touch(self, record=None):
+        """Enregistre une écriture : nouvelle version du store (et de l'enregistrement)."""
+        self.version += 1
+        self.modified_at = datetime.now(timezone.utc)
+        if record is not None:
+            record._version = self.version
+            # Après la version : un _json calculé pendant l'écriture est effacé
+            # ici ou écarté par app.record_json
+            object.__setattr__(record, '_json', None)
+
+
+class UserStore(IndexedStore):
+    """{user_id: User} avec un index email normalisé -> user_id."""
+
+    record_class = User
+
+    def _create_indexes(self):
+        super()._create_indexes()
+        self.email_index = {}
+
+    def _index(self, user_id, user):
+        key = normalize_email(user.email)
+        super()._index(user_id, user)
+        self.email_index[key] = user_id
+
+    def _unindex(self, user_id, user):
+        super()._unindex(user_id, user)
+        self._unindex_email(user_id, user)
+
+    def _unindex_email(self, user_id, user):
+        key = normalize_email(user.email)
+        if self.email_index.get(key) == user_id:
+            del self.email_index[key]
+
+    def find_by_email(self, email):
+        """Retourne l'id de l'utilisateur possédant cet email, ou None."""
+        return self.email_index.get(normalize_email(email))
+
+    def update_fields(self, user_id, name=None, email=None):
+        """Modifie le nom et/ou l'email d'un utilisateur en gardant l'index à jour.
+
+        Retourne (utilisateur, vrai s'il a changé) : sans valeur nouvelle, ni
+        version ni listener ne bougent.
+        """
+        user = self[user_id]
+        if name == user.name:
+            name = None
+        if email == user.email:
+            email = None
+        if not name and not email:
+            return user, False
+        if name:
+            user.name = name
+        if email:
+            # Seul l'index email change : l'utilisateur reste dans l'index trié des ids
+            self._unindex_email(user_id, user)
+            user.email = email
+            self.email_index[normalize_email(email)] = user_id
+        self.touch(user)
+        if self.listener is not None:
+            self.listener("update", user_id, user)
+        return user, True
+
+    def page(self, after=None, limit=None):
+        """Retourne les ids triés strictement après `after`, au plus `limit`."""
+        return list(islice(_iter_sorted(self.ids, after), limit))
+
+
+class ArticleStore(IndexedStore):
+    """{article_id: Article} avec des index tag -> ids, user_id -> ids, par date et plein texte.
+
+    Les compteurs par tag (classement global) et par utilisateur sont tenus à
+    jour à chaque ajout ou suppression : GET /tags et GET /users/<id>/stats ne
+    parcourent jamais les articles.
+    """
+
+    record_class = Article
+
+    def _create_indexes(self):
+        super()._create_indexes()
+        self.tag_index = {}   # {tag: [article_id, ...]} triés par id
+        self.user_index = {}  # {user_id: [article_id, ...]} triés par id
+        self.date_index = []  # [(created_at, article_id), ...] triés
+        self.tag_date_index = {}  # {tag: [(created_at, article_id), ...]} triés (mêmes tuples)
+        self.search_index = SearchIndex()  # titre + contenu
+        self.tag_ranking = []      # [(-nombre d'articles, tag), ...] triés : top-K = K premiers
+        self.user_tag_counts = {}  # {user_id: {tag: nombre d'articles}}
+        self.user_tag_ranking = {}  # {user_id: [(-nombre d'articles, tag), ...] triés}, comme tag_ranking
+        self._ranking = True       # classement tenu à jour (recalculé en fin de load)
+
+    def _rank_tag(self, ranking, tag, old_count, new_count):
+        """Déplace `tag` dans un classement trié [(-nombre, tag)] (global ou d'un utilisateur)."""
+        if not self._ranking:
+            return
+        if old_count:
+            _remove_sorted(ranking, (-old_count, tag))
+        if new_count:
+            insort(ranking, (-new_count, tag))
+
+    def _index(self, article_id, article):
+        # Dates naïves (heure locale) seulement : une date avec fuseau ne se
+        # compare pas aux autres dans date_index
+        if not isinstance(article.created_at, datetime) or article.created_at.tzinfo is not None:
+            raise TypeError(f"created_at must be a naive datetime, got {article.created_at!r}")
+        super()._index(article_id, article)
+        insert = self._insert
+        date_key = (article.created_at, article_id)
+        user_tags = self.user_tag_counts.setdefault(article.user_id, {})
+        user_ranking = self.user_tag_ranking.setdefault(article.user_id, [])
+        for tag in set(article.tags):
+            ids = self.tag_index.setdefault(tag, [])
+            insert(ids, article_id)
+            insert(self.tag_date_index.setdefault(tag, []), date_key)
+            self._rank_tag(self.tag_ranking, tag, len(ids) - 1, len(ids))
+            count = user_tags.get(tag, 0)
+            user_tags[tag] = count + 1
+            self._rank_tag(user_ranking, tag, count, count + 1)
+        insert(self.user_index.setdefault(article.user_id, []), article_id)
+        insert(self.date_index, date_key)
+        self.search_index.add(article_id, article_text(article))
+
+    def _begin_load(self):
+        super()._begin_load()
+        self._ranking = False
+        self.search_index.begin_bulk()
+
+    def _end_load(self):
+        super()._end_load()
+        for ids in self.tag_index.values():
+            ids.sort()
+        for keys in self.tag_date_index.values():
+            keys.sort()
+        for ids in self.user_index.values():
+            ids.sort()
+        self.date_index.sort()
+        self.search_index.end_bulk()
+        self.tag_ranking = sorted((-len(ids), tag) for tag, ids in self.tag_index.items())
+        self.user_tag_ranking = {user_id: sorted((-count, tag) for tag, count in user_tags.items())
+                                 for user_id, user_tags in self.user_tag_counts.items()}
+        self._ranking = True
+
+    def _unindex(self, article_id, article):
+        super()._unindex(article_id, article)
+        date_key = (article.created_at, article_id)
+        user_tags = self.user_tag_counts.get(article.user_id, {})
+        user_ranking = self.user_tag_ranking.get(article.user_id, [])
+        for tag in set(article.tags):
+            ids = self.tag_index[tag]
+            _remove_sorted(ids, article_id)
+            _remove_sorted(self.tag_date_index[tag], date_key)
+            self._rank_tag(self.tag_ranking, tag, len(ids) + 1, len(ids))
+            if not ids:
+                del self.tag_index[tag]
+                del self.tag_date_index[tag]
+            count = user_tags.get(tag, 0)
+            if count > 1:
+                user_tags[tag] = count - 1
+            else:
+                user_tags.pop(tag, None)
+            self._rank_tag(user_ranking, tag, count, count - 1)
+        if not user_tags:
+            self.user_tag_counts.pop(article.user_id, None)
+            self.user_tag_ranking.pop(article.user_id, None)
+        user_ids = self.user_index.get(article.user_id)
+        if user_ids is not None:
+            _remove_sorted(user_ids, article_id)
+            if not user_ids:
+                del self.user_index[article.user_id]
+        _remove_sorted(self.date_index, date_key)
+        self.search_index.remove(article_id, article_text(article))
+
+    def by_user(self, user_id, after=None, limit=None):
+        """Retourne les ids des articles d'un utilisateur, triés par id."""
+        return list(islice(_iter_sorted(self.user_index.get(user_id, []), after), limit))
+
+    def top_tags(self, limit=None):
+        """Retourne [(tag, nombre d'articles)] par nombre décroissant puis par tag (coût ~ limit)."""
+        return [(tag, -count) for count, tag in islice(self.tag_ranking, limit)]
+
+    def tag_count(self, tag):
+        return len(self.tag_index.get(tag, ()))
+
+    def user_stats(self, user_id, limit=None):
+        """Retourne (nombre d'articles, tags de l'utilisateur comme top_tags, nombre de tags distincts)."""
+        # Classement tenu à jour comme tag_ranking : coût ~ limit
+        ranking = self.user_tag_ranking.get(user_id, ())
+        return (len(self.user_index.get(user_id, ())), [(tag, -count) for count, tag in islice(ranking, limit)],
+                len(ranking))
+
+    def delete_by_user(self, user_id):
+        """Supprime tous les articles d'un utilisateur. Retourne le nombre supprimé."""
+        # On détache la liste d'abord : _unindex n'a plus à la modifier article par article
+        article_ids = self.user_index.pop(user_id, [])
+        for article_id in article_ids:
+            del self[article_id]
+        return len(article_ids)
+
+    def sort_key(self, article_id, order='id'):
+        """Clé de tri (et de curseur) d'un article pour l'ordre donné."""
+        if order == 'created_at':
+            return (self[article_id].created_at, article_id)
+        return article_id
+
+    def query(self, tag=None, date_after=None, order='id', after=None, limit=None):
+        """Retourne les ids d'articles correspondant aux filtres, dans l'ordre demandé.
+
+        `order` vaut 'id' ou 'created_at' ; `after` est la clé de tri du dernier
+        article de la page précédente (voir sort_key). Seuls les index sont
+        parcourus. Coût d'une page :
+        - sans date_after, ou dans l'ordre 'created_at' : ~ log n + limit ;
+        - date_after dans l'ordre 'id' : la tranche de dates n'est pas triée par
+          id. Si elle contient la plupart des articles (du tag), la liste par id
+          est filtrée : ~ limit * (articles du tag) / (articles datés). Sinon
+          toute la tranche est parcourue à chaque page : ~ nombre d'articles
+          datés d'après date_after.
+        """
+        if order == 'created_at':
+            ids = self._iter_by_date(tag, date_after, after)
+        else:
+            ids = self._iter_by_id(tag, date_after, after, limit)
+        return list(islice(ids, limit))
+
+    def _dates(self, tag):
+        """Clés (created_at, id) triées de tous les articles, ou de ceux du tag."""
+        return self.date_index if tag is None else self.tag_date_index.get(tag, [])
+
+    def _iter_by_id(self, tag, date_after, after, limit=None):
+        ids = self.ids if tag is None else self.tag_index.get(tag, [])
+        if date_after is None:
+            yield from _iter_sorted(ids, after)
+            return
+
+        # Articles (du tag) datés d'après date_after : une tranche de l'index par date
+        dates = self._dates(tag)
+        date_start = bisect_left(dates, (date_after,))
+        dated = len(dates) - date_start
+
+        # Parcours paresseux de la liste triée par id : coût ~ limit * len(ids) / dated
+        # en moyenne. Sinon on prend dans la tranche les `limit` plus petits ids
+        # après `after` : coût ~ dated, sans trier toute la tranche à chaque page.
+        lazy = len(ids) <= dated or (limit is not None and limit * len(ids) < dated * dated)
+        if lazy:
+            for article_id in _iter_sorted(ids, after):
+                if self[article_id].created_at >= date_after:
+                    yield article_id
+            return
+
+        candidates = (article_id for _, article_id in islice(dates, date_start, None)
+                      if after is None or article_id > after)
+        yield from sorted(candidates) if limit is None else heapq.nsmallest(limit, candidates)
+
+    def _iter_by_date(self, tag, date_after, after):
+        # L'index par date (global ou du tag) est déjà dans l'ordre : coût ~ limit
+        dates = self._dates(tag)
+        start = 0 if date_after is None else bisect_left(dates, (date_after,))
+        for created_at, article_id in _iter_sorted(dates, after, start):
+            yield article_id
@@ -1,7 +1,10 @@
 # tests/test_articles.py
 import unittest
-from app import app, users_db, articles_db
-from datetime import datetime, timedelta
+from app import app, users_db, articles_db, article_for_response, articles_response_cache
+from flask import jsonify
+from models import Article
+from datetime import datetime, timedelta, timezone
+from utils import encode_cursor
 
 class ArticleAPITestCase(unittest.TestCase):
 
@@ -27,6 +30,13 @@ class ArticleAPITestCase(unittest.TestCase):
         self.assertEqual(len(articles_db), 1)
         self.assertIn('python', articles_db[1]['tags'])
         self.assertIn('flask', articles_db[1]['tags'])
+
+    def test_create_article_stored_as_record(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1', 'tags': 'python'})
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art2', 'content': 'C2', 'tags': ' python '})
+        self.assertIsInstance(articles_db[1], Article)
+        # Les tags identiques partagent la même chaîne internée
+        self.assertIs(articles_db[1].tags[0], articles_db[2].tags[0])
         
     def test_create_article_missing_fields(self):
         response = self.app.post('/articles', json={
@@ -59,6 +69,15 @@ class ArticleAPITestCase(unittest.TestCase):
         self.assertEqual(len(response.json), 2)
         self.assertIn('Art1', str(response.json))
 
+    def test_get_articles_streamed_body_matches_jsonify(self):
+        for i in range(5):
+            self.app.post('/articles', json={'user_id': self.user_id, 'title': f'Art{i} é', 'content': 'C', 'tags': 'python'})
+        response = self.app.get('/articles?tag=python')
+        self.assertTrue(response.is_streamed)
+        with app.app_context():
+            expected = jsonify([article_for_response(articles_db[i]) for i in sorted(articles_db)]).data
+        self.assertEqual(response.data, expected)
+
     def test_get_articles_filter_by_tag(self):
         self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1', 'tags': 'python'})
         self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art2', 'content': 'C2', 'tags': 'flask,python'})
@@ -95,17 +114,168 @@ class ArticleAPITestCase(unittest.TestCase):
         self.assertIn('Future Article', str(response.json))
         self.assertNotIn('Old Article', str(response.json))
 
+    def test_get_articles_filter_by_tag_and_date_after(self):
+        now = datetime.now()
+        yesterday = now - timedelta(days=2)
+
+        articles_db[1] = {'id': 1, 'user_id': self.user_id, 'title': 'Old Python', 'content': 'Old', 'tags': ['python'], 'created_at': yesterday}
+        articles_db[2] = {'id': 2, 'user_id': self.user_id, 'title': 'New Python', 'content': 'New', 'tags': ['python'], 'created_at': now}
+        articles_db[3] = {'id': 3, 'user_id': self.user_id, 'title': 'New Java', 'content': 'New', 'tags': ['java'], 'created_at': now}
+
+        response = self.app.get(f'/articles?tag=python&date_after={now.strftime("%Y-%m-%d")}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([article['title'] for article in response.json], ['New Python'])
+
+    def test_get_articles_filter_after_user_delete(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1', 'tags': 'python'})
+        self.app.delete(f'/users/{self.user_id}')
+
+        response = self.app.get('/articles?tag=python')
+        self.assertEqual(response.json, [])
+        self.assertNotIn('python', articles_db.tag_index)
+        self.assertEqual(articles_db.date_index, [])
+
+    def test_get_articles_paginated_by_created_at(self):
+        now = datetime.now()
+        for article_id, days in [(1, 3), (2, 1), (3, 2), (4, 0)]:
+            articles_db[article_id] = {'id': article_id, 'user_id': self.user_id, 'title': f'Art{article_id}', 'content': 'C',
+                                       'tags': ['python'] if article_id != 3 else [], 'created_at': now - timedelta(days=days)}
+
+        response = self.app.get('/articles?order=created_at&limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([article['id'] for article in response.json['items']], [1, 3])
+
+        response = self.app.get(f'/articles?order=created_at&limit=2&after={response.json["next_cursor"]}')
+        self.assertEqual([article['id'] for article in response.json['items']], [2, 4])
+        self.assertIsNone(response.json['next_cursor'])
+
+        response = self.app.get('/articles?order=created_at&tag=python&limit=10')
+        self.assertEqual([article['id'] for article in response.json['items']], [1, 2, 4])
+
+    def test_get_articles_paginated_cursor_order_mismatch(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1'})
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art2', 'content': 'C2'})
+        cursor = self.app.get('/articles?limit=1').json['next_cursor']
+        response = self.app.get(f'/articles?order=created_at&limit=1&after={cursor}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid cursor", str(response.data))
+
+    def test_cursor_with_time_zone_rejected(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1'})
+        cursor = encode_cursor((datetime(2024, 1, 1, tzinfo=timezone.utc), 1))
+        response = self.app.get(f'/articles?order=created_at&limit=1&after={cursor}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid cursor", str(response.data))
+
+    def test_cursor_out_of_range_rejected(self):
+        # Au-delà des entiers 64 bits, l'id ou le rang ne peut pas atteindre SQLite
+        for url in (f'/articles?limit=1&after={encode_cursor(2 ** 63)}',
+                    f'/articles?order=created_at&limit=1&after={encode_cursor((datetime(2024, 1, 1), 2 ** 63))}',
+                    f'/articles/search?q=art&after={encode_cursor(2 ** 63)}'):
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("Invalid cursor", str(response.data))
+
+    def test_rejected_write_leaves_indexes_intact(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1', 'tags': 'python'})
+        aware = {'id': 2, 'user_id': self.user_id, 'title': 'Art2', 'content': 'C2', 'tags': ['python'],
+                 'created_at': datetime(2024, 1, 1, tzinfo=timezone.utc)}
+        with self.assertRaises(TypeError):
+            articles_db[2] = aware
+        with self.assertRaises(TypeError):
+            articles_db[1] = {**aware, 'id': 1}
+        self.assertEqual(list(articles_db), [1])
+        self.assertEqual(articles_db[1]['title'], 'Art1')
+        self.assertEqual((articles_db.ids, len(articles_db.date_index)), ([1], 1))
+        self.assertEqual(articles_db.tag_index, {'python': [1]})
+        self.assertEqual([article['id'] for article in self.app.get('/articles/search?q=art1').json['items']], [1])
+
     def test_get_articles_filter_invalid_date_format(self):
         response = self.app.get('/articles?date_after=not-a-date')
         self.assertEqual(response.status_code, 400)
         self.assertIn("Invalid date_after format", str(response.data))
 
+    def test_search_articles(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Flask tutorial', 'content': 'Building an API in Python'})
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Python tips', 'content': 'Python everywhere'})
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Rust', 'content': 'Borrowing'})
+
+        response = self.app.get('/articles/search?q=python')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([article['id'] for article in response.json['items']], [2, 1])
+
+        response = self.app.get('/articles/search?q=pyth*&limit=1')
+        self.assertEqual([article['id'] for article in response.json['items']], [2])
+        response = self.app.get(f'/articles/search?q=pyth*&limit=1&after={response.json["next_cursor"]}')
+        self.assertEqual([article['id'] for article in response.json['items']], [1])
+        self.assertIsNone(response.json['next_cursor'])
+
+    def test_search_articles_cached(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Flask', 'content': 'Python'})
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Tips', 'content': 'Python'})
+        first = self.app.get('/articles/search?q=python&limit=5')
+        # Réponse reprise du cache : même corps, mêmes en-têtes
+        response = self.app.get('/articles/search?q=python&limit=5')
+        self.assertEqual(response.json, first.json)
+        self.assertEqual(len(response.json['items']), 2)
+        self.assertEqual(response.mimetype, 'application/json')
+
+    def test_search_articles_after_user_delete(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Flask', 'content': 'Python'})
+        self.app.delete(f'/users/{self.user_id}')
+        self.assertEqual(self.app.get('/articles/search?q=python').json['items'], [])
+
+    def test_search_articles_requires_query(self):
+        response = self.app.get('/articles/search?q=')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("q is required", str(response.data))
+
     def test_get_single_article_success(self):
         self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Single Article', 'content': 'Content'})
         response = self.app.get('/articles/1')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json['title'], 'Single Article')
 
+    def test_article_responses_match_jsonify(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Crème brûlée', 'content': 'C', 'tags': 'cuisine'})
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Plain', 'content': 'C'})
+        with app.app_context():
+            single = jsonify(article_for_response(articles_db[1])).data
+            page = jsonify({'items': [article_for_response(articles_db[1])], 'next_cursor': None}).data
+        # Deux lectures : la seconde passe par la forme JSON mise en cache
+        for _ in range(2):
+            self.assertEqual(self.app.get('/articles/1').data, single)
+        self.assertEqual(self.app.get('/articles?tag=cuisine&limit=5').data, page)
+
+    def test_get_articles_conditional_and_cached(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1', 'tags': 'python'})
+        response = self.app.get('/articles?tag=python')
+        etag = response.headers['ETag']
+        version = articles_db.version
+        body = response.data  # le corps streamé est mis en cache une fois entièrement lu
+        self.assertIsNotNone(articles_response_cache.get(('/articles', b'tag=python', version)))
+
+        # Même URL, même version : corps repris du cache
+        self.assertEqual(self.app.get('/articles?tag=python').data, body)
+        self.assertEqual(self.app.get('/articles?tag=python', headers={'If-None-Match': etag}).status_code, 304)
+
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art2', 'content': 'C2', 'tags': 'python'})
+        response = self.app.get('/articles?tag=python', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 2)
+
+    def test_get_single_article_conditional(self):
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art1', 'content': 'C1'})
+        etag = self.app.get('/articles/1').headers['ETag']
+        self.app.post('/articles', json={'user_id': self.user_id, 'title': 'Art2', 'content': 'C2'})
+        # Un autre article a changé, pas celui-ci
+        self.assertEqual(self.app.get('/articles/1', headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_invalid_filter_not_conditional(self):
+        etag = self.app.get('/articles').headers['ETag']
+        response = self.app.get('/articles?date_after=bad', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 400)
+
     def test_get_single_article_not_found(self):
         response = self.app.get('/articles/999')
         self.assertEqual(response.status_code, 404)
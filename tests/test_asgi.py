@@ -0,0 +1,191 @@
+# tests/test_asgi.py
+import asyncio
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import app, users_db, articles_db
+from asgi import AsgiApp, build_environ
+from storage import open_storage
+
+
+async def call(application, method, path, body=b"", query_string=b"", headers=()):
+    """Exécute une requête sur une application ASGI ; retourne (status, headers, corps)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "root_path": "",
+        "query_string": query_string, "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+        "headers": [(b"host", b"testserver"), *headers],
+    }
+    if body:
+        scope["headers"] += [(b"content-type", b"application/json"),
+                             (b"content-length", str(len(body)).encode())]
+    # Le corps arrive en deux morceaux, comme sur le réseau
+    messages = [{"type": "http.request", "body": body[:3], "more_body": True},
+                {"type": "http.request", "body": body[3:], "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    start = sent[0]
+    assert start["type"] == "http.response.start"
+    assert sent[-1]["more_body"] is False
+    return start["status"], dict(start["headers"]), b"".join(message["body"] for message in sent[1:])
+
+
+class AsgiTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.application = AsgiApp(app)
+        self.addCleanup(self.application.executor.shutdown)
+        self.addCleanup(self.application.stream_executor.shutdown)
+
+    def request(self, *args, **kwargs):
+        return asyncio.run(call(self.application, *args, **kwargs))
+
+    def test_same_responses_as_wsgi(self):
+        status, _, body = self.request("POST", "/users", json.dumps({"name": "Alice", "email": "alice@example.com"}).encode())
+        self.assertEqual(status, 201)
+        self.request("POST", "/articles", json.dumps({"user_id": 1, "title": "T", "content": "C", "tags": "a,b"}).encode())
+
+        client = app.test_client()
+        for path, query in [("/users", b""), ("/users/1", b""), ("/articles", b"tag=a"),
+                            ("/articles", b"limit=1"), ("/users/1/articles", b""), ("/users/42", b"")]:
+            status, headers, body = self.request("GET", path, query_string=query)
+            expected = client.get(path, query_string=query.decode())
+            self.assertEqual(status, expected.status_code)
+            self.assertEqual(body, expected.data)
+            self.assertEqual(headers.get(b"etag"), expected.headers.get("ETag", "").encode() or None)
+
+    def test_validation_errors(self):
+        status, _, body = self.request("POST", "/users", json.dumps({"name": "Alice"}).encode())
+        self.assertEqual(status, 400)
+        self.assertIn(b"Name and email are required", body)
+
+    def test_conditional_get(self):
+        self.request("POST", "/users", json.dumps({"name": "Alice", "email": "alice@example.com"}).encode())
+        _, headers, _ = self.request("GET", "/users/1")
+        status, _, body = self.request("GET", "/users/1", headers=[(b"if-none-match", headers[b"etag"])])
+        self.assertEqual((status, body), (304, b""))
+
+    def test_event_stream_does_not_block_loop(self):
+        async def scenario():
+            stream = asyncio.ensure_future(call(self.application, "GET", "/changes/stream",
+                                                query_string=b"duration=1"))
+            await asyncio.sleep(0.05)
+            created = await call(self.application, "POST", "/users",
+                                 json.dumps({"name": "Alice", "email": "alice@example.com"}).encode())
+            return created, await stream
+
+        (status, _, _), (stream_status, headers, body) = asyncio.run(scenario())
+        self.assertEqual((status, stream_status), (201, 200))
+        self.assertEqual(headers[b"content-type"], b"text/event-stream; charset=utf-8")
+        self.assertIn(b"event: change", body)
+        self.assertIn(b"alice@example.com", body)
+
+    def test_inline_only_with_non_blocking_storage(self):
+        self.assertTrue(self.application.inline)
+        # Le journal sur disque fait des fsync : les requêtes passent par le pool de threads
+        with tempfile.TemporaryDirectory() as directory:
+            persistent = open_storage('memory:///' + directory.lstrip('/'))
+            try:
+                with patch('asgi.storage', persistent):
+                    application = AsgiApp(app)
+                    application.executor.shutdown()
+                    application.stream_executor.shutdown()
+                self.assertFalse(application.inline)
+            finally:
+                persistent.close()
+
+    def test_thread_pool_mode(self):
+        application = AsgiApp(app, inline=False)
+        self.addCleanup(application.executor.shutdown)
+        for i in range(3):
+            asyncio.run(call(application, "POST", "/users",
+                             json.dumps({"name": f"user{i}", "email": f"user{i}@example.com"}).encode()))
+        status, _, body = asyncio.run(call(application, "GET", "/users"))
+        self.assertEqual(status, 200)
+        self.assertEqual([user["id"] for user in json.loads(body)], [1, 2, 3])
+
+    def test_many_concurrent_requests(self):
+        async def scenario():
+            signups = [call(self.application, "POST", "/users",
+                            json.dumps({"name": f"user{i}", "email": f"user{i}@example.com"}).encode())
+                       for i in range(500)]
+            reads = [call(self.application, "GET", "/users", query_string=b"limit=10") for _ in range(500)]
+            return await asyncio.gather(*signups, *reads)
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(status in (200, 201) for status, _, _ in results))
+        self.assertEqual(len(users_db), 500)
+
+    def receive_chunks(self, chunks):
+        """receive() qui délivre `chunks` puis une déconnexion ; compte les messages lus."""
+        messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+        messages[-1]["more_body"] = False
+        self.received = 0
+
+        async def receive():
+            self.received += 1
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+        return receive
+
+    def send_request(self, method, path, receive, headers=()):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "root_path": "", "query_string": b"",
+            "server": ("testserver", 80), "client": ("127.0.0.1", 5000), "headers": list(headers),
+        }
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return sent[0]["status"], b"".join(message.get("body", b"") for message in sent[1:])
+
+    def test_body_limit_enforced_while_receiving(self):
+        # Corps "chunked" (sans Content-Length) plus gros que la limite d'une route JSON
+        chunks = [b"x" * (256 * 1024)] * 16
+        status, body = self.send_request("POST", "/users", self.receive_chunks(chunks),
+                                         [(b"content-type", b"application/json")])
+        self.assertEqual(status, 413)
+        self.assertIn(b"Request body too large", body)
+        self.assertEqual(self.received, 5)  # la réception s'arrête une fois la limite dépassée
+
+        # Content-Length annoncé trop grand : rien n'est lu
+        status, _ = self.send_request("POST", "/users", self.receive_chunks([b"{}"]),
+                                      [(b"content-type", b"application/json"), (b"content-length", b"2000000")])
+        self.assertEqual((status, self.received), (413, 0))
+
+    def test_bulk_body_streamed(self):
+        lines = [json.dumps({"name": f"U{i}", "email": f"u{i}@example.com"}).encode() + b"\n" for i in range(2000)]
+        # Plus gros que la limite des routes JSON, en petits morceaux, sans Content-Length
+        chunks = [b"".join(lines[i:i + 10]) + b" " * 8000 for i in range(0, len(lines), 10)]
+        self.assertGreater(sum(map(len, chunks)), 1024 * 1024)
+        status, body = self.send_request("POST", "/users/bulk", self.receive_chunks(chunks),
+                                         [(b"content-type", b"application/x-ndjson")])
+        self.assertEqual(status, 201, body)
+        self.assertEqual(json.loads(body)["created"], 2000)
+        self.assertEqual(len(users_db), 2000)
+
+    def test_build_environ(self):
+        environ = build_environ({
+            "method": "GET", "path": "/users", "query_string": b"limit=5", "http_version": "1.1",
+            "headers": [(b"accept", b"a"), (b"accept", b"b"), (b"content-type", b"text/plain")],
+        }, b"")
+        self.assertEqual(environ["HTTP_ACCEPT"], "a,b")
+        self.assertEqual(environ["CONTENT_TYPE"], "text/plain")
+        self.assertEqual(environ["QUERY_STRING"], "limit=5")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# tests/test_batch_reads.py
+import unittest
+from app import app, users_db, articles_db
+
+
+class BatchReadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.app = app.test_client()
+        self.app.testing = True
+        for name in ('Alice', 'Bob', 'Carol'):
+            self.app.post('/users', json={'name': name, 'email': f'{name.lower()}@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'A1', 'content': 'C', 'tags': 'python'})
+        self.app.post('/articles', json={'user_id': 2, 'title': 'B1', 'content': 'C'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'A2', 'content': 'C'})
+
+    def test_users_by_ids(self):
+        response = self.app.get('/users?ids=3,1,99,1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['name'] for user in response.json['items']], ['Carol', 'Alice'])
+        self.assertEqual(response.json['missing'], [99])
+
+    def test_articles_by_ids(self):
+        response = self.app.get('/articles?ids=3,2')
+        self.assertEqual([article['title'] for article in response.json['items']], ['A2', 'B1'])
+        self.assertNotIn('author', response.json['items'][0])
+
+    def test_include_author(self):
+        response = self.app.get('/articles?ids=1,2&include=author')
+        authors = [article['author'] for article in response.json['items']]
+        self.assertEqual(authors, [{'id': 1, 'name': 'Alice', 'email': 'alice@example.com'},
+                                   {'id': 2, 'name': 'Bob', 'email': 'bob@example.com'}])
+        # Même corps que la sérialisation standard de Flask (clés triées)
+        expected = app.json.response({'items': [dict(article) for article in response.json['items']],
+                                      'missing': []}).get_data()
+        self.assertEqual(response.data, expected)
+
+    def test_include_author_on_page(self):
+        response = self.app.get('/articles?limit=2&include=author')
+        self.assertEqual([article['author']['name'] for article in response.json['items']], ['Alice', 'Bob'])
+        self.assertIsNotNone(response.json['next_cursor'])
+
+    def test_include_author_follows_user_updates(self):
+        first = self.app.get('/articles?ids=1&include=author')
+        self.app.put('/users/1', json={'name': 'Alicia'})
+        second = self.app.get('/articles?ids=1&include=author', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json['items'][0]['author']['name'], 'Alicia')
+
+    def test_invalid_requests(self):
+        for url in ('/users?ids=1,x', '/users?ids=', '/users?ids=1&limit=5', '/articles?ids=1&tag=python',
+                    '/articles?include=comments', '/articles?include=author',
+                    '/users?ids=1,9223372036854775808', '/articles?ids=0',
+                    '/users?ids=' + ','.join(map(str, range(1002)))):
+            self.assertEqual(self.app.get(url).status_code, 400, url)
+
+
+if __name__ == '__main__':
+    unittest.main()
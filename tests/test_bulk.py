@@ -0,0 +1,158 @@
+# tests/test_bulk.py
+import json
+from datetime import datetime, timezone
+import unittest
+from app import app, users_db, articles_db
+
+
+def ndjson(*records):
+    return "\n".join(json.dumps(record) if not isinstance(record, str) else record for record in records) + "\n"
+
+
+class BulkRouteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.app = app.test_client()
+        self.app.testing = True
+
+    def test_bulk_users(self):
+        body = ndjson(
+            {'name': 'Alice', 'email': 'alice@example.com'},
+            {'name': 'Bob', 'email': 'invalid-email'},
+            'not json',
+            {'name': 'Alicia', 'email': 'ALICE@example.com'},
+            {'name': 'Carol', 'email': 'carol@example.com'},
+        )
+        response = self.app.post('/users/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['created'], 2)
+        self.assertEqual(response.json['errors'], [
+            {'line': 2, 'error': 'Invalid email format'},
+            {'line': 3, 'error': 'Invalid JSON'},
+            {'line': 4, 'error': 'User with this email already exists'},
+        ])
+        self.assertEqual(len(users_db), 2)
+
+    def test_bulk_articles(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        body = ndjson(
+            {'user_id': 1, 'title': 'Art1', 'content': 'C1', 'tags': 'python,flask'},
+            {'user_id': 1, 'title': 'Art2', 'content': 'C2', 'tags': ['python'], 'created_at': '2024-01-02T03:04:05'},
+            {'user_id': 999, 'title': 'Art3', 'content': 'C3'},
+            {'user_id': 1, 'title': 'Art4'},
+        )
+        response = self.app.post('/articles/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['created'], 2)
+        self.assertEqual([error['line'] for error in response.json['errors']], [3, 4])
+        self.assertEqual(len(self.app.get('/articles?tag=python').json), 2)
+        self.assertEqual(articles_db[2]['created_at'].year, 2024)
+
+    def test_bulk_articles_with_time_zone(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        body = ndjson(
+            {'user_id': 1, 'title': 'Art1', 'content': 'C1', 'created_at': '2024-01-02T03:04:05'},
+            {'user_id': 1, 'title': 'Art2', 'content': 'C2', 'created_at': '2024-01-01T00:00:00+00:00'},
+        )
+        response = self.app.post('/articles/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual((response.status_code, response.json['created']), (201, 2))
+        # Converti en heure locale naïve, comme les autres dates
+        expected = datetime(2024, 1, 1, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        self.assertEqual(articles_db[2]['created_at'], expected)
+        self.assertEqual(len(articles_db.date_index), 2)
+        response = self.app.get('/articles?order=created_at&limit=10')
+        self.assertEqual([article['id'] for article in response.json['items']], [2, 1])
+
+    def test_bulk_articles_with_out_of_range_dates(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        body = ndjson(
+            {'user_id': 1, 'title': 'Art1', 'content': 'C1', 'created_at': '0001-01-01T00:00:00+14:00'},
+            {'user_id': 1, 'title': 'Art2', 'content': 'C2', 'created_at': '0999-01-01T00:00:00'},
+            {'user_id': 1, 'title': 'Art3', 'content': 'C3', 'created_at': '1000-01-01T00:00:00'},
+        )
+        response = self.app.post('/articles/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual((response.status_code, response.json['created']), (201, 1))
+        self.assertEqual([error['line'] for error in response.json['errors']], [1, 2])
+        self.assertIn("Invalid created_at format", response.json['errors'][0]['error'])
+
+    def test_bulk_only_errors(self):
+        response = self.app.post('/users/bulk', data=ndjson({'name': 'Bob'}), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['created'], 0)
+
+    def test_export(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'Art1', 'content': 'C1', 'tags': 'python'})
+        response = self.app.get('/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([line['type'] for line in lines], ['user', 'article'])
+        self.assertEqual(lines[1]['tags'], ['python'])
+
+    def test_export_reimport(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'Art1', 'content': 'C1', 'tags': 'python'})
+        lines = self.app.get('/export').data.decode().splitlines()
+        users = [line for line in lines if json.loads(line)['type'] == 'user']
+        articles = [line for line in lines if json.loads(line)['type'] == 'article']
+
+        users_db.clear()
+        articles_db.clear()
+        self.assertEqual(self.app.post('/users/bulk', data="\n".join(users)).json['created'], 1)
+        self.assertEqual(self.app.post('/articles/bulk', data="\n".join(articles)).json['created'], 1)
+        self.assertEqual(articles_db[1]['tags'], ('python',))
+
+    def test_export_reimport_keeps_user_ids(self):
+        for name in ('Alice', 'Bob', 'Carol'):
+            self.app.post('/users', json={'name': name, 'email': f'{name.lower()}@example.com'})
+        self.app.post('/articles', json={'user_id': 3, 'title': 'By Carol', 'content': 'C'})
+        self.app.delete('/users/1')
+        lines = self.app.get('/export').data.decode().splitlines()
+        users = [line for line in lines if json.loads(line)['type'] == 'user']
+        articles = [line for line in lines if json.loads(line)['type'] == 'article']
+
+        users_db.clear()
+        articles_db.clear()
+        self.assertEqual(self.app.post('/users/bulk', data="\n".join(users)).json['created'], 2)
+        self.assertEqual(self.app.post('/articles/bulk', data="\n".join(articles)).json['created'], 1)
+        self.assertEqual(self.app.get('/users/3').json['name'], 'Carol')
+        self.assertEqual([article['title'] for article in self.app.get('/users/3/articles').json], ['By Carol'])
+        # Les ids attribués ensuite suivent les ids importés
+        self.assertEqual(self.app.post('/users', json={'name': 'Dan', 'email': 'dan@example.com'}).json['id'], 4)
+
+    def test_bulk_users_with_taken_id(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        body = ndjson(
+            {'id': 1, 'name': 'Bob', 'email': 'bob@example.com'},
+            {'id': 5, 'name': 'Carol', 'email': 'carol@example.com'},
+            {'id': 5, 'name': 'Dan', 'email': 'dan@example.com'},
+            {'id': 6, 'name': 'Alicia', 'email': 'ALICE@example.com'},
+            {'id': '7', 'name': 'Eve', 'email': 'eve@example.com'},
+        )
+        response = self.app.post('/users/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.json['created'], 1)
+        self.assertEqual(response.json['errors'], [
+            {'line': 1, 'error': 'User with this id already exists'},
+            {'line': 3, 'error': 'User with this id already exists'},
+            {'line': 4, 'error': 'User with this email already exists'},
+            {'line': 5, 'error': 'id must be an integer'},
+        ])
+        self.assertEqual(users_db[5]['name'], 'Carol')
+
+    def test_bulk_users_with_too_large_id(self):
+        # Un id imposé avance l'allocateur : les créations suivantes doivent rester possibles
+        body = ndjson({'id': 2 ** 63 - 1, 'name': 'X', 'email': 'x@example.com'},
+                      {'id': 2 ** 53 - 1, 'name': 'Y', 'email': 'y@example.com'})
+        response = self.app.post('/users/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.json['created'], 1)
+        self.assertEqual(response.json['errors'], [{'line': 1, 'error': f"id must be between 1 and {2 ** 53 - 1}"}])
+        response = self.app.post('/users', json={'name': 'Z', 'email': 'z@example.com'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.app.get(f"/users/{response.json['id']}").json['name'], 'Z')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+# tests/test_changes.py
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+from app import app, users_db, articles_db
+from changes import ChangeFeed, ChangesExpired, SharedChangeFeed
+from storage import DuplicateEmailError, SQLiteStorage
+
+
+class ChangeFeedTestCase(unittest.TestCase):
+
+    def test_ring(self):
+        feed = ChangeFeed(capacity=3)
+        start = feed.last_seq
+        self.assertEqual(feed.since(), [])
+        seqs = [feed.publish('user', 'create', i, {'id': i}) for i in range(1, 6)]
+        self.assertEqual(seqs, list(range(start + 1, start + 6)))
+        self.assertEqual([change['id'] for change in feed.since()], [3, 4, 5])
+        self.assertEqual([change['id'] for change in feed.since(start + 3, limit=1)], [4])
+        self.assertEqual(feed.since(feed.last_seq), [])
+        with self.assertRaises(ChangesExpired) as raised:
+            feed.since(start + 1)
+        self.assertEqual(raised.exception.first_seq, start + 3)
+        with self.assertRaises(ChangesExpired):
+            feed.since(feed.last_seq + 1)  # numéro jamais attribué
+        self.assertEqual(feed.since(0), feed.since())  # 0 : depuis le plus ancien gardé
+
+    def test_wait(self):
+        feed = ChangeFeed()
+        seq = feed.last_seq
+        self.assertFalse(feed.wait(seq, 0.01))
+        threading.Timer(0.01, feed.publish, ('user', 'delete', 1)).start()
+        self.assertTrue(feed.wait(seq, 5))
+
+
+class SharedChangeFeedTestCase(unittest.TestCase):
+    """Deux SQLiteStorage sur le même fichier : deux workers."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        path = os.path.join(self.tmpdir.name, 'app.db')
+        self.first, self.second = SQLiteStorage(path), SQLiteStorage(path)
+        for storage in (self.first, self.second):
+            storage.keep_changes(lambda kind, op, record: json.dumps(record.to_dict()) if record else None, 5)
+            self.addCleanup(storage.close)
+        self.feed = SharedChangeFeed(self.first)
+
+    def test_same_sequence_for_every_process(self):
+        self.assertEqual((self.feed.since(), self.feed.last_seq, self.feed.first_seq), ([], 0, 1))
+        alice = self.first.add_user('Alice', 'alice@example.com')
+        self.second.add_article(alice.id, 'T', 'C', ['python'])
+        with self.assertRaises(DuplicateEmailError):
+            self.second.add_user('Other', 'alice@example.com')  # annulée : pas de changement
+        self.second.delete_user(alice.id)
+        items = SharedChangeFeed(self.second).since(0)
+        self.assertEqual(items, self.feed.since(0))
+        self.assertEqual([(item['seq'], item['type'], item['op'], item['id']) for item in items], [
+            (1, 'user', 'create', 1), (2, 'article', 'create', 1), (3, 'user', 'delete', 1), (4, 'article', 'delete', 1),
+        ])
+        self.assertEqual(items[0]['data'], {'id': 1, 'name': 'Alice', 'email': 'alice@example.com'})
+        self.assertEqual([item['seq'] for item in self.feed.since(2, limit=1)], [3])
+        with self.assertRaises(ChangesExpired):
+            self.feed.since(5)  # numéro jamais attribué
+        self.first.clear()
+        self.assertEqual(self.feed.last_seq, 6)  # la séquence continue après clear
+
+    def test_trimmed_to_capacity(self):
+        with patch.object(SQLiteStorage, 'CHANGES_TRIM_INTERVAL', 1):
+            for i in range(8):
+                self.second.add_user(f'U{i}', f'u{i}@example.com')
+        self.assertEqual((self.feed.first_seq, self.feed.last_seq), (4, 8))
+        with self.assertRaises(ChangesExpired) as raised:
+            self.feed.since(2)
+        self.assertEqual(raised.exception.first_seq, 4)
+        self.assertEqual([item['id'] for item in self.feed.since(3)], [4, 5, 6, 7, 8])
+        self.assertEqual(self.feed.since(0), self.feed.since())  # 0 : depuis le plus ancien gardé
+
+    def test_wait_sees_other_process(self):
+        self.assertFalse(self.feed.wait(0, 0.01))
+        threading.Timer(0.01, self.second.add_user, ('Bob', 'bob@example.com')).start()
+        self.assertTrue(self.feed.wait(0, 5))
+
+
+class ChangeRouteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.app = app.test_client()
+        self.app.testing = True
+        self.since = app_module.changes.last_seq
+
+    def changes(self, **params):
+        params.setdefault('since', self.since)
+        return self.app.get('/changes', query_string=params)
+
+    def test_changes_follow_writes(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'T', 'content': 'C', 'tags': 'python'})
+        self.app.put('/users/1', json={'name': 'Alicia'})
+        self.app.delete('/users/1')
+        response = self.changes()
+        self.assertEqual(response.status_code, 200)
+        items = response.json['items']
+        self.assertEqual([(item['type'], item['op'], item['id']) for item in items], [
+            ('user', 'create', 1), ('article', 'create', 1), ('user', 'update', 1),
+            ('user', 'delete', 1), ('article', 'delete', 1),
+        ])
+        self.assertEqual(items[2]['data'], {'id': 1, 'name': 'Alicia', 'email': 'alice@example.com'})
+        self.assertEqual(items[1]['data']['tags'], ['python'])
+        self.assertIsNone(items[3]['data'])
+        self.assertEqual([item['seq'] for item in items], list(range(self.since + 1, self.since + 6)))
+        self.assertEqual(response.json['next_since'], response.json['last_seq'])
+
+    def test_unchanged_update_not_published(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        etag = self.app.get('/users/1').headers['ETag']
+        for body in ({}, {'name': 'Alice'}, {'name': 'Alice', 'email': 'alice@example.com'}):
+            self.assertEqual(self.app.put('/users/1', json=body).status_code, 200)
+        self.assertEqual([item['op'] for item in self.changes().json['items']], ['create'])
+        self.assertEqual(self.app.get('/users/1').headers['ETag'], etag)
+
+    def test_bulk_import_and_paging(self):
+        body = "".join(json.dumps({'name': f'U{i}', 'email': f'u{i}@example.com'}) + "\n" for i in range(5))
+        self.app.post('/users/bulk', data=body, content_type='application/x-ndjson')
+        page = self.changes(limit=2).json
+        self.assertEqual([item['id'] for item in page['items']], [1, 2])
+        self.assertEqual(page['next_since'], self.since + 2)
+        page = self.changes(since=page['next_since'], limit=10).json
+        self.assertEqual([item['id'] for item in page['items']], [3, 4, 5])
+        self.assertEqual(self.changes(since=page['next_since']).json['items'], [])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.changes(since='abc').status_code, 400)
+        self.assertEqual(self.changes(since=-1).status_code, 400)
+        self.assertEqual(self.changes(since=2 ** 63).status_code, 400)
+        self.assertEqual(self.changes(limit=0).status_code, 400)
+
+    def test_refused_with_several_workers_and_local_feed(self):
+        with patch.object(app_module, 'CHANGES_AVAILABLE', False):
+            self.assertEqual(self.changes().status_code, 501)
+            self.assertEqual(self.app.get('/changes/stream').status_code, 501)
+
+    def test_expired(self):
+        response = self.changes(since=1)
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json['first_seq'], app_module.changes.first_seq)
+        self.assertEqual(self.app.get('/changes/stream?since=1').status_code, 410)
+
+    def test_since_zero_on_every_backend(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        storage = SQLiteStorage(os.path.join(tmpdir.name, 'app.db'))
+        storage.keep_changes(lambda kind, op, record: json.dumps(record.to_dict()) if record else None, 2)
+        self.addCleanup(storage.close)
+        with patch.object(SQLiteStorage, 'CHANGES_TRIM_INTERVAL', 1):
+            for i in range(4):
+                storage.add_user(f'U{i}', f'u{i}@example.com')
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        for feed in (app_module.changes, SharedChangeFeed(storage)):
+            with patch.object(app_module, 'changes', feed):
+                response = self.changes(since=0)
+                self.assertEqual(response.status_code, 200)
+                items = response.json['items']
+                self.assertEqual(items[0]['seq'], feed.first_seq)
+                self.assertEqual(response.json['next_since'], items[-1]['seq'])
+                body = self.app.get('/changes/stream?since=0&duration=0').get_data(as_text=True)
+                self.assertIn(f"id: {feed.last_seq}\nevent: change", body)
+
+    def test_stream(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        response = self.app.get('/changes/stream', query_string={'duration': 0},
+                                headers={'Last-Event-ID': str(self.since)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        body = response.get_data(as_text=True)
+        self.assertIn(f"id: {self.since + 1}\nevent: change\ndata: ", body)
+        data = json.loads(body.split("data: ", 1)[1].split("\n", 1)[0])
+        self.assertEqual((data['type'], data['op'], data['data']['name']), ('user', 'create', 'Alice'))
+
+    def test_stream_invalid_duration(self):
+        for duration in ('nan', 'inf', 'abc'):
+            response = self.app.get('/changes/stream', query_string={'duration': duration})
+            self.assertEqual(response.status_code, 400, duration)
+
+    def test_stream_waits_for_changes(self):
+        threading.Timer(0.05, self.app.post, ('/users',), {'json': {'name': 'Bob', 'email': 'bob@example.com'}}).start()
+        body = self.app.get('/changes/stream?duration=0.5').get_data(as_text=True)
+        self.assertIn('"name":"Bob"', body.replace(' ', ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+# tests/test_concurrency.py
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from locks import RWLock
+from storage import MemoryStorage, DuplicateEmailError, open_storage
+
+THREADS = 8
+USERS_PER_THREAD = 200
+
+
+class RWLockTestCase(unittest.TestCase):
+
+    def test_readers_share_the_lock(self):
+        lock = RWLock()
+        inside = threading.Barrier(2, timeout=2)
+
+        def reader():
+            with lock.read():
+                inside.wait()  # les deux lecteurs doivent être dedans en même temps
+
+        threads = [threading.Thread(target=reader) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(inside.broken)
+
+    def test_writer_is_exclusive(self):
+        lock = RWLock()
+        events = []
+
+        def writer():
+            with lock.write():
+                events.append('write')
+
+        with lock.read():
+            thread = threading.Thread(target=writer)
+            thread.start()
+            time.sleep(0.05)
+            events.append('read done')
+        thread.join()
+        self.assertEqual(events, ['read done', 'write'])
+
+    def test_waiting_writer_blocks_new_readers(self):
+        lock = RWLock()
+        lock.acquire_read()
+        writer = threading.Thread(target=lambda: (lock.acquire_write(), lock.release_write()))
+        writer.start()
+        while not lock._waiting_writers:
+            time.sleep(0.001)
+        reader_done = threading.Event()
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), reader_done.set(), lock.release_read()))
+        reader.start()
+        self.assertFalse(reader_done.wait(0.05))
+        lock.release_read()
+        writer.join()
+        reader.join()
+        self.assertTrue(reader_done.is_set())
+
+
+class ConcurrentStorageContract:
+    """Écritures et lectures concurrentes : aucun enregistrement perdu ni dupliqué."""
+
+    def tearDown(self):
+        self.storage.close()
+
+    def test_concurrent_signups(self):
+        # Chaque thread crée ses propres utilisateurs, puis tous tentent le même email
+        def signup(worker):
+            created = []
+            for i in range(USERS_PER_THREAD):
+                created.append(self.storage.add_user(f'user{worker}-{i}', f'user{worker}-{i}@example.com'))
+                self.storage.list_users(limit=10)
+            try:
+                created.append(self.storage.add_user('Shared', 'SHARED@example.com'))
+            except DuplicateEmailError:
+                pass
+            return created
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            users = [user for created in executor.map(signup, range(THREADS)) for user in created]
+
+        ids = [user.id for user in users]
+        self.assertEqual(len(ids), THREADS * USERS_PER_THREAD + 1)
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(self.storage.count_users(), len(ids))
+        self.assertEqual(sum(user.email == 'SHARED@example.com' for user in users), 1)
+        for user in users:
+            self.assertEqual(self.storage.get_user(user.id).email, user.email)
+
+    def test_concurrent_articles_and_deletes(self):
+        authors = [self.storage.add_user(f'author{i}', f'author{i}@example.com') for i in range(THREADS)]
+        keeper = self.storage.add_user('keeper', 'keeper@example.com')
+
+        def write(author):
+            kept = []
+            for i in range(USERS_PER_THREAD):
+                kept.append(self.storage.add_article(keeper.id, f'kept {i}', 'content', ['kept']).id)
+                self.storage.add_article(author.id, f'gone {i}', 'content', ['gone'])
+                self.storage.query_articles(tag='kept', limit=10)
+            self.storage.delete_user(author.id)
+            return kept
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            kept = [article_id for ids in executor.map(write, authors) for article_id in ids]
+
+        self.assertEqual(len(set(kept)), THREADS * USERS_PER_THREAD)
+        self.assertEqual(sorted(kept), [article.id for article in self.storage.query_articles(tag='kept')])
+        self.assertEqual(self.storage.query_articles(tag='gone'), [])
+        self.assertEqual(self.storage.count_articles(), len(kept))
+
+    def test_no_article_for_concurrently_deleted_author(self):
+        authors = [self.storage.add_user(f'author{i}', f'author{i}@example.com') for i in range(THREADS)]
+
+        def write(author):
+            for i in range(USERS_PER_THREAD):
+                self.storage.add_article(author.id, f'gone {i}', 'content', ['gone'])
+
+        with ThreadPoolExecutor(THREADS * 2) as executor:
+            writers = [executor.submit(write, author) for author in authors]
+            deletes = [executor.submit(self.storage.delete_user, author.id) for author in authors]
+            for future in writers + deletes:
+                future.result()
+
+        # Les articles créés avant la suppression sont partis avec l'auteur, les autres sont refusés
+        self.assertEqual(self.storage.query_articles(tag='gone'), [])
+        self.assertEqual(self.storage.count_articles(), 0)
+
+
+class MemoryConcurrencyTestCase(ConcurrentStorageContract, unittest.TestCase):
+
+    def setUp(self):
+        self.storage = MemoryStorage()
+
+
+class SQLiteConcurrencyTestCase(ConcurrentStorageContract, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.storage = open_storage('sqlite:///' + os.path.join(self.tmpdir.name, 'app.db'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# tests/test_json_provider.py
+import unittest
+from datetime import datetime
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import OrjsonProvider, COMPACT_SEPARATORS, orjson
+
+
+@unittest.skipIf(orjson is None, "orjson n'est pas installé")
+class OrjsonProviderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        self.fast = OrjsonProvider(app)
+        self.default = DefaultJSONProvider(app)
+
+    def assertSameOutput(self, obj, **kwargs):
+        self.assertEqual(self.fast.dumps(obj, **kwargs), self.default.dumps(obj, **kwargs))
+
+    def test_compact_output_matches_default(self):
+        for obj in [
+            {'b': 1, 'a': [1, None, True, False], 'c': {'z': 'x', 'y': ''}},
+            {'text': 'quote " backslash \\ newline \n tab \t control \x01 del \x7f'},
+            {'accents': 'éàü', 'emoji': '\U0001F600'},
+            {'date': datetime(2024, 1, 2, 3, 4, 5)},
+            [2 ** 70],
+            None,
+        ]:
+            self.assertSameOutput(obj, separators=COMPACT_SEPARATORS)
+
+    def test_non_compact_output_matches_default(self):
+        self.assertSameOutput({'b': 1, 'a': 2})
+        self.assertSameOutput({'b': 1, 'a': 2}, indent=2)
+
+    def test_loads(self):
+        self.assertEqual(self.fast.loads('{"a": [1, "é"]}'), {'a': [1, 'é']})
+        with self.assertRaises(ValueError):
+            self.fast.loads('{invalid')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+# tests/test_metrics.py
+import os
+import pstats
+import re
+import tempfile
+import time
+import unittest
+
+from flask import Flask
+
+from app import app, users_db, articles_db
+import metrics as metrics_module
+from metrics import Histogram, Metrics
+
+
+def sample(text, name, **labels):
+    """Valeur d'un échantillon du format texte de Prometheus (None s'il est absent)."""
+    for line in text.splitlines():
+        match = re.match(r"^(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if match and match.group(1) == name:
+            found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ""))
+            if found == {key: str(value) for key, value in labels.items()}:
+                return float(match.group(3))
+    return None
+
+
+class MetricsEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.app = app.test_client()
+
+    def metrics(self):
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        return response.data.decode()
+
+    def test_request_metrics(self):
+        before = self.metrics()
+        count = sample(before, 'app_requests_total', route='/users/<int:user_id>', method='GET', status=404) or 0
+        self.app.get('/users/42')
+        text = self.metrics()
+        self.assertEqual(sample(text, 'app_requests_total', route='/users/<int:user_id>', method='GET', status=404),
+                         count + 1)
+        self.assertGreaterEqual(sample(text, 'app_request_duration_seconds_count',
+                                       route='/users/<int:user_id>', method='GET'), 1)
+        self.assertEqual(sample(text, 'app_request_duration_seconds_bucket',
+                                route='/users/<int:user_id>', method='GET', le='+Inf'),
+                         sample(text, 'app_request_duration_seconds_count', route='/users/<int:user_id>', method='GET'))
+
+    def test_stage_metrics(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        text = self.metrics()
+        for stage in ('validate', 'storage.add_user', 'serialize'):
+            self.assertGreaterEqual(sample(text, 'app_stage_duration_seconds_count', stage=stage), 1, stage)
+
+    def test_store_gauges(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'T', 'content': 'C'})
+        text = self.metrics()
+        self.assertEqual(sample(text, 'app_store_records', store='users'), 1)
+        self.assertEqual(sample(text, 'app_store_records', store='articles'), 1)
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        lines = histogram.render('h', (('stage', 'x'),))
+        self.assertEqual(lines, [
+            'h_bucket{stage="x",le="0.1"} 2',
+            'h_bucket{stage="x",le="1.0"} 3',
+            'h_bucket{stage="x",le="+Inf"} 4',
+            'h_sum{stage="x"} 2.65',
+            'h_count{stage="x"} 4',
+        ])
+
+    def test_disabled_metrics_add_nothing(self):
+        metrics = Metrics(enabled=False)
+
+        def handler():
+            return 'ok'
+
+        self.assertIs(metrics.timed('stage')(handler), handler)
+        flask_app = Flask(__name__)
+        metrics.install(flask_app)
+        self.assertEqual(flask_app.before_request_funcs, {})
+        self.assertEqual(flask_app.after_request_funcs, {})
+        self.assertEqual(flask_app.test_client().get('/metrics').status_code, 200)
+
+    def test_from_env(self):
+        metrics = Metrics.from_env({'METRICS_ENABLED': '0', 'PROFILE_SLOW_MS': '250', 'PROFILE_SAMPLE_RATE': '0.5'})
+        self.assertFalse(metrics.enabled)
+        self.assertEqual((metrics.profile_slow, metrics.profile_sample_rate), (0.25, 0.5))
+        self.assertIsNone(Metrics.from_env({}).profile_slow)
+
+    def test_slow_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            metrics = Metrics(profile_slow_ms=20, profile_dir=profile_dir)
+            flask_app = Flask(__name__)
+
+            @flask_app.route('/slow')
+            def slow():
+                time.sleep(0.03)
+                return 'slow'
+
+            @flask_app.route('/fast')
+            def fast():
+                return 'fast'
+
+            metrics.install(flask_app)
+            client = flask_app.test_client()
+            client.get('/fast')
+            client.get('/slow')
+
+            dumps = os.listdir(profile_dir)
+            self.assertEqual(len(dumps), 1)
+            self.assertIn('GET-slow', dumps[0])
+            stats = pstats.Stats(os.path.join(profile_dir, dumps[0]))
+            self.assertTrue(any(func[2] == 'slow' for func in stats.stats))
+
+    def test_overlapping_requests_skip_profiling(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            metrics = Metrics(profile_slow_ms=0, profile_dir=profile_dir)
+            flask_app = Flask(__name__)
+            flask_app.add_url_rule('/slow', 'slow', lambda: 'slow')
+            metrics.install(flask_app)
+            client = flask_app.test_client()
+
+            # Une autre requête est profilée : celle-ci est servie sans profileur
+            with metrics_module._profiler_lock:
+                self.assertEqual(client.get('/slow').status_code, 200)
+            self.assertEqual(os.listdir(profile_dir), [])
+            self.assertEqual(client.get('/slow').status_code, 200)
+            self.assertEqual(len(os.listdir(profile_dir)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
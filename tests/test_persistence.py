@@ -0,0 +1,149 @@
+# tests/test_persistence.py
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from persistence import (
+    OP_ADD_ARTICLE, decode, encode_article, list_files, read_snapshot, snapshot_path, wal_path,
+)
+from models import Article, ArticleInfos
+from storage import PersistentMemoryStorage
+
+
+def state(storage):
+    users = [user.to_dict() for user in storage.list_users()]
+    articles = [article.to_dict() for article in storage.query_articles()]
+    return users, articles
+
+
+class EncodingTestCase(unittest.TestCase):
+
+    def test_article_roundtrip(self):
+        article = Article(ArticleInfos(id=7, user_id=3, title='Café ☕', content='x' * 1000,
+                                       tags=['a', 'été', ''], created_at=datetime(2024, 2, 29, 23, 59, 59, 999999)))
+        op, payload = encode_article(article)
+        self.assertEqual(op, OP_ADD_ARTICLE)
+        ints, strings = decode(op, payload)
+        self.assertEqual(ints[:2], (7, 3))
+        self.assertEqual(strings, ['Café ☕', 'x' * 1000, 'a', 'été', ''])
+
+
+class PersistentMemoryStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.directory = self.tmpdir.name
+
+    def open(self, **options):
+        storage = PersistentMemoryStorage(self.directory, **options)
+        self.addCleanup(storage.close)
+        return storage
+
+    def populate(self, storage):
+        alice = storage.add_user('Alice', 'alice@example.com')
+        bob = storage.add_user('Bob', 'bob@example.com')
+        storage.add_users([('Carol', 'carol@example.com'), ('Dup', 'ALICE@example.com')])
+        storage.add_article(alice.id, 'Flask', 'Python web', ['python', 'web'], created_at=datetime(2024, 1, 1))
+        storage.add_articles([(bob.id, 'Rust', 'Ownership', [], datetime(2024, 1, 2)),
+                              (bob.id, 'Go', 'Goroutines', ['go'], None)])
+        storage.update_user(alice.id, name='Alicia', email='alicia@example.com')
+        storage.delete_user(bob.id)
+
+    def test_recovery_from_log(self):
+        storage = self.open(fsync='always')
+        self.populate(storage)
+        expected = state(storage)
+        storage.close()
+
+        recovered = self.open()
+        self.assertEqual(state(recovered), expected)
+        self.assertEqual(recovered.find_user_by_email('ALICIA@example.com'), 1)
+        self.assertEqual([article.id for article in recovered.search_articles('python')], [1])
+        # Les ids ne sont pas réutilisés après la reprise
+        self.assertEqual(recovered.add_user('Dave', 'dave@example.com').id, 4)
+        self.assertEqual(recovered.add_article(1, 'New', 'Content', []).id, 4)
+
+    def test_snapshot_and_log_tail(self):
+        storage = self.open(fsync='never', snapshot_every=0)
+        self.populate(storage)
+        storage.snapshot()
+        storage.add_user('Eve', 'eve@example.com')
+        storage.delete_user(3)
+        expected = state(storage)
+        storage.close()
+
+        wals, snapshots = list_files(self.directory)
+        self.assertEqual((wals, snapshots), ([2], [2]))
+        header, records = read_snapshot(snapshot_path(self.directory, 2))
+        self.assertEqual(header, (2, 1, 3, 3))
+        self.assertEqual(len(list(records)), 3)
+
+        recovered = self.open()
+        self.assertEqual(state(recovered), expected)
+        # Compteurs de tags reconstruits au chargement de l'instantané
+        self.assertEqual(recovered.tag_counts(), [('python', 1), ('web', 1)])
+        self.assertEqual(recovered.user_stats(1), (1, [('python', 1), ('web', 1)], 2))
+
+    def test_periodic_snapshot(self):
+        storage = self.open(fsync='interval', snapshot_every=10)
+        for i in range(25):
+            storage.add_user(f'user{i}', f'user{i}@example.com')
+        storage.close()
+        _, snapshots = list_files(self.directory)
+        self.assertTrue(snapshots)
+        self.assertEqual(self.open().count_users(), 25)
+
+    def test_torn_tail_is_ignored(self):
+        storage = self.open(fsync='always')
+        storage.add_user('Alice', 'alice@example.com')
+        storage.add_user('Bob', 'bob@example.com')
+        storage.close()
+        path = wal_path(self.directory, 1)
+        size = os.path.getsize(path)
+        with open(path, 'r+b') as wal_file:
+            wal_file.truncate(size - 3)  # dernière écriture interrompue
+
+        storage = self.open(fsync='always')
+        self.assertEqual([user.name for user in storage.list_users()], ['Alice'])
+        storage.add_user('Carol', 'carol@example.com')
+        storage.close()
+        self.assertEqual([user.name for user in self.open().list_users()], ['Alice', 'Carol'])
+
+    def test_write_after_close_refused(self):
+        storage = self.open()
+        storage.close()
+        with self.assertRaises(ValueError):
+            storage.add_user('Alice', 'alice@example.com')
+        # Refusée par le journal, la mutation n'a pas été appliquée en mémoire
+        self.assertEqual(storage.list_users(), [])
+
+    def test_concurrent_group_commit(self):
+        storage = self.open(fsync='always')
+
+        def signup(worker):
+            for i in range(50):
+                storage.add_user(f'w{worker}', f'w{worker}-{i}@example.com')
+
+        threads = [threading.Thread(target=signup, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = state(storage)
+        storage.close()
+        self.assertEqual(len(expected[0]), 400)
+        self.assertEqual(state(self.open()), expected)
+
+    def test_versions_increase_across_restarts(self):
+        storage = self.open()
+        storage.add_user('Alice', 'alice@example.com')
+        version, _ = storage.store_version('users')
+        storage.close()
+        self.assertGreater(self.open().store_version('users')[0], version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+# tests/test_ratelimit.py
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from flask import Flask, Response, request
+
+from app import app, admission_class, users_db, articles_db
+from ratelimit import MemoryBuckets, RateLimiter, SQLiteBuckets, open_buckets, parse_limits
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class BucketsContract:
+    """Tests communs aux backends ; les sous-classes fournissent make_buckets(clock)."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.buckets = self.make_buckets(self.clock)
+        self.addCleanup(self.buckets.close)
+
+    def test_burst_then_refill(self):
+        self.assertEqual([self.buckets.take('a', 2.0, 3) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(self.buckets.take('a', 2.0, 3), 0.5)
+        self.assertEqual(self.buckets.take('b', 2.0, 3), 0)  # un seau par clé
+        self.clock.now += 0.5
+        self.assertEqual(self.buckets.take('a', 2.0, 3), 0)
+        self.clock.now += 100  # le seau ne dépasse pas sa capacité
+        self.assertEqual([self.buckets.take('a', 2.0, 3) for _ in range(4)][-1], 0.5)
+
+    def test_cost(self):
+        self.assertEqual(self.buckets.take('a', 1.0, 10, cost=10), 0)
+        self.assertAlmostEqual(self.buckets.take('a', 1.0, 10, cost=4), 4.0)
+
+    def test_cost_above_burst_waits_for_full_bucket(self):
+        self.assertEqual(self.buckets.take('a', 1.0, 5, cost=10), 0)
+        self.assertAlmostEqual(self.buckets.take('a', 1.0, 5, cost=10), 5.0)
+        self.clock.now += 5
+        self.assertEqual(self.buckets.take('a', 1.0, 5, cost=10), 0)
+
+
+class MemoryBucketsTestCase(BucketsContract, unittest.TestCase):
+
+    def make_buckets(self, clock):
+        return MemoryBuckets(clock=clock, max_buckets=2)
+
+    def test_full_buckets_forgotten(self):
+        self.buckets.take('a', 1.0, 2)
+        self.buckets.take('b', 1.0, 2)
+        self.clock.now += 10
+        self.buckets.take('c', 1.0, 2)
+        self.assertEqual(len(self.buckets), 1)
+
+
+class SQLiteBucketsTestCase(BucketsContract, unittest.TestCase):
+
+    def make_buckets(self, clock):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'limits.db')
+        return SQLiteBuckets(self.path, clock=clock)
+
+    def test_shared_between_instances(self):
+        other = SQLiteBuckets(self.path, clock=self.clock)
+        self.addCleanup(other.close)
+        self.buckets.take('a', 1.0, 2)
+        other.take('a', 1.0, 2)
+        self.assertEqual(self.buckets.take('a', 1.0, 2), 1.0)
+
+    def test_connection_closed_with_its_thread(self):
+        self.buckets.take('a', 1.0, 2)
+        for i in range(20):
+            thread = threading.Thread(target=self.buckets.take, args=(f'k{i}', 1.0, 2))
+            thread.start()
+            thread.join()
+        self.assertEqual(len(self.buckets._connections), 1)
+
+
+class ConfigTestCase(unittest.TestCase):
+
+    def test_parse_limits(self):
+        self.assertEqual(parse_limits("read=100:200, bulk=0.5:2"), {'read': (100.0, 200), 'bulk': (0.5, 2)})
+        self.assertEqual(parse_limits(""), {})
+        with self.assertRaises(ValueError):
+            parse_limits("read=100")
+        for spec in ("write=0:1", "write=-1:5", "write=nan:5", "write=inf:5", "write=1:0"):
+            with self.assertRaisesRegex(ValueError, "expected class=rate:burst"):
+                parse_limits(spec)
+
+    def test_from_env(self):
+        self.assertFalse(RateLimiter.from_env({}).enabled)
+        limiter = RateLimiter.from_env({'RATE_LIMIT_ENABLED': '1', 'RATE_LIMITS': 'write=1:1', 'MAX_IN_FLIGHT': '8'})
+        self.assertTrue(limiter.enabled)
+        self.assertEqual(limiter.limits['write'], (1.0, 1))
+        self.assertEqual(limiter.limits['read'], (100.0, 200))
+        self.assertEqual(limiter.max_in_flight, 8)
+        with self.assertRaises(ValueError):
+            open_buckets('redis://localhost')
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def make_app(self, **options):
+        flask_app = Flask(__name__)
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(backend=MemoryBuckets(clock=self.clock), **options)
+        self.limiter.install(flask_app, lambda: None if request.path == '/free'
+                             else ('write' if request.method == 'POST' else 'read', int(request.args.get('cost', 1))))
+        self.release = threading.Event()
+        flask_app.add_url_rule('/free', 'free', lambda: 'ok')
+        flask_app.add_url_rule('/items', 'items', lambda: 'ok', methods=['GET', 'POST'])
+        flask_app.add_url_rule('/slow', 'slow', lambda: 'ok' if self.release.wait(5) else 'timeout')
+        flask_app.add_url_rule('/stream', 'stream', lambda: Response(iter(['[', '1', ']'])))
+        return flask_app.test_client()
+
+    def test_rate_limited_per_client_and_class(self):
+        client = self.make_app(limits={'read': (1.0, 2), 'write': (1.0, 1)})
+        self.assertEqual([client.get('/items').status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(client.post('/items').status_code, 200)  # autre classe, autre seau
+        response = client.post('/items')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(response.json['error'], "Too many requests")
+        self.assertEqual(client.get('/items', environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code, 200)
+        self.assertEqual(client.get('/free').status_code, 200)
+        self.clock.now += 1
+        self.assertEqual(client.get('/items').status_code, 200)
+        self.assertEqual(self.limiter.rejected, {('read', 429): 1, ('write', 429): 1})
+
+    def test_client_header(self):
+        client = self.make_app(limits={'read': (1.0, 1)}, client_header='X-API-Key')
+        self.assertEqual(client.get('/items', headers={'X-API-Key': 'k1'}).status_code, 200)
+        self.assertEqual(client.get('/items', headers={'X-API-Key': 'k2'}).status_code, 200)
+        self.assertEqual(client.get('/items', headers={'X-API-Key': 'k1'}).status_code, 429)
+
+    def test_cost(self):
+        client = self.make_app(limits={'read': (1.0, 10)})
+        self.assertEqual(client.get('/items?cost=10').status_code, 200)
+        response = client.get('/items?cost=10')
+        self.assertEqual((response.status_code, response.headers['Retry-After']), (429, '10'))
+
+    def test_load_shedding(self):
+        client = self.make_app(limits={}, max_in_flight=1)
+        slow = threading.Thread(target=client.get, args=('/slow',), kwargs={'buffered': True})
+        slow.start()
+        try:
+            while self.limiter.in_flight == 0:
+                threading.Event().wait(0.001)
+            response = client.get('/items')
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response.headers)
+        finally:
+            self.release.set()
+            slow.join()
+        self.assertEqual(self.limiter.in_flight, 0)
+        self.assertEqual(client.get('/items').status_code, 200)
+
+    def test_streamed_response_counted_until_closed(self):
+        client = self.make_app(limits={}, max_in_flight=1)
+        response = client.get('/stream')  # corps pas encore lu : la réponse reste ouverte
+        self.assertEqual(self.limiter.in_flight, 1)
+        self.assertEqual(client.get('/items').status_code, 503)
+        self.assertEqual(response.get_data(), b'[1]')
+        response.close()
+        self.assertEqual(self.limiter.in_flight, 0)
+        self.assertEqual(client.get('/items', buffered=True).status_code, 200)
+        self.assertEqual(self.limiter.in_flight, 0)
+
+    def test_disabled(self):
+        client = self.make_app(enabled=False, limits={'read': (1.0, 1)})
+        self.assertEqual([client.get('/items').status_code for _ in range(3)], [200, 200, 200])
+
+    def test_load_shedding_without_rate_limits(self):
+        flask_app = Flask(__name__)
+        limiter = RateLimiter.from_env({'RATE_LIMIT_ENABLED': '0', 'MAX_IN_FLIGHT': '1'})
+        limiter.install(flask_app, lambda: ('read', 1))
+        flask_app.add_url_rule('/items', 'items', lambda: 'ok')
+        flask_app.add_url_rule('/stream', 'stream', lambda: Response(iter(['[', '1', ']'])))
+        client = flask_app.test_client()
+
+        self.assertEqual([client.get('/items', buffered=True).status_code for _ in range(3)], [200, 200, 200])
+        response = client.get('/stream')  # réponse ouverte : la seule place est prise
+        self.assertEqual(limiter.in_flight, 1)
+        self.assertEqual(client.get('/items').status_code, 503)
+        response.close()
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(client.get('/items', buffered=True).status_code, 200)
+
+
+class AdmissionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.app = app.test_client()
+
+    def test_route_classes(self):
+        for path, method, expected in [
+            ('/articles', 'GET', ('list', 10)), ('/articles?limit=10', 'GET', ('list', 1)),
+            ('/users?ids=1,2', 'GET', ('list', 1)), ('/users', 'POST', ('write', 1)),
+            ('/users/bulk', 'POST', ('bulk', 1)), ('/articles/1', 'GET', ('read', 1)), ('/metrics', 'GET', None),
+        ]:
+            with app.test_request_context(path, method=method):
+                app.preprocess_request()
+                self.assertEqual(admission_class(), expected, path)
+
+    def test_body_size_checked_before_parsing(self):
+        body = json.dumps({'name': 'A', 'email': 'a@example.com'}).encode()
+        # Content-Length annoncé trop grand : refusé sans lire le corps
+        response = self.app.post('/users', data=body, content_type='application/json',
+                                 environ_overrides={'CONTENT_LENGTH': str(2 * 1024 * 1024)})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(len(users_db), 0)
+        # Sans Content-Length (corps en chunks) : la lecture s'arrête à la limite
+        response = self.app.post('/users', input_stream=io.BytesIO(b" " * (2 * 1024 * 1024) + body),
+                                 content_type='application/json', environ_overrides={'wsgi.input_terminated': True})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(len(users_db), 0)
+        # Les imports gardent leur limite plus haute
+        response = self.app.post('/users/bulk', data=b"x" * (2 * 1024 * 1024), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# tests/test_search.py
+import random
+import unittest
+from unittest.mock import patch
+
+from search import SearchIndex, _ClauseCursor, tokenize, parse_query
+
+
+class SearchIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add(1, "Flask tutorial\nBuilding a small Flask API in Python")
+        self.index.add(2, "Python tips\nPython python PYTHON everywhere")
+        self.index.add(3, "Rust ownership\nBorrowing explained")
+
+    def search(self, query, **options):
+        return self.index.search(query, **options)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Crème-Brûlée, 2 fois!"), ['crème', 'brûlée', '2', 'fois'])
+        self.assertEqual(parse_query("Pyth* flask"), [('pyth', True), ('flask', False)])
+
+    def test_ranking(self):
+        # L'article 2 répète "python" : il passe devant
+        self.assertEqual(self.search("python"), [2, 1])
+
+    def test_all_terms_required(self):
+        self.assertEqual(self.search("python flask"), [1])
+        self.assertEqual(self.search("python unknown"), [])
+        self.assertEqual(self.search("   "), [])
+
+    def test_prefix(self):
+        self.assertEqual(self.search("borrow*"), [3])
+        self.assertEqual(self.search("borrow"), [])
+
+    def test_prefix_keeps_every_expansion(self):
+        # Aucun terme du vocabulaire n'est écarté, même pour un préfixe très large
+        for article_id in range(10, 110):
+            self.index.add(article_id, f"term{article_id:03d}")
+        self.assertEqual(sorted(self.search("term*", limit=1000)), list(range(10, 110)))
+        self.assertEqual(self.search("term* borrowing"), [])
+
+    def test_top_k_stops_early(self):
+        # Les meilleurs articles sont trouvés sans parcourir tous les postings
+        for article_id in range(10, 1010):
+            self.index.add(article_id, "python " + "filler " * (article_id % 50))
+        with patch.object(_ClauseCursor, 'next', autospec=True, side_effect=_ClauseCursor.next) as advance:
+            self.assertEqual(self.search("python", limit=3), [2, 50, 100])
+            self.assertLessEqual(advance.call_count, 10)
+            advance.reset_mock()
+            # "rust" n'a qu'un article : son parcours épuisé, le ET s'arrête
+            self.assertEqual(self.search("python rust"), [])
+            self.assertLessEqual(advance.call_count, 2)
+
+    def test_matches_exhaustive_ranking(self):
+        rng = random.Random(7)
+        words = ['python', 'pythonic', 'flask', 'java', 'rust', 'api', 'cache', 'stream']
+        for article_id in range(10, 400):
+            self.index.add(article_id, ' '.join(rng.choices(words, k=rng.randint(1, 30))))
+        for query in ("python", "pyth*", "flask api", "pyth* cache", "rust api stream", "c* s*"):
+            expected = self.exhaustive(query)
+            for offset, limit in ((0, 10), (5, 20), (0, 1000)):
+                self.assertEqual(self.search(query, offset=offset, limit=limit),
+                                 expected[offset:offset + limit], query)
+
+    def exhaustive(self, query):
+        """Classement de référence : score BM25 de chaque article, sans arrêt anticipé."""
+        index = self.index
+        k1, b = index.K1, index.B
+        average = index.total_length / len(index.doc_lengths)
+        scores = {}
+        for article_id, length in index.doc_lengths.items():
+            score = 0.0
+            for term, prefix in parse_query(query):
+                _, weights = index._weights(index._expand(term, prefix))
+                best = 0.0
+                for expansion, weight in weights:
+                    frequency = index.postings[expansion].get(article_id)
+                    if frequency:
+                        best = max(best, weight * frequency / (frequency + k1 * (1 - b + b * length / average)))
+                if not best:
+                    break
+                score += best
+            else:
+                scores[article_id] = score
+        return sorted(scores, key=lambda article_id: (-scores[article_id], article_id))
+
+    def test_bulk_matches_incremental(self):
+        texts = {article_id: f"python {'java ' * (article_id % 3)}" for article_id in range(1, 30)}
+        bulk = SearchIndex()
+        bulk.begin_bulk()
+        for article_id in reversed(texts):
+            bulk.add(article_id, texts[article_id])
+        bulk.end_bulk()
+        incremental = SearchIndex()
+        for article_id, text in texts.items():
+            incremental.add(article_id, text)
+        self.assertEqual(bulk.impacts, incremental.impacts)
+        self.assertEqual(bulk.search("python jav*", limit=5), incremental.search("python jav*", limit=5))
+
+    def test_pagination(self):
+        self.assertEqual(self.search("python", offset=0, limit=1), [2])
+        self.assertEqual(self.search("python", offset=1, limit=1), [1])
+        self.assertEqual(self.search("python", offset=2, limit=1), [])
+
+    def test_remove(self):
+        self.index.remove(3, "Rust ownership\nBorrowing explained")
+        self.assertEqual(self.search("rust"), [])
+        self.assertNotIn('rust', self.index.vocabulary)
+        self.assertNotIn('rust', self.index.impacts)
+        self.assertEqual(len(self.index.doc_lengths), 2)
+        # Le palier de fréquence 4 de l'article 2 disparaît avec lui
+        self.index.remove(2, "Python tips\nPython python PYTHON everywhere")
+        self.assertEqual(list(self.index.impacts['python']), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
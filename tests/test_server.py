@@ -0,0 +1,167 @@
+# tests/test_server.py
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_RE = re.compile(r"worker (\d+) prêt")
+
+
+def alive(pid):
+    """Vrai si le processus existe encore (ni terminé, ni zombie)."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+class ServerTestCase(unittest.TestCase):
+    """Lance server.py avec deux workers sur un fichier SQLite temporaire."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+
+    def start(self, *args, workers=2, storage=None):
+        storage = storage or "sqlite:///" + os.path.join(self.tmpdir.name, "app.db")
+        self.process = subprocess.Popen(
+            [sys.executable, "server.py", "--workers", str(workers), "--bind", f"127.0.0.1:{self.port}",
+             "--storage", storage, *args],
+            cwd=ROOT, stderr=subprocess.PIPE, text=True, start_new_session=True,
+        )
+        self.addCleanup(self.stop)
+        return self.wait_ready(workers)
+
+    def stop(self):
+        # Arrêt normal du maître (qui attend ses workers), puis tout le groupe
+        # de processus : aucun worker ne doit survivre au test
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.communicate(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+        self.process.stderr.close()
+
+    def wait_ready(self, count):
+        """Lit le journal jusqu'à `count` workers prêts ; retourne leurs pids."""
+        pids = []
+        while len(pids) < count:
+            line = self.process.stderr.readline()
+            self.assertTrue(line, "le serveur s'est arrêté")
+            match = READY_RE.search(line)
+            if match:
+                pids.append(int(match.group(1)))
+        return pids
+
+    def request(self, method, path, body=None):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{self.port}{path}", method=method,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers={"Content-Type": "application/json"},
+        )
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return response.status, json.loads(response.read())
+            except ConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def test_workers_share_data(self):
+        self.start("--preload")
+        for i in range(10):
+            status, user = self.request("POST", "/users", {"name": f"user{i}", "email": f"user{i}@example.com"})
+            self.assertEqual((status, user["id"]), (201, i + 1))
+        # Chaque lecture peut être servie par l'un ou l'autre worker
+        for _ in range(20):
+            status, users = self.request("GET", "/users")
+            self.assertEqual(len(users), 10)
+
+    def test_changes_shared_by_workers(self):
+        self.start()
+        for i in range(10):
+            self.request("POST", "/users", {"name": f"user{i}", "email": f"user{i}@example.com"})
+        # Quel que soit le worker qui répond, mêmes numéros pour les écritures de tous
+        for _ in range(10):
+            status, page = self.request("GET", "/changes?since=0")
+            self.assertEqual(status, 200)
+            self.assertEqual([(item["seq"], item["id"]) for item in page["items"]],
+                             [(i + 1, i + 1) for i in range(10)])
+
+    def test_graceful_reload_and_stop(self):
+        first = self.start()
+        self.request("POST", "/users", {"name": "Alice", "email": "alice@example.com"})
+        self.process.send_signal(signal.SIGHUP)
+        second = self.wait_ready(2)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(self.request("GET", "/users/1")[1]["name"], "Alice")
+
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(10), 0)
+
+    def test_reload_with_process_storage(self):
+        # memory:/// : l'ancien worker ferme son journal avant que le nouveau ne le rejoue
+        first = self.start(workers=1, storage="memory:///" + os.path.join(self.tmpdir.name, "data"))
+        self.request("POST", "/users", {"name": "Alice", "email": "alice@example.com"})
+        self.process.send_signal(signal.SIGHUP)
+        second = self.wait_ready(1)
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.request("GET", "/users/1")[1]["name"], "Alice")
+        self.assertEqual(self.request("POST", "/users", {"name": "Bob", "email": "bob@example.com"})[1]["id"], 2)
+
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(10), 0)
+
+    def test_dead_worker_is_replaced(self):
+        pids = self.start()
+        os.kill(pids[0], signal.SIGKILL)
+        replacement = self.wait_ready(1)
+        self.assertNotIn(replacement[0], pids)
+        self.assertEqual(self.request("GET", "/users")[0], 200)
+
+    def test_workers_exit_when_master_dies(self):
+        pids = self.start()
+        self.process.kill()
+        self.process.wait()
+        deadline = time.monotonic() + 10
+        while any(alive(pid) for pid in pids) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertFalse([pid for pid in pids if alive(pid)])
+
+    def test_memory_storage_is_refused(self):
+        result = subprocess.run([sys.executable, "server.py", "--workers", "2", "--storage", "memory"],
+                                cwd=ROOT, capture_output=True, text=True, timeout=10)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("pas partagé", result.stderr)
+
+    def test_preload_requires_shared_storage(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            result = subprocess.run([sys.executable, "server.py", "--workers", "1", "--preload",
+                                     "--storage", "memory:///" + data_dir],
+                                    cwd=ROOT, capture_output=True, text=True, timeout=10)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("--preload exige un stockage partagé", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
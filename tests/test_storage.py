@@ -0,0 +1,294 @@
+# tests/test_storage.py
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from itertools import product
+
+from storage import MemoryStorage, DuplicateEmailError, DuplicateIdError, article_sort_key, open_storage
+
+
+class StorageContract:
+    """Tests communs à tous les backends ; les sous-classes fournissent make_storage()."""
+
+    def setUp(self):
+        self.storage = self.make_storage()
+        self.alice = self.storage.add_user('Alice', 'alice@example.com')
+        self.bob = self.storage.add_user('Bob', 'bob@example.com')
+
+    def tearDown(self):
+        self.storage.close()
+
+    def test_add_and_get_user(self):
+        user = self.storage.get_user(self.alice.id)
+        self.assertEqual(user.to_dict(), {'id': self.alice.id, 'name': 'Alice', 'email': 'alice@example.com'})
+        self.assertIsNone(self.storage.get_user(999))
+
+    def test_duplicate_email(self):
+        with self.assertRaises(DuplicateEmailError):
+            self.storage.add_user('Other', 'ALICE@example.com')
+        with self.assertRaises(DuplicateEmailError):
+            self.storage.update_user(self.bob.id, email='alice@example.com')
+        self.assertEqual(self.storage.find_user_by_email('Alice@Example.com'), self.alice.id)
+
+    def test_update_user(self):
+        user = self.storage.update_user(self.alice.id, name='Alicia', email='alicia@example.com')
+        self.assertEqual((user.name, user.email), ('Alicia', 'alicia@example.com'))
+        self.assertIsNone(self.storage.find_user_by_email('alice@example.com'))
+
+    def test_add_users_with_ids(self):
+        carol, taken, dan = self.storage.add_users([
+            ('Carol', 'carol@example.com', 10),
+            ('Other', 'other@example.com', self.alice.id),
+            ('Dan', 'dan@example.com'),
+        ])
+        self.assertEqual((carol.id, taken, dan.id), (10, None, 11))
+        with self.assertRaises(DuplicateIdError):
+            self.storage.add_user('Other', 'other@example.com', user_id=10)
+        self.assertEqual(self.storage.get_user(10).name, 'Carol')
+
+    def test_early_dates_round_trip(self):
+        early = self.storage.add_article(self.alice.id, 'Early', 'C', [], created_at=datetime(999, 1, 1))
+        later = self.storage.add_article(self.alice.id, 'Later', 'C', [], created_at=datetime(1000, 1, 1))
+        self.assertEqual(self.storage.get_article(early.id).created_at, datetime(999, 1, 1))
+        self.assertEqual([article.id for article in self.storage.query_articles(order='created_at')],
+                         [early.id, later.id])
+
+    def test_missing_user_not_written(self):
+        self.assertIsNone(self.storage.update_user(999, name='Nobody'))
+        self.assertIsNone(self.storage.add_article(999, 'T', 'C', ['python']))
+        results = self.storage.add_articles([(999, 'T', 'C', [], None), (self.alice.id, 'A1', 'C', [], None)])
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1].title, 'A1')
+        self.assertEqual(self.storage.count_articles(), 1)
+        self.assertEqual(self.storage.tag_count('python'), 0)
+
+    def test_get_many(self):
+        users = self.storage.get_users([self.bob.id, 999, self.alice.id])
+        self.assertEqual({user_id: user.name for user_id, user in users.items()},
+                         {self.alice.id: 'Alice', self.bob.id: 'Bob'})
+        article = self.storage.add_article(self.alice.id, 'A1', 'C1', ['python'])
+        articles = self.storage.get_articles([article.id, 999])
+        self.assertEqual(list(articles), [article.id])
+        self.assertEqual(articles[article.id].tags, ('python',))
+
+    def test_tag_counters(self):
+        self.storage.add_article(self.alice.id, 'A1', 'C', ['python', 'flask', 'python'])
+        self.storage.add_article(self.alice.id, 'A2', 'C', ['python'])
+        self.storage.add_articles([(self.bob.id, 'B1', 'C', ['java', 'flask'], None),
+                                   (self.bob.id, 'B2', 'C', ['python'], None)])
+        self.assertEqual(self.storage.tag_counts(), [('python', 3), ('flask', 2), ('java', 1)])
+        self.assertEqual(self.storage.tag_counts(limit=1), [('python', 3)])
+        self.assertEqual((self.storage.tag_count('flask'), self.storage.tag_count('rust')), (2, 0))
+        self.assertEqual(self.storage.count_tags(), 3)
+        self.assertEqual(self.storage.user_stats(self.alice.id), (2, [('python', 2), ('flask', 1)], 2))
+        self.assertEqual(self.storage.user_stats(self.alice.id, limit=1), (2, [('python', 2)], 2))
+
+        self.storage.delete_user(self.alice.id)
+        self.assertEqual(self.storage.tag_counts(), [('flask', 1), ('java', 1), ('python', 1)])
+        self.assertEqual(self.storage.user_stats(self.alice.id), (0, [], 0))
+        self.storage.clear()
+        self.assertEqual((self.storage.tag_counts(), self.storage.count_tags()), ([], 0))
+
+    def test_on_change(self):
+        events = []
+        self.storage.on_change(lambda kind, op, record_id, record: events.append(
+            (kind, op, record_id, record.to_dict()['name' if kind == 'user' else 'title']
+             if op in ('create', 'update') else None)))
+        article = self.storage.add_article(self.alice.id, 'A1', 'C', ['python'])
+        self.storage.update_user(self.alice.id, name='Alicia')
+        self.storage.delete_user(self.alice.id)
+        self.storage.clear()
+        self.assertEqual(events, [
+            ('article', 'create', article.id, 'A1'),
+            ('user', 'update', self.alice.id, 'Alicia'),
+            ('user', 'delete', self.alice.id, None),
+            ('article', 'delete', article.id, None),
+            ('user', 'clear', None, None),
+            ('article', 'clear', None, None),
+        ])
+
+    def test_list_users_paginated(self):
+        self.assertEqual([user.name for user in self.storage.list_users()], ['Alice', 'Bob'])
+        self.assertEqual([user.name for user in self.storage.list_users(after=self.alice.id, limit=5)], ['Bob'])
+        self.assertEqual(self.storage.count_users(), 2)
+
+    def test_delete_user_cascades(self):
+        self.storage.add_article(self.alice.id, 'A1', 'C1', ['python'])
+        kept = self.storage.add_article(self.bob.id, 'B1', 'C1', ['python'])
+        self.assertTrue(self.storage.delete_user(self.alice.id))
+        self.assertFalse(self.storage.delete_user(self.alice.id))
+        self.assertEqual([article.id for article in self.storage.query_articles(tag='python')], [kept.id])
+        self.assertEqual(self.storage.count_articles(), 1)
+
+    def test_query_articles(self):
+        now = datetime.now()
+        old = self.storage.add_article(self.alice.id, 'Old', 'C', ['python'], created_at=now - timedelta(days=3))
+        new = self.storage.add_article(self.alice.id, 'New', 'C', ['python', 'flask'], created_at=now)
+        mid = self.storage.add_article(self.bob.id, 'Mid', 'C', ['java'], created_at=now - timedelta(days=1))
+
+        ids = lambda articles: [article.id for article in articles]
+        self.assertEqual(ids(self.storage.query_articles()), [old.id, new.id, mid.id])
+        self.assertEqual(ids(self.storage.query_articles(tag='python')), [old.id, new.id])
+        self.assertEqual(ids(self.storage.query_articles(date_after=now - timedelta(days=2))), [new.id, mid.id])
+        self.assertEqual(ids(self.storage.query_articles(tag='python', date_after=now - timedelta(days=2))), [new.id])
+        self.assertEqual(ids(self.storage.query_articles(order='created_at')), [old.id, mid.id, new.id])
+
+        first = self.storage.query_articles(order='created_at', limit=2)
+        rest = self.storage.query_articles(order='created_at', after=article_sort_key(first[-1], 'created_at'))
+        self.assertEqual(ids(rest), [new.id])
+        self.assertEqual(ids(self.storage.user_articles(self.alice.id)), [old.id, new.id])
+
+    def test_query_articles_pages(self):
+        # Dates dans le désordre des ids : les deux ordres et les deux chemins (tag, tranche de dates)
+        now = datetime.now()
+        articles = [
+            self.storage.add_article(self.alice.id, f'A{i}', 'C', ['even' if i % 2 else 'odd', 'all'],
+                                     created_at=now - timedelta(days=(i * 7) % 30))
+            for i in range(30)
+        ]
+        for days, tag, order in product((20, 4), (None, 'all', 'even'), ('id', 'created_at')):
+            date_after = now - timedelta(days=days)
+            expected = sorted(
+                (article for article in articles
+                 if (tag is None or tag in article.tags) and article.created_at >= date_after),
+                key=lambda article: article_sort_key(article, order))
+            pages, after = [], None
+            while True:
+                page = self.storage.query_articles(tag=tag, date_after=date_after, order=order,
+                                                   after=after, limit=4)
+                pages.extend(article.id for article in page)
+                if len(page) < 4:
+                    break
+                after = article_sort_key(page[-1], order)
+            self.assertEqual(pages, [article.id for article in expected], (days, tag, order))
+
+    def test_search_articles(self):
+        first = self.storage.add_article(self.alice.id, 'Flask tutorial', 'Building an API in Python', [])
+        second = self.storage.add_article(self.bob.id, 'Python tips', 'Python everywhere, python always', [])
+        ids = lambda articles: [article.id for article in articles]
+        self.assertEqual(ids(self.storage.search_articles('python')), [second.id, first.id])
+        self.assertEqual(ids(self.storage.search_articles('pyth* flask')), [first.id])
+        self.assertEqual(ids(self.storage.search_articles('python', offset=1, limit=5)), [first.id])
+        self.storage.delete_user(self.bob.id)
+        self.assertEqual(ids(self.storage.search_articles('python')), [first.id])
+
+    def test_versions(self):
+        users_version, _ = self.storage.store_version('users')
+        articles_version, modified_at = self.storage.store_version('articles')
+        article = self.storage.add_article(self.alice.id, 'T', 'C', [])
+        self.assertEqual(self.storage.store_version('users')[0], users_version)
+        self.assertGreater(self.storage.store_version('articles')[0], articles_version)
+        self.assertGreaterEqual(self.storage.store_version('articles')[1], modified_at)
+        self.assertEqual(self.storage.get_article(article.id)._version, self.storage.store_version('articles')[0])
+
+        user_version = self.storage.get_user(self.alice.id)._version
+        self.storage.update_user(self.alice.id, name='Alicia')
+        self.assertGreater(self.storage.get_user(self.alice.id)._version, user_version)
+        self.assertEqual(self.storage.get_user(self.bob.id)._version, self.bob._version)
+
+    def test_no_op_writes_keep_versions(self):
+        versions = lambda: (self.storage.store_version('users')[0], self.storage.store_version('articles')[0])
+        before = versions()
+        self.assertIsNone(self.storage.update_user(999, name='Nobody'))
+        self.assertEqual(self.storage.add_users([('Dup', 'ALICE@example.com'), ('Dup', 'bob@example.com')]),
+                         [None, None])
+        self.assertEqual(self.storage.add_articles([(999, 'T', 'C', [], None)]), [None])
+        self.assertEqual(versions(), before)
+
+        # Mise à jour sans valeur nouvelle : l'utilisateur est retourné, rien n'avance
+        for fields in ({}, {'name': 'Alice'}, {'email': 'alice@example.com'}, {'name': '', 'email': None}):
+            user = self.storage.update_user(self.alice.id, **fields)
+            self.assertEqual((user.name, user.email, user._version), ('Alice', 'alice@example.com', self.alice._version))
+        self.assertEqual(versions(), before)
+
+        # Supprimer un utilisateur sans article laisse valides les réponses d'articles
+        self.assertTrue(self.storage.delete_user(self.bob.id))
+        self.assertGreater(versions()[0], before[0])
+        self.assertEqual(versions()[1], before[1])
+        before = versions()
+
+        # La version du premier enregistrement inséré est celle du store
+        users = self.storage.add_users([('Dup', 'alice@example.com'), ('Carol', 'carol@example.com')])
+        self.assertEqual(self.storage.get_user(users[1].id)._version, self.storage.store_version('users')[0])
+        articles = self.storage.add_articles([(999, 'T', 'C', [], None), (self.alice.id, 'A1', 'C', [], None)])
+        self.assertEqual(self.storage.get_article(articles[1].id)._version, self.storage.store_version('articles')[0])
+
+    def test_ids_not_reused_after_delete(self):
+        carol = self.storage.add_user('Carol', 'carol@example.com')
+        first = self.storage.add_article(carol.id, 'First', 'Content', [])
+        self.storage.delete_user(carol.id)
+        dave = self.storage.add_user('Dave', 'dave@example.com')
+        second = self.storage.add_article(dave.id, 'Second', 'Content', [])
+        self.assertGreater(dave.id, carol.id)
+        self.assertGreater(second.id, first.id)
+
+        self.storage.clear()
+        self.assertEqual(self.storage.add_user('Eve', 'eve@example.com').id, 1)
+
+    def test_warm_up(self):
+        self.storage.warm_up()
+        self.assertEqual(self.storage.count_users(), 2)
+
+    def test_article_roundtrip(self):
+        created_at = datetime(2024, 1, 2, 3, 4, 5)
+        article = self.storage.add_article(self.alice.id, 'Title', 'Content', ['a', 'b'], created_at=created_at)
+        stored = self.storage.get_article(article.id)
+        self.assertEqual(stored.to_dict(), article.to_dict())
+
+
+class MemoryStorageTestCase(StorageContract, unittest.TestCase):
+
+    def make_storage(self):
+        return MemoryStorage()
+
+    def test_versions_increase_across_restarts(self):
+        # Un nouveau processus ne doit pas réattribuer les versions (donc les ETag) du précédent
+        before = self.storage.store_version('users')[0]
+        restarted = MemoryStorage()
+        user = restarted.add_user('Alice', 'alice@example.com')
+        self.assertGreater(restarted.store_version('users')[0], before)
+        self.assertGreater(user._version, self.alice._version)
+
+
+class PersistentMemoryStorageTestCase(StorageContract, unittest.TestCase):
+
+    def make_storage(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        return open_storage('memory:///' + self.tmpdir.name.lstrip('/') + '?fsync=always')
+
+
+class SQLiteStorageTestCase(StorageContract, unittest.TestCase):
+
+    def make_storage(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        return open_storage('sqlite:///' + os.path.join(self.tmpdir.name, 'app.db'))
+
+    def test_wal_mode(self):
+        mode = self.storage._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_connection_closed_with_its_thread(self):
+        self.storage.get_user(self.alice.id)
+        before = len(self.storage._connections)
+        threads = [threading.Thread(target=self.storage.get_user, args=(self.alice.id,)) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        self.assertEqual(len(self.storage._connections), before)
+
+    def test_counters_backfilled_on_older_database(self):
+        self.storage.add_article(self.alice.id, 'A1', 'C', ['python', 'flask'])
+        self.storage.add_article(self.alice.id, 'A2', 'C', ['python'])
+        with self.storage._connection() as conn:  # base d'avant user_distinct_tags
+            conn.execute("DROP TABLE user_distinct_tags")
+        self.storage.close()
+        self.storage = open_storage('sqlite:///' + os.path.join(self.tmpdir.name, 'app.db'))
+        self.assertEqual(self.storage.user_stats(self.alice.id, limit=1), (2, [('python', 2)], 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# tests/test_tags.py
+import unittest
+from app import app, users_db, articles_db
+
+
+class TagRouteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.app = app.test_client()
+        self.app.testing = True
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.post('/users', json={'name': 'Bob', 'email': 'bob@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'A1', 'content': 'C', 'tags': 'python,flask'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'A2', 'content': 'C', 'tags': 'python'})
+        self.app.post('/articles', json={'user_id': 2, 'title': 'B1', 'content': 'C', 'tags': 'java,python'})
+
+    def test_tags(self):
+        response = self.app.get('/tags')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'items': [{'tag': 'python', 'count': 3}, {'tag': 'flask', 'count': 1},
+                                                   {'tag': 'java', 'count': 1}], 'total': 3})
+        self.assertEqual(self.app.get('/tags?limit=1').json['items'], [{'tag': 'python', 'count': 3}])
+        self.assertEqual(self.app.get('/tags?limit=0').status_code, 400)
+
+    def test_tag_count(self):
+        self.assertEqual(self.app.get('/tags/python').json, {'tag': 'python', 'count': 3})
+        self.assertEqual(self.app.get('/tags/rust').json, {'tag': 'rust', 'count': 0})
+
+    def test_counters_follow_writes(self):
+        etag = self.app.get('/tags').headers['ETag']
+        self.app.delete('/users/1')
+        response = self.app.get('/tags', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['items'], [{'tag': 'java', 'count': 1}, {'tag': 'python', 'count': 1}])
+
+    def test_user_stats(self):
+        response = self.app.get('/users/1/stats')
+        self.assertEqual(response.json, {'user_id': 1, 'articles': 2, 'distinct_tags': 2,
+                                         'tags': [{'tag': 'python', 'count': 2}, {'tag': 'flask', 'count': 1}]})
+        self.assertEqual(self.app.get('/users/1/stats?limit=1').json['tags'], [{'tag': 'python', 'count': 2}])
+        self.assertEqual(self.app.get('/users/99/stats').status_code, 404)
+
+    def test_user_ranking_follows_writes(self):
+        def expected(user_id):
+            counts = {}
+            for article in articles_db.values():
+                if article.user_id == user_id:
+                    for tag in set(article.tags):
+                        counts[tag] = counts.get(tag, 0) + 1
+            return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+        for tags in ('flask,api', 'flask', 'rust,api', 'api'):
+            self.app.post('/articles', json={'user_id': 1, 'title': 'T', 'content': 'C', 'tags': tags})
+        self.assertEqual(articles_db.user_stats(1), (6, expected(1), 4))
+        self.assertEqual(articles_db.user_stats(1, limit=2), (6, [('api', 3), ('flask', 3)], 4))
+        # Suppressions article par article : les tags reculent ou disparaissent du classement
+        for article_id in (1, 6, 2):
+            del articles_db[article_id]
+            self.assertEqual(articles_db.user_stats(1)[1:], (expected(1), len(expected(1))))
+        self.assertEqual(articles_db.user_stats(1, limit=1)[1], [('api', 2)])
+        # Chargement en masse : classement recalculé une fois
+        articles = list(articles_db.values())
+        articles_db.clear()
+        articles_db.load(articles)
+        self.assertEqual(articles_db.user_stats(1)[1], expected(1))
+        self.app.delete('/users/1')
+        self.assertEqual(articles_db.user_stats(1), (0, [], 0))
+        self.assertNotIn(1, articles_db.user_tag_ranking)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 import unittest
 from app import app, users_db, articles_db 
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 
 class BaseAPITestCase(unittest.TestCase): # Pas de unittest.TestCase ici !
@@ -46,6 +47,17 @@ class UserRouteTestCase(BaseAPITestCase): # Hérite de unittest.TestCase ici
         self.assertEqual(response.status_code, 409)
         self.assertIn("User with this email already exists", str(response.data))
 
+    def test_create_duplicate_email_case_insensitive(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        response = self.app.post('/users', json={'name': 'Bob', 'email': 'Alice@Example.COM'})
+        self.assertEqual(response.status_code, 409)
+
+    def test_email_available_after_delete(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.delete('/users/1')
+        response = self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.assertEqual(response.status_code, 201)
+
     def test_get_empty(self):
         response = self.app.get('/users')
         self.assertEqual(response.status_code, 200)
@@ -60,6 +72,45 @@ class UserRouteTestCase(BaseAPITestCase): # Hérite de unittest.TestCase ici
         # Assurez-vous que les données sont bien dans la réponse JSON, pas juste la chaîne
         self.assertTrue(any(user['name'] == 'Alice' for user in response.json))
 
+    def test_get_streamed_across_pages(self):
+        for i in range(5):
+            self.app.post('/users', json={'name': f'User{i}', 'email': f'user{i}@example.com'})
+        with patch('app.STREAM_PAGE_SIZE', 2), patch('app.STREAM_CHUNK_SIZE', 2):
+            response = self.app.get('/users')
+        self.assertEqual([user['id'] for user in response.json], [1, 2, 3, 4, 5])
+
+    def test_get_paginated(self):
+        for i in range(5):
+            self.app.post('/users', json={'name': f'User{i}', 'email': f'user{i}@example.com'})
+
+        response = self.app.get('/users?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['id'] for user in response.json['items']], [1, 2])
+        cursor = response.json['next_cursor']
+
+        # Un insert concurrent ne décale pas les pages suivantes
+        self.app.post('/users', json={'name': 'Late', 'email': 'late@example.com'})
+
+        seen = [1, 2]
+        while cursor:
+            response = self.app.get(f'/users?limit=2&after={cursor}')
+            seen.extend(user['id'] for user in response.json['items'])
+            cursor = response.json['next_cursor']
+        self.assertEqual(seen, [1, 2, 3, 4, 5, 6])
+
+    def test_update_email_keeps_user_in_pages(self):
+        # Régression : changer l'email retirait l'utilisateur de l'index trié des ids
+        for i in range(3):
+            self.app.post('/users', json={'name': f'User{i}', 'email': f'user{i}@example.com'})
+        self.app.put('/users/2', json={'email': 'renamed@example.com'})
+        self.assertEqual([user['id'] for user in self.app.get('/users?limit=10').json['items']], [1, 2, 3])
+        self.assertEqual([user['id'] for user in self.app.get('/users').json], [1, 2, 3])
+
+    def test_get_paginated_invalid_params(self):
+        self.assertEqual(self.app.get('/users?limit=0').status_code, 400)
+        self.assertEqual(self.app.get('/users?limit=abc').status_code, 400)
+        self.assertEqual(self.app.get('/users?after=not-a-cursor').status_code, 400)
+
     def test_get_single_success(self):
         self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
         response = self.app.get('/users/1')
@@ -71,6 +122,14 @@ class UserRouteTestCase(BaseAPITestCase): # Hérite de unittest.TestCase ici
         self.assertEqual(response.status_code, 404)
         self.assertIn("User not found", str(response.data))
 
+    def test_id_out_of_range_not_found(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        for method in ('get', 'put', 'delete'):
+            response = getattr(self.app, method)('/users/9223372036854775808', json={'name': 'Bob'})
+            self.assertEqual(response.status_code, 404, method)
+            self.assertIn("User not found", str(response.data))
+        self.assertEqual(self.app.get('/users/9223372036854775808/stats').status_code, 404)
+
     def test_update_name(self):
         self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
         response = self.app.put('/users/1', json={'name': 'Alicia'})
@@ -83,6 +142,56 @@ class UserRouteTestCase(BaseAPITestCase): # Hérite de unittest.TestCase ici
         self.assertEqual(response.status_code, 200)
         self.assertEqual(users_db[1]['email'], 'alicia_new@example.com')
         
+    def test_update_refreshes_cached_response(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.assertEqual(self.app.get('/users/1').json['name'], 'Alice')
+        self.app.put('/users/1', json={'name': 'Alicia', 'email': 'alicia@example.com'})
+        self.assertEqual(self.app.get('/users/1').json, {'id': 1, 'name': 'Alicia', 'email': 'alicia@example.com'})
+        self.assertEqual(self.app.get('/users').json[0]['name'], 'Alicia')
+
+    def test_cached_json_discarded_on_concurrent_update(self):
+        from app import record_json, storage, user_for_response
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        user = users_db[1]
+        object.__setattr__(user, '_json', None)  # pas encore sérialisé
+
+        def racing_to_dict(record):
+            data = user_for_response(record)
+            storage.update_user(1, name='Alicia')  # écriture pendant la sérialisation
+            return data
+
+        self.assertIn('"Alice"', record_json(user, racing_to_dict))
+        self.assertEqual(self.app.get('/users/1').json['name'], 'Alicia')
+
+    def test_get_single_conditional(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        response = self.app.get('/users/1')
+        etag = response.headers['ETag']
+        self.assertIsNotNone(response.last_modified)
+
+        response = self.app.get('/users/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        self.app.put('/users/1', json={'name': 'Alicia'})
+        response = self.app.get('/users/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_get_list_conditional(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        response = self.app.get('/users')
+        headers = {'If-None-Match': response.headers['ETag']}
+        self.assertEqual(self.app.get('/users', headers=headers).status_code, 304)
+
+        response = self.app.get('/users', headers={'If-Modified-Since': response.headers['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+        self.app.post('/users', json={'name': 'Bob', 'email': 'bob@example.com'})
+        response = self.app.get('/users', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 2)
+
     def test_update_duplicate_email(self):
         self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
         self.app.post('/users', json={'name': 'Bob', 'email': 'bob@example.com'})
@@ -90,6 +199,19 @@ class UserRouteTestCase(BaseAPITestCase): # Hérite de unittest.TestCase ici
         self.assertEqual(response.status_code, 409)
         self.assertIn("User with this email already exists", str(response.data))
 
+    def test_update_email_frees_old_email(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.put('/users/1', json={'email': 'alicia@example.com'})
+        response = self.app.post('/users', json={'name': 'Bob', 'email': 'alice@example.com'})
+        self.assertEqual(response.status_code, 201)
+        response = self.app.post('/users', json={'name': 'Carol', 'email': 'alicia@example.com'})
+        self.assertEqual(response.status_code, 409)
+
+    def test_update_own_email_case(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        response = self.app.put('/users/1', json={'email': 'ALICE@example.com'})
+        self.assertEqual(response.status_code, 200)
+
 
     def test_delete_success(self):
         self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
@@ -112,6 +234,38 @@ class UserRouteTestCase(BaseAPITestCase): # Hérite de unittest.TestCase ici
         self.app.delete('/users/1')
         self.assertEqual(len(articles_db), 0)
 
+    def test_delete_keeps_other_users_articles(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.post('/users', json={'name': 'Bob', 'email': 'bob@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'Article 1', 'content': 'Content 1'})
+        self.app.post('/articles', json={'user_id': 2, 'title': 'Article 2', 'content': 'Content 2'})
+
+        self.app.delete('/users/1')
+        self.assertEqual(list(articles_db), [2])
+        self.assertNotIn(1, articles_db.user_index)
+
+    def test_get_user_articles(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        self.app.post('/users', json={'name': 'Bob', 'email': 'bob@example.com'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'Article 1', 'content': 'Content 1'})
+        self.app.post('/articles', json={'user_id': 2, 'title': 'Article 2', 'content': 'Content 2'})
+        self.app.post('/articles', json={'user_id': 1, 'title': 'Article 3', 'content': 'Content 3'})
+
+        response = self.app.get('/users/1/articles')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([article['title'] for article in response.json], ['Article 1', 'Article 3'])
+
+        response = self.app.get('/users/1/articles?limit=1')
+        self.assertEqual([article['id'] for article in response.json['items']], [1])
+        response = self.app.get(f'/users/1/articles?limit=1&after={response.json["next_cursor"]}')
+        self.assertEqual([article['id'] for article in response.json['items']], [3])
+        self.assertIsNone(response.json['next_cursor'])
+
+    def test_get_user_articles_not_found(self):
+        response = self.app.get('/users/999/articles')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("User not found", str(response.data))
+
 # --- Classe de test concrète pour les Articles ---
 class ArticlesRouteTestCase(BaseAPITestCase): 
     
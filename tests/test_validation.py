@@ -0,0 +1,101 @@
+# tests/test_validation.py
+import json
+import unittest
+from datetime import datetime
+
+from app import app, users_db, articles_db
+from models import ArticleInfos, UserInfos
+from validation import MAX_JSON_BODY, schema
+
+
+class SchemaTestCase(unittest.TestCase):
+
+    def test_user_schema(self):
+        user_schema = schema(UserInfos)
+        self.assertEqual(user_schema.names, ('name', 'email'))
+        self.assertEqual(user_schema.validate({'name': 'Alice', 'email': 'alice@example.com'}),
+                         (('Alice', 'alice@example.com'), None))
+        self.assertEqual(user_schema.validate({'name': 'Alice'}), (None, "Name and email are required"))
+        self.assertEqual(user_schema.validate({'name': 'Alice', 'email': 'nope'}), (None, "Invalid email format"))
+        self.assertEqual(user_schema.validate({'name': 'Alice', 'email': 42}), (None, "Invalid email format"))
+        self.assertEqual(user_schema.validate({'name': ['Alice'], 'email': 'alice@example.com'}),
+                         (None, "name must be a string"))
+        self.assertEqual(user_schema.validate(['Alice']), (None, "Request body must be a JSON object"))
+
+    def test_partial_schema(self):
+        update_schema = schema(UserInfos, partial=True)
+        self.assertEqual(update_schema.validate({}), ((None, None), None))
+        self.assertEqual(update_schema.validate({'email': 'bad'}), (None, "Invalid email format"))
+
+    def test_article_schema(self):
+        article_schema = schema(ArticleInfos)
+        values, error = article_schema.validate({'user_id': 1, 'title': 'T', 'content': 'C',
+                                                 'tags': ' a, b ,', 'created_at': '2024-01-02T03:04:05'})
+        self.assertIsNone(error)
+        self.assertEqual(values, (1, 'T', 'C', ['a', 'b'], datetime(2024, 1, 2, 3, 4, 5)))
+        self.assertEqual(article_schema.validate({'user_id': 1, 'title': 'T', 'content': 'C'})[0],
+                         (1, 'T', 'C', [], None))
+        self.assertEqual(article_schema.validate({'user_id': '1', 'title': 'T', 'content': 'C'}),
+                         (None, "user_id must be an integer"))
+        self.assertEqual(article_schema.validate({'user_id': 2 ** 63, 'title': 'T', 'content': 'C'}),
+                         (None, f"user_id must be between 1 and {2 ** 63 - 1}"))
+        self.assertEqual(article_schema.validate({'user_id': 1, 'title': 'T', 'content': 'C', 'tags': [1]}),
+                         (None, "tags must be a string or a list of strings"))
+        self.assertEqual(article_schema.validate({'user_id': 1, 'title': 'T', 'content': 'C', 'tags': ['a,b', 'c']}),
+                         (None, "tags must not contain commas"))
+        values, _ = article_schema.validate({'user_id': 1, 'title': 'T', 'content': 'C',
+                                             'created_at': '2024-01-02T03:04:05+02:00'})
+        self.assertIsNone(values[4].tzinfo)  # heure locale naïve
+        self.assertEqual(article_schema.validate({'user_id': 1, 'title': 'T', 'content': 'C', 'created_at': 'x'}),
+                         (None, "Invalid created_at format. Use ISO 8601"))
+
+    def test_schemas_are_cached(self):
+        self.assertIs(schema(UserInfos), schema(UserInfos))
+        self.assertIsNot(schema(UserInfos), schema(UserInfos, partial=True))
+
+
+class RequestValidationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        users_db.clear()
+        articles_db.clear()
+        self.app = app.test_client()
+        self.app.testing = True
+
+    def test_oversized_body_rejected(self):
+        body = json.dumps({'name': 'A' * MAX_JSON_BODY, 'email': 'a@example.com'})
+        response = self.app.post('/users', data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('too large', response.json['error'])
+        self.assertEqual(len(users_db), 0)
+
+    def test_body_must_be_object(self):
+        response = self.app.post('/users', json=['Alice', 'alice@example.com'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], "Request body must be a JSON object")
+
+    def test_tag_with_comma_rejected(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        response = self.app.post('/articles', json={'user_id': 1, 'title': 'T', 'content': 'C', 'tags': ['a,b', 'c']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], "tags must not contain commas")
+        self.assertEqual(self.app.get('/tags').json['total'], 0)
+
+    def test_article_user_id_type(self):
+        self.app.post('/users', json={'name': 'Alice', 'email': 'alice@example.com'})
+        response = self.app.post('/articles', json={'user_id': '1', 'title': 'T', 'content': 'C'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], "user_id must be an integer")
+
+    def test_bulk_line_too_long(self):
+        body = (json.dumps({'name': 'A' * MAX_JSON_BODY, 'email': 'a@example.com'}) + "\n"
+                + json.dumps({'name': 'Bob', 'email': 'bob@example.com'}) + "\n")
+        response = self.app.post('/users/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['created'], 1)
+        self.assertEqual(response.json['errors'][0]['line'], 1)
+        self.assertIn('Line too long', response.json['errors'][0]['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
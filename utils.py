@@ -1,11 +1,11 @@
 # utils.py
-import re
+import base64
 from datetime import datetime
+from validation import EMAIL_RE, MAX_ID
 
 def is_valid_email(email):
-    """Valide le format d'une adresse email."""
-    # Une regex plus robuste pourrait être utilisée
-    return re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", email)
+    """Valide le format d'une adresse email (même règle que l'API, voir validation.py)."""
+    return EMAIL_RE.match(email)
 
 def format_datetime_for_display(dt_obj):
     """Formate un objet datetime en chaîne de caractères lisible."""
@@ -13,4 +13,31 @@ def format_datetime_for_display(dt_obj):
         return dt_obj.strftime("%Y-%m-%d %H:%M:%S")
     return str(dt_obj) # Gérer les cas où ce n'est pas un datetime object
 
+def encode_cursor(key):
+    """Encode une clé de pagination (id ou couple (datetime, id)) en curseur opaque."""
+    if isinstance(key, tuple):
+        raw = f"{key[0].isoformat()}|{key[1]}"
+    else:
+        raw = str(key)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Décode un curseur produit par encode_cursor. Lève ValueError s'il est invalide."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    if '|' in raw:
+        date_str, id_str = raw.split('|', 1)
+        created_at = datetime.fromisoformat(date_str)
+        if created_at.tzinfo is not None:  # encode_cursor n'en produit pas : dates naïves
+            raise ValueError("cursor dates have no time zone")
+        return (created_at, _cursor_int(id_str))
+    return _cursor_int(raw)
+
+def _cursor_int(value):
+    # Id ou rang : au-delà de MAX_ID, il ne peut pas être passé à SQLite
+    value = int(value)
+    if not 0 <= value <= MAX_ID:
+        raise ValueError(f"cursor out of range: {value}")
+    return value
+
 # D'autres fonctions utilitaires (validation de données, etc.) pourraient aller ici.
\ No newline at end of file
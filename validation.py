@@ -0,0 +1,206 @@
+# validation.py
+# Validation des corps de requête, décrite par les dataclasses de models.py
+# (UserInfos, ArticleInfos) : champs requis, types, formats et conversions.
+#
+# Un schéma est préparé une seule fois (expressions régulières, vérificateur
+# de chaque champ) puis mis en cache : une requête ne fait qu'appeler ces
+# vérificateurs. Les règles sont écrites une seule fois pour toutes les routes
+# (POST/PUT, imports) ; elles vérifient plus que l'ancien code à la main
+# (types, bornes des ids et des dates), ce qui coûte un peu de débit.
+
+import dataclasses
+import re
+import typing
+from datetime import datetime
+from functools import lru_cache
+
+from models import ArticleInfos, UserInfos
+
+# Format d'email accepté par l'API (seule définition, voir aussi utils.is_valid_email)
+EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+# Taille maximale d'un corps JSON (et d'une ligne d'import NDJSON)
+MAX_JSON_BODY = 1024 * 1024
+
+# Plus grand id accepté : SQLite stocke les entiers sur 64 bits signés
+MAX_ID = 2 ** 63 - 1
+
+# Plus grand id qu'un import peut imposer. Un id imposé avance l'allocateur :
+# au-delà, les créations suivantes dépasseraient MAX_ID. Cette borne (le plus
+# grand entier exact d'un nombre JSON en JavaScript) laisse ~2**63 ids libres.
+MAX_IMPORTED_ID = 2 ** 53 - 1
+
+# Messages d'erreur par type d'enregistrement
+REQUIRED_MESSAGES = {
+    UserInfos: "Name and email are required",
+    ArticleInfos: "user_id, title, and content are required",
+}
+FORMAT_MESSAGES = {
+    'email': "Invalid email format",
+    'created_at': "Invalid created_at format. Use ISO 8601",
+}
+NOT_AN_OBJECT = "Request body must be a JSON object"
+
+
+class Invalid(Exception):
+    """Levée par un vérificateur de champ ; porte le message d'erreur."""
+
+
+def parse_tags(tags):
+    """Tags sous forme de chaîne "tag1,tag2" (ou de liste, pour les imports)."""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    elif not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise Invalid("tags must be a string or a list of strings")
+    elif any(',' in tag for tag in tags):
+        # La virgule sépare les tags ("a,b", et colonne tags de SQLite) : pas dans un tag
+        raise Invalid("tags must not contain commas")
+    return [tag.strip() for tag in tags if tag.strip()]
+
+
+def parse_id(value):
+    """Id (chaîne ou entier) entre 1 et MAX_ID ; lève ValueError sinon."""
+    value = int(value)
+    if not 1 <= value <= MAX_ID:
+        raise ValueError(f"id out of range: {value}")
+    return value
+
+
+# Plus petite année acceptée : les dates restent sur quatre chiffres
+MIN_YEAR = 1000
+
+
+def parse_datetime(value):
+    """Date ISO 8601, à partir de l'an MIN_YEAR. Les dates sont stockées naïves,
+    en heure locale (comme datetime.now()) : une date avec fuseau est convertie.
+    Lève ValueError si la date est invalide ou hors limites."""
+    value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        try:
+            value = value.astimezone().replace(tzinfo=None)
+        except OverflowError:  # conversion hors de [datetime.min, datetime.max]
+            raise ValueError(f"date out of range: {value}") from None
+    if value.year < MIN_YEAR:
+        raise ValueError(f"date out of range: {value}")
+    return value
+
+
+# --- Vérificateurs par champ ---
+# Un schéma prépare une fois, pour chaque champ, une fonction de vérification
+# (valeur -> valeur convertie, ou Invalid) ; validate n'a plus qu'à les appeler.
+
+PATTERNS = {'email': EMAIL_RE}
+INT_LIMITS = {'id': MAX_IMPORTED_ID}  # champ entier -> borne propre (sinon MAX_ID)
+
+
+def _field_kind(annotation):
+    if typing.get_origin(annotation) is typing.Union:  # Optional[X]
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    if typing.get_origin(annotation) is list:
+        return list
+    if annotation in (str, int, datetime):
+        return annotation
+    raise TypeError(f"no validator for {annotation!r}")
+
+
+def _field_check(name, kind):
+    """Vérificateur d'une valeur non vide du champ : retourne la valeur convertie,
+    ou une exception Invalid (retournée, pas levée : un refus reste bon marché)."""
+    format_error = Invalid(FORMAT_MESSAGES.get(name, f"Invalid {name} format"))
+    if kind is str and name in PATTERNS:
+        match = PATTERNS[name].match
+
+        def check_pattern(value):
+            # Un email qui n'est pas une chaîne garde le message historique
+            if isinstance(value, str) and match(value):
+                return value
+            return format_error
+        return check_pattern
+    if kind is str:
+        type_error = Invalid(f"{name} must be a string")
+        return lambda value: value if isinstance(value, str) else type_error
+    if kind is int:
+        limit = INT_LIMITS.get(name, MAX_ID)
+        type_error = Invalid(f"{name} must be an integer")
+        range_error = Invalid(f"{name} must be between 1 and {limit}")
+
+        def check_int(value):
+            if type(value) is not int:  # bool exclu
+                return type_error
+            return value if 1 <= value <= limit else range_error
+        return check_int
+    if kind is datetime:
+        def check_datetime(value):
+            try:
+                return parse_datetime(value)
+            except (TypeError, ValueError):
+                return format_error
+        return check_datetime
+
+    def check_tags(value):
+        try:
+            return parse_tags(value)
+        except Invalid as error:
+            return error
+    return check_tags
+
+
+class Schema:
+    """Validateur précompilé pour une dataclass de models.py.
+
+    `exclude` retire des champs (l'id, attribué par le stockage) ; les champs
+    de `optional` ne sont pas requis ; avec `partial`, aucun champ n'est requis
+    (mise à jour).
+
+    validate(data) retourne (tuple des valeurs dans l'ordre des champs, None)
+    ou (None, message d'erreur). Une valeur absente ou vide vaut None (les
+    tags : liste vide) ; les champs requis sont vérifiés avant les formats.
+    """
+
+    def __init__(self, infos_class, exclude=(), partial=False, optional=()):
+        hints = typing.get_type_hints(infos_class)
+        fields = []  # [(nom, requis, vide -> None, vérificateur)]
+        for spec in dataclasses.fields(infos_class):
+            if spec.name in exclude:
+                continue
+            kind = _field_kind(hints[spec.name])
+            required = not partial and spec.name not in optional and spec.default is dataclasses.MISSING \
+                and spec.default_factory is dataclasses.MISSING
+            # parse_tags convertit lui-même une valeur vide (liste vide)
+            fields.append((spec.name, required, kind is not list, _field_check(spec.name, kind)))
+        self.names = tuple(name for name, _, _, _ in fields)
+        self.required = tuple(name for name, required, _, _ in fields if required)
+        self.required_message = REQUIRED_MESSAGES[infos_class]
+        self._fields = tuple(fields)
+
+    def validate(self, data):
+        if not isinstance(data, dict):
+            return None, NOT_AN_OBJECT
+        get = data.get
+        values = []
+        append = values.append
+        error = None
+        for name, required, empty_is_none, check in self._fields:
+            value = get(name)
+            if not value:
+                if required:  # avant toute erreur de format, même d'un champ précédent
+                    return None, self.required_message
+                if empty_is_none:
+                    append(None)
+                    continue
+            if error is None:
+                value = check(value)
+                if value.__class__ is Invalid:
+                    error = value.args[0]
+                append(value)
+        if error is not None:
+            return None, error
+        return tuple(values), None
+
+
+@lru_cache(maxsize=None)
+def schema(infos_class, exclude=('id',), partial=False, optional=()):
+    """Schéma préparé et mis en cache pour (dataclass, champs exclus, partial, champs optionnels)."""
+    return Schema(infos_class, exclude, partial, optional)